@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import collections
+import concurrent.futures
 import logging
 from dataclasses import dataclass
 from typing import TYPE_CHECKING, Optional
@@ -8,6 +9,7 @@
 import numpy as np
 import scipy.spatial.distance as ssd
 from scipy.cluster import hierarchy
+from scipy.spatial import cKDTree
 
 from cctbx import crystal, uctbx
 from cctbx.sgtbx.lattice_symmetry import metric_subgroups
@@ -181,37 +183,200 @@ def __str__(self):
         return "\n".join(text)
 
 
+def g6_cells_from_unit_cells(unit_cells: np.ndarray) -> np.ndarray:
+    """Convert an (n, 6) array of unit cell parameters to G6 vectors."""
+    a = unit_cells[:, 0] ** 2
+    b = unit_cells[:, 1] ** 2
+    c = unit_cells[:, 2] ** 2
+    d = 2 * unit_cells[:, 1] * unit_cells[:, 2] * np.cos(np.radians(unit_cells[:, 3]))
+    e = 2 * unit_cells[:, 0] * unit_cells[:, 2] * np.cos(np.radians(unit_cells[:, 4]))
+    f = 2 * unit_cells[:, 0] * unit_cells[:, 1] * np.cos(np.radians(unit_cells[:, 5]))
+    return np.array([a, b, c, d, e, f]).transpose()
+
+
+# The G6 vectors are shared with worker processes once, via the pool initializer,
+# rather than being pickled for every block of distances.
+_worker_g6_cells: Optional[np.ndarray] = None
+
+
+def _init_ncdist_worker(g6_cells: Optional[np.ndarray]) -> None:
+    global _worker_g6_cells
+    _worker_g6_cells = g6_cells
+
+
+def _ncdist_rows(rows: tuple[int, int]) -> np.ndarray:
+    """Calculate the condensed distance matrix entries for rows [start, end)."""
+    start, end = rows
+    g6 = _worker_g6_cells
+    n = len(g6)
+    return np.array(
+        [NCDist(g6[i], g6[j]) for i in range(start, end) for j in range(i + 1, n)],
+        dtype=np.float64,
+    )
+
+
+def _ncdist_pairs(pairs: np.ndarray) -> np.ndarray:
+    """Calculate the distances for an (m, 2) array of index pairs."""
+    g6 = _worker_g6_cells
+    return np.array([NCDist(g6[i], g6[j]) for i, j in pairs], dtype=np.float64)
+
+
+def _row_blocks(n: int, n_blocks: int) -> list[tuple[int, int]]:
+    """Split the rows of a condensed distance matrix into blocks containing
+    approximately equal numbers of pairs."""
+    pairs_per_row = np.arange(n - 1, -1, -1)
+    cumulative = np.cumsum(pairs_per_row)
+    targets = np.linspace(0, cumulative[-1], n_blocks + 1)[1:-1]
+    bounds = np.unique(
+        np.concatenate([[0], np.searchsorted(cumulative, targets) + 1, [n]])
+    )
+    return [(int(s), int(e)) for s, e in zip(bounds[:-1], bounds[1:]) if e > s]
+
+
+def pairwise_ncdist(g6_cells: np.ndarray, nproc: int = 1) -> np.ndarray:
+    """
+    Calculate the condensed matrix of Andrews-Bernstein distances.
+
+    For nproc > 1 the rows of the condensed distance matrix are split into
+    blocks of similar numbers of pairs, which are calculated in a process pool.
+    The result is identical to ssd.pdist(g6_cells, metric=NCDist).
+    """
+    n = len(g6_cells)
+    if nproc <= 1 or n < 3:
+        return ssd.pdist(g6_cells, metric=NCDist)
+    # Use several blocks per process to balance the load between processes
+    blocks = _row_blocks(n, min(n - 1, 4 * nproc))
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=nproc, initializer=_init_ncdist_worker, initargs=(g6_cells,)
+    ) as pool:
+        return np.concatenate(list(pool.map(_ncdist_rows, blocks)))
+
+
+def _candidate_ncdist(
+    g6_cells: np.ndarray, pairs: np.ndarray, nproc: int = 1
+) -> np.ndarray:
+    if nproc <= 1 or len(pairs) < 2:
+        _init_ncdist_worker(g6_cells)
+        try:
+            return _ncdist_pairs(pairs)
+        finally:
+            _init_ncdist_worker(None)
+    chunks = np.array_split(pairs, min(len(pairs), 4 * nproc))
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=nproc, initializer=_init_ncdist_worker, initargs=(g6_cells,)
+    ) as pool:
+        return np.concatenate(list(pool.map(_ncdist_pairs, chunks)))
+
+
+def single_linkage_from_edges(
+    n: int,
+    edges: np.ndarray,
+    distances: np.ndarray,
+    disconnected_distance: float,
+) -> np.ndarray:
+    """
+    Construct a single-linkage matrix from a set of weighted edges.
+
+    This uses Kruskal's algorithm to find the minimum spanning forest of the
+    graph, which defines the single-linkage hierarchy. If the edges do not
+    connect all n observations, the remaining components are joined at
+    disconnected_distance, so that a complete linkage matrix is returned in the
+    same format as scipy.cluster.hierarchy.linkage.
+    """
+    parent = list(range(n))
+    cluster_id = list(range(n))
+    size = [1] * n
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def merge(root_i, root_j, distance, linkage):
+        id_i, id_j = sorted((cluster_id[root_i], cluster_id[root_j]))
+        linkage.append((id_i, id_j, distance, size[root_i] + size[root_j]))
+        if size[root_i] < size[root_j]:
+            root_i, root_j = root_j, root_i
+        parent[root_j] = root_i
+        size[root_i] += size[root_j]
+        cluster_id[root_i] = n + len(linkage) - 1
+
+    linkage: list[tuple[int, int, float, int]] = []
+    for k in np.argsort(distances, kind="stable"):
+        root_i, root_j = find(int(edges[k, 0])), find(int(edges[k, 1]))
+        if root_i != root_j:
+            merge(root_i, root_j, float(distances[k]), linkage)
+    if len(linkage) < n - 1:
+        roots = sorted({find(i) for i in range(n)})
+        for root in roots[1:]:
+            merge(find(roots[0]), root, disconnected_distance, linkage)
+    return np.array(linkage, dtype=np.float64).reshape(-1, 4)
+
+
+def approximate_single_linkage(
+    g6_cells: np.ndarray,
+    threshold: float,
+    n_neighbours: int = 20,
+    nproc: int = 1,
+) -> np.ndarray:
+    """
+    Approximate single-linkage clustering of G6 vectors.
+
+    Rather than calculating the Andrews-Bernstein distance between all pairs of
+    cells, only the n_neighbours nearest neighbours of each cell in Euclidean G6
+    space are considered as candidate edges. The Andrews-Bernstein distance is
+    calculated for the candidate edges only, and the linkage is constructed from
+    the minimum spanning forest of the resulting graph. Any clusters not
+    connected by a candidate edge are joined above the threshold, therefore the
+    dendrogram heights above the threshold are not meaningful.
+    """
+    n = len(g6_cells)
+    k = min(n_neighbours, n - 1)
+    _, neighbours = cKDTree(g6_cells).query(g6_cells, k=k + 1)
+    neighbours = neighbours.reshape(n, k + 1)
+    edges = np.column_stack([np.repeat(np.arange(n), k + 1), neighbours.ravel()])
+    edges = edges[edges[:, 0] != edges[:, 1]]
+    edges = np.unique(np.sort(edges, axis=1), axis=0)
+    logger.info(
+        "Calculating distances for %d candidate pairs of nearest neighbours",
+        len(edges),
+    )
+    distances = _candidate_ncdist(g6_cells, edges, nproc=nproc)
+    disconnected_distance = 2 * max(threshold, distances.max(initial=0))
+    return single_linkage_from_edges(n, edges, distances, disconnected_distance)
+
+
 def cluster_unit_cells(
     crystal_symmetries: list[crystal.symmetry],
     lattice_ids: Optional[list[int]] = None,
     threshold: int = 10000,
     ax: Optional["matplotlib.axes.Axes"] = None,
     no_plot: bool = True,
+    nproc: int = 1,
+    approximate: bool = False,
+    n_neighbours: int = 20,
 ) -> Optional[ClusteringResult]:
     if not lattice_ids:
         lattice_ids = list(range(len(crystal_symmetries)))
     cluster = Cluster(crystal_symmetries, lattice_ids)
-    uc = cluster.unit_cells
-
-    a = uc[:, 0] ** 2
-    b = uc[:, 1] ** 2
-    c = uc[:, 2] ** 2
-    d = 2 * uc[:, 1] * uc[:, 2] * np.cos(np.radians(uc[:, 3]))
-    e = 2 * uc[:, 0] * uc[:, 2] * np.cos(np.radians(uc[:, 4]))
-    f = 2 * uc[:, 0] * uc[:, 1] * np.cos(np.radians(uc[:, 5]))
-    g6_cells = np.array([a, b, c, d, e, f]).transpose()
+    g6_cells = g6_cells_from_unit_cells(cluster.unit_cells)
 
     logger.info(
         "Using Andrews-Bernstein distance from Andrews & Bernstein "
         "J Appl Cryst 47:346 (2014)"
     )
-    metric = NCDist
-    pair_distances = ssd.pdist(g6_cells, metric=metric)
-    if len(pair_distances) > 0:
-        logger.info("Distances have been calculated")
-        linkage_matrix = hierarchy.linkage(
-            pair_distances, method="single", metric=metric
-        )
+    if len(g6_cells) > 1:
+        if approximate:
+            linkage_matrix = approximate_single_linkage(
+                g6_cells, threshold, n_neighbours=n_neighbours, nproc=nproc
+            )
+        else:
+            pair_distances = pairwise_ncdist(g6_cells, nproc=nproc)
+            logger.info("Distances have been calculated")
+            linkage_matrix = hierarchy.linkage(
+                pair_distances, method="single", metric=NCDist
+            )
         cluster_ids = hierarchy.fcluster(
             linkage_matrix, threshold, criterion="distance"
         )
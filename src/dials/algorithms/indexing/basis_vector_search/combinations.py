@@ -3,15 +3,15 @@
 import logging
 import math
 
+import numpy as np
+
+from cctbx import sgtbx
 from cctbx.sgtbx.bravais_types import bravais_lattice
 from cctbx.uctbx.reduction_base import iteration_limit_exceeded
 from dxtbx.model import Crystal
 from scitbx.array_family import flex
 
 from dials.algorithms.indexing import DialsIndexError
-from dials.algorithms.indexing.compare_orientation_matrices import (
-    difference_rotation_matrix_axis_angle,
-)
 from dials.algorithms.indexing.symmetry import find_matching_symmetry
 
 logger = logging.getLogger(__name__)
@@ -153,19 +153,48 @@ def filter_known_symmetry(
         )
 
 
+def _symmetry_equivalent_orientations(crystal):
+    """Return the U matrices of a crystal model in each of the settings related by
+    the proper rotations of its Laue group, as an array of shape (n, 3, 3)."""
+    matrices = []
+    for op in crystal.get_space_group().build_derived_laue_group().all_ops():
+        if op.r().determinant() < 0 or not op.t().is_zero():
+            continue
+        cb_op = sgtbx.change_of_basis_op(op.inverse())
+        matrices.append(crystal.change_basis(cb_op).get_U())
+    return np.array(matrices).reshape(-1, 3, 3)
+
+
 def filter_similar_orientations(
     crystal_models, other_crystal_models, minimum_angular_separation=5
 ):
+    """Filter out crystal models with an orientation too similar to another model.
+
+    The misorientation between two models is the smallest rotation angle of
+    U_b U_a^T over the symmetry-equivalent settings of model b, as given by
+    difference_rotation_matrix_axis_angle. It is computed here for all the other
+    models and settings at once from the traces of these rotation matrices.
+
+    Args:
+        crystal_models: An iterable of candidate :class:`dxtbx.model.Crystal`
+            models.
+        other_crystal_models: The crystal models to compare against.
+        minimum_angular_separation (float): The misorientation (in degrees) below
+            which a candidate model is rejected.
+
+    Yields:
+        The candidate models that are not too similar to any of the other models.
+    """
+    other_U = np.array([c.get_U() for c in other_crystal_models]).reshape(-1, 3, 3)
+    # The rotation angle theta of a rotation matrix R satisfies
+    # trace(R) = 1 + 2 cos(theta)
+    min_trace = 1 + 2 * math.cos(math.radians(minimum_angular_separation))
     for cryst in crystal_models:
-        orientation_too_similar = False
-        for cryst_a in other_crystal_models:
-            R_ab, axis, angle, cb_op_ab = difference_rotation_matrix_axis_angle(
-                cryst_a, cryst
-            )
-            if abs(angle) < minimum_angular_separation:  # degrees
-                orientation_too_similar = True
-                break
-        if orientation_too_similar:
+        # trace(U_b U_a^T) is the elementwise product of U_b and U_a, summed
+        traces = np.einsum(
+            "oij,kij->ok", _symmetry_equivalent_orientations(cryst), other_U
+        )
+        if (traces > min_trace).any():
             logger.debug("skipping crystal: too similar to other crystals")
             continue
         yield cryst
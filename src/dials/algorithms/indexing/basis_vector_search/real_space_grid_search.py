@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import concurrent.futures
 import logging
 import math
 
+import numpy as np
+
+from dxtbx import flumpy
 from libtbx import phil
 from rstbx.array_family import (
     flex,  # required to load scitbx::af::shared<rstbx::Direction> to_python converter
@@ -24,8 +28,22 @@
 max_vectors = 30
     .help = "The maximum number of unique vectors to find in the grid search."
     .type = int(value_min=3)
+nthreads = 1
+    .help = "The number of threads used to score the search vectors."
+    .type = int(value_min=1)
+    .expert_level = 2
 """
 
+# Upper limit on the number of elements of the (search vectors x reciprocal
+# lattice vectors) matrix evaluated at once by each thread
+_SCORE_BLOCK_ELEMENTS = 2**22
+
+
+def _score_block(vectors, reciprocal_lattice_vectors):
+    """Compute the functional for a block of vectors as numpy arrays."""
+    two_pi_S_dot_v = 2 * np.pi * (vectors @ reciprocal_lattice_vectors.T)
+    return np.cos(two_pi_S_dot_v).sum(axis=1)
+
 
 class RealSpaceGridSearch(Strategy):
     """
@@ -117,13 +135,25 @@ def score_vectors(self, reciprocal_lattice_vectors):
         Returns:
             A tuple containing the list of search vectors and their scores.
         """
-        vectors = flex.vec3_double()
-        scores = flex.double()
-        for i, v in enumerate(self.search_vectors):
-            f = self.compute_functional(v.elems, reciprocal_lattice_vectors)
-            vectors.append(v.elems)
-            scores.append(f)
-        return vectors, scores
+        vectors = flex.vec3_double([v.elems for v in self.search_vectors])
+        vectors_np = flumpy.to_numpy(vectors)
+        rlp = flumpy.to_numpy(reciprocal_lattice_vectors)
+
+        # Evaluate the functional as a matrix product over blocks of vectors, to
+        # bound the memory used
+        block_size = max(1, _SCORE_BLOCK_ELEMENTS // max(1, len(rlp)))
+        blocks = [
+            vectors_np[i : i + block_size]
+            for i in range(0, len(vectors_np), block_size)
+        ]
+        if self._params.nthreads > 1 and len(blocks) > 1:
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=self._params.nthreads
+            ) as pool:
+                scores = list(pool.map(lambda b: _score_block(b, rlp), blocks))
+        else:
+            scores = [_score_block(b, rlp) for b in blocks]
+        return vectors, flumpy.from_numpy(np.concatenate(scores))
 
     def find_basis_vectors(self, reciprocal_lattice_vectors):
         """Find a list of likely basis vectors.
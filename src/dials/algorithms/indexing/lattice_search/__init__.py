@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import collections
+import concurrent.futures
+import contextlib
 import itertools
 import logging
 import math
+import multiprocessing
 from io import StringIO
 
 import pkg_resources
@@ -66,6 +70,19 @@
         rmsd_weight = 1
             .type = float(value_min=0)
     }
+    early_stop
+        .expert_level = 2
+    {
+        fraction_indexed = None
+            .type = float(value_min=0, value_max=1)
+            .help = "Stop testing candidate models once a model indexes at least"
+                    "this fraction of the reflections (and meets rmsd_xy, if set)."
+        rmsd_xy = None
+            .type = float(value_min=0)
+            .help = "Stop testing candidate models once a model has a positional"
+                    "RMSD (mm) no greater than this (and meets fraction_indexed,"
+                    "if set)."
+    }
 }
 
 method = None
@@ -107,6 +124,21 @@
 )
 
 
+# The lattice search copied into each process of the candidate evaluation pool,
+# with the reflections and model evaluator shared by all candidates
+_worker_state = None
+
+
+def _init_candidate_worker(search, reflections, evaluator):
+    global _worker_state
+    _worker_state = (search, reflections, evaluator)
+
+
+def _evaluate_candidate_in_worker(crystal_model):
+    search, reflections, evaluator = _worker_state
+    return search._evaluate_candidate(crystal_model, reflections, evaluator)
+
+
 class LatticeSearch(indexer.Indexer):
     def __init__(self, reflections, experiments, params):
         super().__init__(reflections, experiments, params)
@@ -182,103 +214,45 @@ def choose_best_orientation_matrix(self, candidate_orientation_matrices):
                 n_indexed_cutoff=filter_params.n_indexed_cutoff,
             )
 
-        args = []
-
-        for cm in candidate_orientation_matrices:
-            sel = self.reflections["id"] == -1
-            if self.d_min is not None:
-                sel &= 1 / self.reflections["rlp"].norms() > self.d_min
-            xo, yo, zo = self.reflections["xyzobs.mm.value"].parts()
-            imageset_id = self.reflections["imageset_id"]
-            experiments = ExperimentList()
-            for i_expt, expt in enumerate(self.experiments):
-                # XXX Not sure if we still need this loop over self.experiments
-                if expt.scan is not None:
-                    start, end = expt.scan.get_oscillation_range()
-                    if (end - start) > 360:
-                        # only use reflections from the first 360 degrees of the scan
-                        sel.set_selected(
-                            (imageset_id == i_expt)
-                            & (zo > ((start * math.pi / 180) + 2 * math.pi)),
-                            False,
-                        )
-                experiments.append(
-                    Experiment(
-                        imageset=expt.imageset,
-                        beam=expt.beam,
-                        detector=expt.detector,
-                        goniometer=expt.goniometer,
-                        scan=expt.scan,
-                        crystal=cm,
+        sel = self.reflections["id"] == -1
+        if self.d_min is not None:
+            sel &= 1 / self.reflections["rlp"].norms() > self.d_min
+        zo = self.reflections["xyzobs.mm.value"].parts()[2]
+        imageset_id = self.reflections["imageset_id"]
+        for i_expt, expt in enumerate(self.experiments):
+            # XXX Not sure if we still need this loop over self.experiments
+            if expt.scan is not None:
+                start, end = expt.scan.get_oscillation_range()
+                if (end - start) > 360:
+                    # only use reflections from the first 360 degrees of the scan
+                    sel.set_selected(
+                        (imageset_id == i_expt)
+                        & (zo > ((start * math.pi / 180) + 2 * math.pi)),
+                        False,
                     )
-                )
-            refl = self.reflections.select(sel)
-            self.index_reflections(experiments, refl)
-            if refl.get_flags(refl.flags.indexed).count(True) == 0:
-                continue
-
-            from rstbx.dps_core.cell_assessment import SmallUnitCellVolume
-
-            from dials.algorithms.indexing import non_primitive_basis
+        reflections = self.reflections.select(sel)
 
-            threshold = self.params.basis_vector_combinations.sys_absent_threshold
-            if threshold and (
-                self._symmetry_handler.target_symmetry_primitive is None
-                or self._symmetry_handler.target_symmetry_primitive.unit_cell() is None
-            ):
-                try:
-                    non_primitive_basis.correct(
-                        experiments, refl, self._assign_indices, threshold
-                    )
-                    if refl.get_flags(refl.flags.indexed).count(True) == 0:
-                        continue
-                except SmallUnitCellVolume:
-                    logger.debug(
-                        "correct_non_primitive_basis SmallUnitCellVolume error for unit cell %s:",
-                        experiments[0].crystal.get_unit_cell(),
-                    )
+        evaluator = model_evaluation.ModelEvaluation(self.all_params)
+        max_refine = self.params.basis_vector_combinations.max_refine
+        early_stop = self.params.basis_vector_combinations.early_stop
+        n_tested = 0
+        results = self._evaluate_candidates(
+            candidate_orientation_matrices, reflections, evaluator
+        )
+        with contextlib.closing(results):
+            for tested, soln in results:
+                if not tested:
                     continue
-                except RuntimeError as e:
-                    if "Krivy-Gruber iteration limit exceeded" in str(e):
+                n_tested += 1
+                if soln is not None:
+                    solutions.append(soln)
+                    if _dominates(soln, early_stop):
                         logger.debug(
-                            "correct_non_primitive_basis Krivy-Gruber iteration limit exceeded error for unit cell %s:",
-                            experiments[0].crystal.get_unit_cell(),
+                            "Stopping candidate evaluation after %d models", n_tested
                         )
-                        continue
-                    raise
-                if (
-                    experiments[0].crystal.get_unit_cell().volume()
-                    < self.params.min_cell_volume
-                ):
-                    continue
-
-            if self.params.known_symmetry.space_group is not None:
-                new_crystal, _ = self._symmetry_handler.apply_symmetry(
-                    experiments[0].crystal
-                )
-                if new_crystal is None:
-                    continue
-                experiments[0].crystal.update(new_crystal)
-
-            args.append((experiments, refl))
-            if len(args) == self.params.basis_vector_combinations.max_refine:
-                break
-
-        from libtbx import easy_mp
-
-        evaluator = model_evaluation.ModelEvaluation(self.all_params)
-        results = easy_mp.parallel_map(
-            evaluator.evaluate,
-            args,
-            iterable_type=easy_mp.posiargs,
-            processes=self.params.nproc,
-            preserve_exception_message=True,
-        )
-
-        for soln in results:
-            if soln is None:
-                continue
-            solutions.append(soln)
+                        break
+                if n_tested == max_refine:
+                    break
 
         if len(solutions):
             logger.info("Candidate solutions:")
@@ -291,6 +265,131 @@ def choose_best_orientation_matrix(self, candidate_orientation_matrices):
         else:
             return None, None
 
+    def _evaluate_candidates(
+        self, candidate_orientation_matrices, reflections, evaluator
+    ):
+        """Evaluate the candidate models in order, yielding tuples (tested, solution)
+        where tested is False if the model was rejected before evaluation.
+
+        With nproc > 1 the candidates are streamed to a pool of processes, forked
+        once so that each holds the reflections, and only the crystal models and
+        results are sent between processes. Closing the generator early cancels
+        the outstanding candidates."""
+
+        if (
+            self.params.nproc == 1
+            or "fork" not in multiprocessing.get_all_start_methods()
+        ):
+            for cm in candidate_orientation_matrices:
+                yield self._evaluate_candidate(cm, reflections, evaluator)
+            return
+
+        candidates = iter(candidate_orientation_matrices)
+        pool = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.params.nproc,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_candidate_worker,
+            initargs=(self, reflections, evaluator),
+        )
+        try:
+            pending = collections.deque()
+            while True:
+                # Keep enough candidates queued to occupy every process
+                for cm in itertools.islice(
+                    candidates, 2 * self.params.nproc - len(pending)
+                ):
+                    pending.append(pool.submit(_evaluate_candidate_in_worker, cm))
+                if not pending:
+                    break
+                yield pending.popleft().result()
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+    def _evaluate_candidate(self, crystal_model, reflections, evaluator):
+        """Index the reflections with a candidate model and evaluate the result.
+
+        Returns:
+            A tuple (tested, solution), where tested is False if the candidate was
+            rejected before evaluation, and solution is None if evaluation failed.
+        """
+        experiments = ExperimentList()
+        for expt in self.experiments:
+            experiments.append(
+                Experiment(
+                    imageset=expt.imageset,
+                    beam=expt.beam,
+                    detector=expt.detector,
+                    goniometer=expt.goniometer,
+                    scan=expt.scan,
+                    crystal=crystal_model,
+                )
+            )
+        refl = reflections.copy()
+        self.index_reflections(experiments, refl)
+        if refl.get_flags(refl.flags.indexed).count(True) == 0:
+            return False, None
+
+        from rstbx.dps_core.cell_assessment import SmallUnitCellVolume
+
+        from dials.algorithms.indexing import non_primitive_basis
+
+        threshold = self.params.basis_vector_combinations.sys_absent_threshold
+        if threshold and (
+            self._symmetry_handler.target_symmetry_primitive is None
+            or self._symmetry_handler.target_symmetry_primitive.unit_cell() is None
+        ):
+            try:
+                non_primitive_basis.correct(
+                    experiments, refl, self._assign_indices, threshold
+                )
+                if refl.get_flags(refl.flags.indexed).count(True) == 0:
+                    return False, None
+            except SmallUnitCellVolume:
+                logger.debug(
+                    "correct_non_primitive_basis SmallUnitCellVolume error for unit cell %s:",
+                    experiments[0].crystal.get_unit_cell(),
+                )
+                return False, None
+            except RuntimeError as e:
+                if "Krivy-Gruber iteration limit exceeded" in str(e):
+                    logger.debug(
+                        "correct_non_primitive_basis Krivy-Gruber iteration limit exceeded error for unit cell %s:",
+                        experiments[0].crystal.get_unit_cell(),
+                    )
+                    return False, None
+                raise
+            if (
+                experiments[0].crystal.get_unit_cell().volume()
+                < self.params.min_cell_volume
+            ):
+                return False, None
+
+        if self.params.known_symmetry.space_group is not None:
+            new_crystal, _ = self._symmetry_handler.apply_symmetry(
+                experiments[0].crystal
+            )
+            if new_crystal is None:
+                return False, None
+            experiments[0].crystal.update(new_crystal)
+
+        return True, evaluator.evaluate(experiments, refl)
+
+
+def _dominates(solution, early_stop):
+    """Test whether a solution meets the early stop criteria, if any are set"""
+    if early_stop.fraction_indexed is None and early_stop.rmsd_xy is None:
+        return False
+    if (
+        early_stop.fraction_indexed is not None
+        and solution.fraction_indexed < early_stop.fraction_indexed
+    ):
+        return False
+    if early_stop.rmsd_xy is not None:
+        rmsd_xy = math.sqrt(solution.rmsds[0] ** 2 + solution.rmsds[1] ** 2)
+        if rmsd_xy > early_stop.rmsd_xy:
+            return False
+    return True
+
 
 class BasisVectorSearch(LatticeSearch):
     def __init__(self, reflections, experiments, params):
@@ -7,8 +7,7 @@
 import pathlib
 import sys
 from dataclasses import dataclass, field
-from multiprocessing import Pool
-from typing import Any, List, Optional, Tuple, Union
+from typing import Any, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 
@@ -20,6 +19,7 @@
 from dials.algorithms.indexing.max_cell import find_max_cell
 from dials.array_family import flex
 from dials.util.combine_experiments import CombineWithReference
+from dials.util.mp import bounded_imap_unordered, ordered_results
 
 RAD2DEG = 180 / math.pi
 
@@ -148,7 +148,19 @@ def index_one(
             return idxr.refined_experiments, idxr.refined_reflections
 
 
+# The parameters are the same for every image, so when processing in parallel
+# they are set once per worker process rather than pickled with every input.
+_worker_parameters = None
+
+
+def _initialise_worker(parameters: phil.scope_extract) -> None:
+    global _worker_parameters
+    _worker_parameters = parameters
+
+
 def wrap_index_one(input_to_index: InputToIndex) -> IndexingResult:
+    if input_to_index.parameters is None:
+        input_to_index.parameters = _worker_parameters
     # First unpack the input and run the function
     expts, table = index_one(
         input_to_index.experiment,
@@ -215,39 +227,29 @@ def wrap_index_one(input_to_index: InputToIndex) -> IndexingResult:
     return result
 
 
-def index_all_concurrent(
+def _inputs_to_index(
     experiments: ExperimentList,
     reflections: List[flex.reflection_table],
-    params: phil.scope_extract,
+    params: Optional[phil.scope_extract],
     method_list: List[str],
-) -> Tuple[ExperimentList, flex.reflection_table, dict]:
-
-    input_iterable = []
-    results_summary = {
-        i: [] for i in range(len(experiments))
-    }  # create to give results in order
-
-    # Create a suitable iterable for passing to pool.map
+    results_summary: dict,
+) -> Iterator[InputToIndex]:
+    """Generate the inputs for indexing each image with spots, and record the
+    images that have already been filtered in the results summary."""
     n = 0
-    original_isets = list(experiments.imagesets())
-    identifiers_to_scans = {expt.identifier: expt.scan for expt in experiments}
     for n_iset, iset in enumerate(experiments.imagesets()):
         for i in range(len(iset)):
             refl_index = i + n
             if reflections[refl_index]:
                 expt = experiments[refl_index]
-                input_iterable.append(
-                    InputToIndex(
-                        reflection_table=reflections[refl_index],
-                        experiment=expt,
-                        parameters=params,
-                        image_identifier=pathlib.Path(
-                            iset.get_image_identifier(i)
-                        ).name,
-                        image_no=refl_index,
-                        method_list=method_list,
-                        imageset_no=n_iset,
-                    )
+                yield InputToIndex(
+                    reflection_table=reflections[refl_index],
+                    experiment=expt,
+                    parameters=params,
+                    image_identifier=pathlib.Path(iset.get_image_identifier(i)).name,
+                    image_no=refl_index,
+                    method_list=method_list,
+                    imageset_no=n_iset,
                 )
             else:  # experiments that have already been filtered
                 results_summary[refl_index].append(
@@ -259,6 +261,21 @@ def index_all_concurrent(
                 )
         n += len(iset)
 
+
+def index_all_concurrent(
+    experiments: ExperimentList,
+    reflections: List[flex.reflection_table],
+    params: phil.scope_extract,
+    method_list: List[str],
+) -> Tuple[ExperimentList, flex.reflection_table, dict]:
+
+    results_summary = {
+        i: [] for i in range(len(experiments))
+    }  # create to give results in order
+
+    original_isets = list(experiments.imagesets())
+    identifiers_to_scans = {expt.identifier: expt.scan for expt in experiments}
+
     with open(os.devnull, "w") as devnull:
         sys.stdout = devnull  # block printing from rstbx
         with manage_loggers(
@@ -267,31 +284,48 @@ def index_all_concurrent(
             debug_loggers_to_disable,
         ):
             if params.indexing.nproc > 1:
-                with Pool(params.indexing.nproc) as pool:
-                    results: List[IndexingResult] = pool.map(
-                        wrap_index_one, input_iterable
-                    )
+                # Stream the inputs through the pool, so that only a bounded
+                # number of inputs and results are held at any one time, and
+                # join the results in image order as they become available.
+                inputs = _inputs_to_index(
+                    experiments, reflections, None, method_list, results_summary
+                )
+                results = ordered_results(
+                    bounded_imap_unordered(
+                        wrap_index_one,
+                        inputs,
+                        params.indexing.nproc,
+                        initializer=_initialise_worker,
+                        initargs=(params,),
+                    ),
+                    keys=(i for i, refl in enumerate(reflections) if refl),
+                    key=lambda result: result.image_no,
+                )
             else:
-                results: List[IndexingResult] = [
-                    wrap_index_one(i) for i in input_iterable
-                ]
+                inputs = _inputs_to_index(
+                    experiments, reflections, params, method_list, results_summary
+                )
+                results = (wrap_index_one(i) for i in inputs)
+            # prepare tables for output
+            indexed_experiments, indexed_reflections = _join_indexing_results(
+                results,
+                experiments,
+                original_isets,
+                identifiers_to_scans,
+                results_summary,
+            )
 
     sys.stdout = sys.__stdout__
-    # prepare tables for output
-    indexed_experiments, indexed_reflections = _join_indexing_results(
-        results, experiments, original_isets, identifiers_to_scans
-    )
-
-    results_summary = _add_results_to_summary_dict(results_summary, results)
 
     return indexed_experiments, indexed_reflections, results_summary
 
 
 def _join_indexing_results(
-    results: List[IndexingResult],
+    results: Iterator[IndexingResult],
     experiments,
     original_isets,
     identifiers_to_scans,
+    results_summary: dict,
 ) -> Tuple[ExperimentList, flex.reflection_table]:
     indexed_experiments = ExperimentList()
     indexed_reflections = flex.reflection_table()
@@ -305,6 +339,7 @@ def _join_indexing_results(
 
     n_tot = 0
     for res in results:
+        _add_results_to_summary_dict(results_summary, [res])
         if res.n_indexed:
             identifier = res.unindexed_experiment.identifier
             scan = identifiers_to_scans[identifier]
@@ -16,11 +16,15 @@
 
 Result = collections.namedtuple(
     "Result",
-    "index, reflections, data, read_time, extract_time, process_time, total_time",
+    "index, reflections, data, read_time, extract_time, process_time, total_time, "
+    "cache_hits, cache_misses",
+    defaults=(0, 0),
 )
 #        :param index: The processing job index
 #        :param reflections: The processed reflections
 #        :param data: Other processed data
+#        :param cache_hits: Number of images taken from the decoded image cache
+#        :param cache_misses: Number of images read while the cache was enabled
 
 
 class TimingInfo:
@@ -36,6 +40,8 @@ def __init__(self):
         self.finalize = 0
         self.total = 0
         self.user = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     def __str__(self):
         """Convert to string."""
@@ -52,6 +58,14 @@ def __str__(self):
             )
             if value
         ]
+        lookups = self.cache_hits + self.cache_misses
+        if lookups:
+            rows.append(
+                [
+                    "Image cache hit rate",
+                    f"{100 * self.cache_hits / lookups:.1f}% ({self.cache_hits}/{lookups} images)",
+                ]
+            )
         return tabulate(rows)
 
     def __add__(self, other):
@@ -67,4 +81,6 @@ def __add__(self, other):
         new_timing.finalize = self.finalize + other.finalize
         new_timing.total = self.total + other.total
         new_timing.user = self.user + other.user
+        new_timing.cache_hits = self.cache_hits + other.cache_hits
+        new_timing.cache_misses = self.cache_misses + other.cache_misses
         return new_timing
@@ -7,6 +7,10 @@
 import pickle
 import random
 
+import numpy as np
+
+from dxtbx import flumpy
+
 import dials.extensions
 from dials.algorithms.integration import TimingInfo, processor
 from dials.algorithms.integration.filtering import IceRingFilter
@@ -68,7 +72,9 @@
     "ProfileModellerExecutor",
     "ProfileValidatorExecutor",
     "ReflectionManager",
+    "estimate_image_reads",
     "frame_hist",
+    "frame_ordered_split",
     "generate_phil_scope",
     "hist",
     "job",
@@ -119,6 +125,15 @@ def generate_phil_scope():
           .help = "The maximum percentage of available memory to use for"
                   "allocating shoebox arrays."
 
+        image_cache = False
+          .type = bool
+          .help = "Keep decoded images in memory so that frames shared by"
+                  "overlapping blocks, and by the profile modelling and"
+                  "integration passes, are only read once per process. The"
+                  "cache uses the part of max_memory_usage not needed for"
+                  "shoeboxes."
+          .expert_level = 2
+
       }
 
       use_dynamic_mask = True
@@ -407,6 +422,7 @@ def from_phil(params):
         block.threshold = params.block.threshold
         block.force = params.block.force
         block.max_memory_usage = params.block.max_memory_usage
+        block.image_cache = params.block.image_cache
 
         # Set the modelling processor parameters
         result.modelling.mp = mp
@@ -611,6 +627,121 @@ def _finalize_stills(reflections, experiments, params):
     return reflections, experiments
 
 
+def _imageset_indices(reflections, experiments):
+    """
+    Get the index into experiments.imagesets() of the imageset of each reflection.
+    """
+    imagesets = experiments.imagesets()
+    lookup = np.array(
+        [imagesets.index(experiment.imageset) for experiment in experiments]
+    )
+    return lookup[flumpy.to_numpy(reflections["id"])]
+
+
+def _range_max(values, start, stop):
+    """
+    Get the maximum of values[start[i]:stop[i]] for each i, with stop > start.
+    """
+    # Build a sparse table of maxima over windows of increasing powers of two
+    levels = [values]
+    width = 1
+    while 2 * width <= len(values):
+        previous = levels[-1]
+        levels.append(np.maximum(previous[:-width], previous[width:]))
+        width *= 2
+    level = np.floor(np.log2(stop - start)).astype(int)
+    result = np.empty(len(start), dtype=values.dtype)
+    for k, table in enumerate(levels):
+        sel = level == k
+        result[sel] = np.maximum(table[start[sel]], table[stop[sel] - (1 << k)])
+    return result
+
+
+def frame_ordered_split(reflections, experiments, available_memory, flatten=False):
+    """
+    Split reflections into subsets to reduce the shoebox memory needed.
+
+    The shoebox memory needed on each image is the total size of the shoeboxes
+    which include that image. Each reflection is only split as many ways as
+    the busiest image it covers requires: reflections are ordered by their
+    first image and dealt round robin into that many subsets. Images where the
+    shoeboxes already fit in memory are then only read by the first subset,
+    and the other subsets only need the images in the busiest frame ranges.
+
+    :param reflections: The reflections to split
+    :param experiments: The experiments
+    :param available_memory: The memory available for shoeboxes, in bytes
+    :param flatten: True if the shoeboxes will be flattened
+    :return: The list of reflection tables
+    """
+    x0, x1, y0, y1, z0, z1 = (flumpy.to_numpy(p) for p in reflections["bbox"].parts())
+    nbytes = (x1 - x0).astype(np.float64) * (y1 - y0)
+    if not flatten:
+        nbytes *= z1 - z0
+    # Two floats and an int per shoebox pixel
+    nbytes *= 12
+
+    imageset_index = _imageset_indices(reflections, experiments)
+    subset = np.zeros(len(reflections), dtype=int)
+    for i in np.unique(imageset_index):
+        (isel,) = np.nonzero(imageset_index == i)
+        first = z0[isel].min()
+        start = z0[isel] - first
+        stop = z1[isel] - first
+
+        # The shoebox memory needed on each image
+        memory = np.zeros(stop.max() + 1)
+        np.add.at(memory, start, nbytes[isel])
+        np.add.at(memory, stop, -nbytes[isel])
+        memory = np.cumsum(memory)[:-1]
+
+        num_subsets = np.ceil(_range_max(memory, start, stop) / available_memory)
+        num_subsets = np.maximum(num_subsets, 1).astype(int)
+        rank = np.empty(len(isel), dtype=int)
+        rank[np.argsort(start, kind="stable")] = np.arange(len(isel))
+        subset[isel] = rank % num_subsets
+
+    # Subsets of different imagesets are processed one imageset at a time, so
+    # can share a table
+    tables = []
+    for i in range(subset.max() + 1):
+        (isel,) = np.nonzero(subset == i)
+        if len(isel):
+            tables.append(reflections.select(flumpy.from_numpy(isel.astype(np.uint64))))
+    return tables
+
+
+def estimate_image_reads(tables, experiments):
+    """
+    Estimate the number of images read to process a list of reflection tables.
+
+    Each table is processed in a separate pass which reads, for each imageset,
+    the range of images covered by the reflections of that imageset.
+
+    :param tables: The list of reflection tables
+    :param experiments: The experiments
+    :return: The number of images read
+    """
+    imagesets = experiments.imagesets()
+    total = 0
+    for table in tables:
+        if not len(table):
+            continue
+        imageset_index = _imageset_indices(table, experiments)
+        z0, z1 = (flumpy.to_numpy(p) for p in table["bbox"].parts()[4:6])
+        for i in np.unique(imageset_index):
+            sel = imageset_index == i
+            scan = imagesets[i].get_scan()
+            if scan is None or scan.is_still():
+                array_range = (0, len(imagesets[i]))
+            else:
+                array_range = scan.get_array_range()
+            first = max(z0[sel].min(), array_range[0])
+            last = min(z1[sel].max(), array_range[1])
+            total += max(0, last - first)
+    return int(total)
+
+
 class ProfileModellerExecutor(Executor):
     """
     The class to do profile modelling calculations
@@ -1207,123 +1338,158 @@ def integrate(self):
         # Initialize the reflections
         self.initialize_reflections(self.experiments, self.params, self.reflections)
 
-        # Check if we want to do some profile fitting
-        profile_fitter = self.fit_profiles()
-
-        logger.info("=" * 80)
-        logger.info("")
-        logger.info(heading("Integrating reflections"))
-        logger.info("")
+        try:
+            # Check if we want to do some profile fitting
+            profile_fitter = self.fit_profiles()
 
-        # Create the data processor
-        executor = IntegratorExecutor(
-            self.experiments,
-            profile_fitter,
-            self.params.profile.valid_foreground_threshold,
-        )
+            logger.info("=" * 80)
+            logger.info("")
+            logger.info(heading("Integrating reflections"))
+            logger.info("")
 
-        # determine the max memory needed during integration
-        def _determine_max_memory_needed(experiments, reflections):
-            max_needed = 0
-            for imageset in experiments.imagesets():
-                # find all experiments belonging to that imageset, as each
-                # imageset is processed as a whole for integration.
-                if all(experiments.identifiers()):
-                    expt_ids = [
-                        experiment.identifier
-                        for experiment in experiments
-                        if experiment.imageset == imageset
-                    ]
-                    subset = reflections.select_on_experiment_identifiers(expt_ids)
-                else:
-                    subset = flex.reflection_table()
-                    for j, experiment in enumerate(experiments):
-                        if experiment.imageset == imageset:
-                            subset.extend(reflections.select(reflections["id"] == j))
-                if not imageset.get_scan() or imageset.get_scan().is_still():
-                    frame0, frame1 = (0, len(imageset))
-                else:
-                    frame0, frame1 = imageset.get_scan().get_array_range()
-                flatten = self.params.integration.integrator == "flat3d"
-                max_needed = max(
-                    max_memory_needed(subset, frame0, frame1, flatten),
-                    max_needed,
-                )
-            assert max_needed > 0, "Could not determine memory requirements"
-            return max_needed
-
-        def _iterative_table_split(tables, experiments, available_memory):
-            split_tables = []
-            for table in tables:
-                mem_needed = _determine_max_memory_needed(experiments, table)
-                if mem_needed > available_memory:
-                    n_to_split = int(math.ceil(mem_needed / available_memory))
-                    flex.set_random_seed(0)
-                    split_tables.extend(table.random_split(n_to_split))
-                else:
-                    split_tables.append(table)
-            if len(split_tables) == len(tables):
-                # nothing was split, all passed memory check
-                return split_tables
-            # some tables were split - so need to check again that all are ok
-            return _iterative_table_split(split_tables, experiments, available_memory)
-
-        def _run_processor(reflections):
-            processor = build_processor(
-                self.ProcessorClass,
+            # Create the data processor
+            executor = IntegratorExecutor(
                 self.experiments,
-                reflections,
-                self.params.integration,
-            )
-            processor.executor = executor
-            # Process the reflections
-            reflections, _, time_info = processor.process()
-            return reflections, time_info
-
-        if self.params.integration.mp.method != "multiprocessing":
-            self.reflections, time_info = _run_processor(self.reflections)
-        else:
-            # need to do a memory check and decide whether to split table
-            available_immediate, _, __ = assess_available_memory(
-                self.params.integration
+                profile_fitter,
+                self.params.profile.valid_foreground_threshold,
             )
 
-            #  here don't consider nproc as the processor will reduce nproc to 1
-            # if necessary, only want to split if we can't even process with
-            # nproc = 1
-
-            if self.params.integration.mp.n_subset_split:
-                tables = self.reflections.random_split(
-                    self.params.integration.mp.n_subset_split
+            # determine the max memory needed during integration
+            def _determine_max_memory_needed(experiments, reflections):
+                max_needed = 0
+                for imageset in experiments.imagesets():
+                    # find all experiments belonging to that imageset, as each
+                    # imageset is processed as a whole for integration.
+                    if all(experiments.identifiers()):
+                        expt_ids = [
+                            experiment.identifier
+                            for experiment in experiments
+                            if experiment.imageset == imageset
+                        ]
+                        subset = reflections.select_on_experiment_identifiers(expt_ids)
+                    else:
+                        subset = flex.reflection_table()
+                        for j, experiment in enumerate(experiments):
+                            if experiment.imageset == imageset:
+                                subset.extend(
+                                    reflections.select(reflections["id"] == j)
+                                )
+                    if not imageset.get_scan() or imageset.get_scan().is_still():
+                        frame0, frame1 = (0, len(imageset))
+                    else:
+                        frame0, frame1 = imageset.get_scan().get_array_range()
+                    flatten = self.params.integration.integrator == "flat3d"
+                    max_needed = max(
+                        max_memory_needed(subset, frame0, frame1, flatten),
+                        max_needed,
+                    )
+                assert max_needed > 0, "Could not determine memory requirements"
+                return max_needed
+
+            def _iterative_table_split(tables, experiments, available_memory):
+                split_tables = []
+                for table in tables:
+                    mem_needed = _determine_max_memory_needed(experiments, table)
+                    if mem_needed > available_memory:
+                        split_tables.extend(
+                            frame_ordered_split(
+                                table,
+                                experiments,
+                                available_memory,
+                                flatten=self.params.integration.integrator == "flat3d",
+                            )
+                        )
+                    else:
+                        split_tables.append(table)
+                if len(split_tables) == len(tables):
+                    # nothing was split, all passed memory check
+                    return split_tables
+                # some tables were split - so need to check again that all are ok
+                return _iterative_table_split(
+                    split_tables, experiments, available_memory
                 )
-            else:
-                tables = _iterative_table_split(
-                    [self.reflections],
+
+            def _run_processor(reflections, limit_frame_range=False):
+                processor = build_processor(
+                    self.ProcessorClass,
                     self.experiments,
-                    available_immediate,
+                    reflections,
+                    self.params.integration,
                 )
+                processor.executor = executor
+                processor.manager.limit_frame_range = limit_frame_range
+                # Process the reflections
+                reflections, _, time_info = processor.process()
+                return reflections, time_info
 
-            if len(tables) == 1:
-                # will not fail a memory check in the processor, so proceed
+            if self.params.integration.mp.method != "multiprocessing":
                 self.reflections, time_info = _run_processor(self.reflections)
             else:
-                # Split the reflections and process by performing multiple
-                # passes over each imageset
-                time_info = TimingInfo()
-                reflections = flex.reflection_table()
-
-                logger.info(
-                    """Predicted maximum memory needed exceeds available memory.
-Splitting reflection table into %s subsets for processing
-""",
-                    len(tables),
+                # need to do a memory check and decide whether to split table
+                available_immediate, _, __ = assess_available_memory(
+                    self.params.integration
                 )
-                for i, table in enumerate(tables):
-                    logger.info("Processing subset %s of reflection table", i + 1)
-                    processed, this_time_info = _run_processor(table)
-                    reflections.extend(processed)
-                    time_info += this_time_info
-                self.reflections = reflections
+
+                #  here don't consider nproc as the processor will reduce nproc to 1
+                # if necessary, only want to split if we can't even process with
+                # nproc = 1
+
+                if self.params.integration.mp.n_subset_split:
+                    tables = self.reflections.random_split(
+                        self.params.integration.mp.n_subset_split
+                    )
+                else:
+                    tables = _iterative_table_split(
+                        [self.reflections],
+                        self.experiments,
+                        available_immediate,
+                    )
+
+                if len(tables) == 1:
+                    # will not fail a memory check in the processor, so proceed
+                    self.reflections, time_info = _run_processor(self.reflections)
+                else:
+                    # Split the reflections and process by performing multiple
+                    # passes over each imageset
+                    time_info = TimingInfo()
+                    reflections = flex.reflection_table()
+
+                    logger.info(
+                        """Predicted maximum memory needed exceeds available memory.
+    Splitting reflection table into %s subsets for processing
+    """,
+                        len(tables),
+                    )
+                    if not self.params.integration.mp.n_subset_split:
+                        num_random = int(
+                            math.ceil(
+                                _determine_max_memory_needed(
+                                    self.experiments, self.reflections
+                                )
+                                / available_immediate
+                            )
+                        )
+                        logger.info(
+                            "Estimated image reads: %d (%d with %d random subsets)\n",
+                            estimate_image_reads(tables, self.experiments),
+                            num_random
+                            * estimate_image_reads(
+                                [self.reflections], self.experiments
+                            ),
+                            num_random,
+                        )
+                    for i, table in enumerate(tables):
+                        logger.info("Processing subset %s of reflection table", i + 1)
+                        processed, this_time_info = _run_processor(
+                            table,
+                            limit_frame_range=not self.params.integration.mp.n_subset_split,
+                        )
+                        reflections.extend(processed)
+                        time_info += this_time_info
+                    self.reflections = reflections
+        finally:
+            # Release any decoded images held since profile modelling
+            processor.image_cache.clear()
 
         # Finalize the reflections
         self.reflections, self.experiments = self.finalize_reflections(
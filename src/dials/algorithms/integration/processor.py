@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import collections
 import itertools
 import logging
 import math
@@ -44,6 +45,8 @@
     "Executor",
     "Group",
     "GroupList",
+    "ImageCache",
+    "image_cache",
     "Job",
     "job",
     "JobList",
@@ -179,6 +182,74 @@ def __init__(self):
 job = _Job()
 
 
+class ImageCache:
+    """
+    A least-recently-used cache of decoded images and masks.
+
+    Blocks overlap by a number of frames and the same frames are read again for
+    profile modelling and integration, so keeping recently decoded images
+    avoids decompressing them more than once within a process.
+    """
+
+    def __init__(self, max_bytes=0):
+        """
+        Initialise the cache
+
+        :param max_bytes: The maximum number of bytes of image data to hold
+        """
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = collections.OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def resize(self, max_bytes):
+        """
+        Set the maximum size of the cache, evicting images if necessary
+
+        :param max_bytes: The maximum number of bytes of image data to hold
+        """
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def clear(self):
+        """
+        Remove all images from the cache
+        """
+        self._entries.clear()
+        self.nbytes = 0
+
+    def get(self, key, read):
+        """
+        Get an item from the cache, reading it on a miss
+
+        :param key: The key identifying the image
+        :param read: A callable returning a tuple (image, mask)
+        :return: A tuple (item, hit)
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry[0], True
+        item = read()
+        nbytes = sum(8 * im.size() for im in item[0]) + sum(m.size() for m in item[1])
+        if nbytes <= self.max_bytes:
+            self._entries[key] = (item, nbytes)
+            self.nbytes += nbytes
+            self._evict()
+        return item, False
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes:
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self.nbytes -= nbytes
+
+
+# The decoded image cache for this process
+image_cache = ImageCache()
+
+
 class MultiProcessing:
     """
     Multi processing parameters
@@ -222,6 +293,7 @@ def __init__(self):
         self.threshold = 0.99
         self.force = False
         self.max_memory_usage = 0.90
+        self.image_cache = False
 
     def update(self, other):
         self.size = other.size
@@ -229,6 +301,7 @@ def update(self, other):
         self.threshold = other.threshold
         self.force = other.force
         self.max_memory_usage = other.max_memory_usage
+        self.image_cache = other.image_cache
 
 
 class Shoebox:
@@ -452,7 +525,16 @@ class Task:
     A class to perform a processing task.
     """
 
-    def __init__(self, index, job, experiments, reflections, params, executor=None):
+    def __init__(
+        self,
+        index,
+        job,
+        experiments,
+        reflections,
+        params,
+        executor=None,
+        image_cache_size=0,
+    ):
         """
         Initialise the task.
 
@@ -463,6 +545,7 @@ def __init__(self, index, job, experiments, reflections, params, executor=None):
         :param job: The frames to integrate
         :param flatten: Flatten the shoeboxes
         :param executor: The executor class
+        :param image_cache_size: The number of bytes of decoded images to cache
         """
         assert executor is not None, "No executor given"
         assert len(reflections) > 0, "Zero reflections given"
@@ -472,6 +555,7 @@ def __init__(self, index, job, experiments, reflections, params, executor=None):
         self.reflections = reflections
         self.params = params
         self.executor = executor
+        self.image_cache_size = image_cache_size
 
     def __call__(self):
         """
@@ -546,15 +630,34 @@ def __call__(self):
             self.params.debug.output,
         )
 
-        # Loop through the imageset, extract pixels and process reflections
-        read_time = 0.0
-        for i in range(len(imageset)):
-            st = time()
+        def read_image(i):
             image = imageset.get_corrected_data(i)
             if imageset.is_marked_for_rejection(i):
                 mask = tuple(flex.bool(im.accessor(), False) for im in image)
             else:
                 mask = imageset.get_mask(i)
+            return image, mask
+
+        if self.image_cache_size > 0:
+            image_cache.resize(self.image_cache_size)
+            indices = imageset.indices()
+
+        # Loop through the imageset, extract pixels and process reflections
+        read_time = 0.0
+        cache_hits = 0
+        cache_misses = 0
+        for i in range(len(imageset)):
+            st = time()
+            if self.image_cache_size > 0:
+                key = (imageset.get_path(i), indices[i])
+                (image, mask), hit = image_cache.get(key, lambda: read_image(i))
+                if hit:
+                    cache_hits += 1
+                else:
+                    cache_misses += 1
+            else:
+                image, mask = read_image(i)
+            if not imageset.is_marked_for_rejection(i):
                 if self.params.lookup.mask is not None:
                     assert len(mask) == len(
                         self.params.lookup.mask
@@ -601,6 +704,8 @@ def __call__(self):
             extract_time=processor.extract_time(),
             process_time=processor.process_time(),
             total_time=time() - start_time,
+            cache_hits=cache_hits,
+            cache_misses=cache_misses,
         )
 
 
@@ -637,6 +742,13 @@ def __init__(self, experiments, reflections, params):
         # Initialise the timing information
         self.time = dials.algorithms.integration.TimingInfo()
 
+        # The number of bytes of decoded images each process may cache
+        self.image_cache_size = 0
+
+        # Limit the jobs to the images covered by the reflections, set for the
+        # subsets of a reflection table split by frame to reduce memory use
+        self.limit_frame_range = False
+
     def initialize(self):
         """
         Initialise the processing
@@ -685,6 +797,7 @@ def task(self, index):
                 reflections=reflections,
                 params=self.params,
                 executor=self.executor,
+                image_cache_size=self.image_cache_size,
             )
         return task
 
@@ -703,6 +816,8 @@ def accumulate(self, result):
         self.time.extract += result.extract_time
         self.time.process += result.process_time
         self.time.total += result.total_time
+        self.time.cache_hits += result.cache_hits
+        self.time.cache_misses += result.cache_misses
 
     def finalize(self):
         """
@@ -783,6 +898,19 @@ def compute_jobs(self):
                 assert len(imgs) >= len(scan), "Invalid scan range"
                 array_range = scan.get_array_range()
 
+            # Only read the images covered by the reflections of a subset of a
+            # sweep split by frame to reduce memory use
+            if self.limit_frame_range:
+                selection = (self.reflections["id"] >= i0) & (
+                    self.reflections["id"] < i1
+                )
+                if selection.count(True) > 0:
+                    z0, z1 = self.reflections["bbox"].select(selection).parts()[4:6]
+                    first = max(array_range[0], flex.min(z0))
+                    last = min(array_range[1], flex.max(z1))
+                    if last > first:
+                        array_range = (first, last)
+
             if self.params.block.size is None:
                 block_size_frames = array_range[1] - array_range[0]
             elif self.params.block.size == libtbx.Auto:
@@ -925,6 +1053,22 @@ def compute_processors(self):
                 % _average_bbox_size(self.reflections)
             )
 
+        # Optionally give the memory not needed for shoeboxes to the image cache
+        if self.params.block.image_cache:
+            nproc = self.params.mp.nproc
+            if self.params.mp.method != "multiprocessing":
+                nproc = 1
+            self.image_cache_size = int(
+                max(
+                    0,
+                    available_immediate_limit / nproc - memory_required_per_process,
+                )
+            )
+            logger.info(
+                "Caching up to %.1f GB of decoded images per process\n",
+                self.image_cache_size / 1e9,
+            )
+
     def summary(self):
         """
         Get a summary of the processing
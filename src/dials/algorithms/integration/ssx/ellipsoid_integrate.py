@@ -146,7 +146,12 @@ def run(self, experiment, table):
         # do we want to add unmatched i.e. strong spots which weren't predicted?
         self.collector.collect_after_prediction(predicted, table)
 
-        predicted = self.integrate(experiment, predicted, sigma_d)
+        predicted = self.integrate(
+            experiment,
+            predicted,
+            sigma_d,
+            nthreads=self.params.integration.mp.nproc,
+        )
         self.collector.collect_after_integration(experiment, predicted)
 
         return experiment, predicted, self.collector
@@ -171,7 +176,11 @@ def preprocess(experiment, reflection_table, params):
                     params.profile.ellipsoid.refinement.min_n_reflections,
                 )
             )
-        reference, sigma_d = initial_integrator(ExperimentList([experiment]), reference)
+        reference, sigma_d = initial_integrator(
+            ExperimentList([experiment]),
+            reference,
+            nthreads=params.integration.mp.nproc,
+        )
 
         return reference, sigma_d
 
@@ -230,11 +239,12 @@ def predict(
         return reflection_table
 
     @staticmethod
-    def integrate(experiment, reflection_table, sigma_d):
+    def integrate(experiment, reflection_table, sigma_d, nthreads=1):
         reflection_table = final_integrator(
             ExperimentList([experiment]),
             reflection_table,
             sigma_d,
+            nthreads=nthreads,
         )
         return reflection_table
 
@@ -89,7 +89,9 @@ def integrate(experiments, table, params):
         _initialize_stills(experiments, _params, table)
 
         table["shoebox"] = flex.shoebox(table["panel"], table["bbox"], allocate=True)
-        table.extract_shoeboxes(experiments[0].imageset)
+        table.extract_shoeboxes(
+            experiments[0].imageset, nthreads=params.integration.mp.nproc
+        )
 
         # From integratorexecutor
         table.is_overloaded(experiments)
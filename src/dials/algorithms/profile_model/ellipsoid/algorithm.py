@@ -157,7 +157,7 @@ def _compute_mask(
                             mask_new[0, jj, ii] |= (1 << 2) | (1 << 3)
 
 
-def initial_integrator(experiments, reflection_table):
+def initial_integrator(experiments, reflection_table, nthreads=1):
     """Performs an initial integration of strong spots"""
 
     # some functions require an experimentlist, others just the experiment
@@ -182,7 +182,7 @@ def initial_integrator(experiments, reflection_table):
     strong_refls["shoebox"] = flex.shoebox(
         strong_refls["panel"], strong_refls["bbox"], allocate=True
     )
-    strong_refls.extract_shoeboxes(experiment.imageset)
+    strong_refls.extract_shoeboxes(experiment.imageset, nthreads=nthreads)
     reflection_table.is_overloaded(experiments)
     reflection_table.contains_invalid_pixels()
 
@@ -209,6 +209,7 @@ def final_integrator(
     sigma_d,
     use_crude_shoebox_mask=False,
     shoebox_probability=FULL_PARTIALITY,
+    nthreads=1,
 ):
     """Performs an initial integration of all predicted spots"""
 
@@ -241,7 +242,7 @@ def final_integrator(
     reflection_table["shoebox"] = flex.shoebox(
         reflection_table["panel"], reflection_table["bbox"], allocate=True
     )
-    reflection_table.extract_shoeboxes(experiment.imageset)
+    reflection_table.extract_shoeboxes(experiment.imageset, nthreads=nthreads)
 
     reflection_table.is_overloaded(experiments)
     reflection_table.contains_invalid_pixels()
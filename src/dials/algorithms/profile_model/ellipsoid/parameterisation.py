@@ -988,6 +988,155 @@ def get_dL_dp(self) -> flex.double:
         return self._dl_dp
 
 
+class BatchReflectionModelState(object):
+    """
+    Class to compute basic derivatives of Sigma and r w.r.t parameters for an
+    array of reflections at once. This is equivalent to a ReflectionModelState
+    for each reflection, with the per-reflection quantities stacked along the
+    first axis.
+
+    """
+
+    def __init__(self, state, s0, h):
+        """
+        Initialise with the state, the beam vector and an (n, 3) array of miller
+        indices, and compute derivatives
+
+        """
+        self._h = np.array(h, dtype=np.float64).reshape(-1, 3)
+        A = np.matmul(state.U_matrix, state.B_matrix)
+        self._r = np.einsum("ij,nj->ni", A, self._h)
+        s0 = np.array(s0, dtype=np.float64).flatten()
+        self._norm_s0 = s0 / norm(s0)
+
+        self.state = state
+        self._Q = None
+
+        n_params = 0
+        if not self.state.is_orientation_fixed:
+            n_params += len(self.state.U_params)
+        if not self.state.is_unit_cell_fixed:
+            n_params += len(self.state.B_params)
+        if not self.state.is_mosaic_spread_fixed:
+            n_params += len(self.state.M_params)
+        if not self.state.is_wavelength_spread_fixed:
+            n_params += len(self.state.L_params)
+
+        # The arrays of derivatives
+        n = self._h.shape[0]
+        self._dr_dp = np.zeros(shape=(n, 3, n_params), dtype=np.float64)
+        self._ds_dp = np.zeros(shape=(n, 3, 3, n_params), dtype=np.float64)
+
+        if self.state.is_mosaic_spread_angular:
+            self._recalc_Q()
+        self._recalc_sigma()
+        self.update()
+
+    def _recalc_Q(self):
+        # The rotation for the angular sigma components of each reflection
+        norm_r = self._r / norm(self._r, axis=1).reshape(-1, 1)
+        q1 = np.cross(norm_r, self._norm_s0)
+        q1 /= norm(q1, axis=1).reshape(-1, 1)
+        q2 = np.cross(norm_r, q1)
+        q2 /= norm(q2, axis=1).reshape(-1, 1)
+        self._Q = np.stack([q1, q2, norm_r], axis=1)
+
+    def _angular_scale(self):
+        # The diagonal of the matrix diag(|r|^2, |r|^2, 0) for each reflection
+        normr_sq = np.square(norm(self._r, axis=1))
+        return np.stack([normr_sq, normr_sq, np.zeros_like(normr_sq)], axis=1)
+
+    def _recalc_sigma(self):
+        # Compute the covariance matrices
+        MS = self.state._M_parameterisation.sigma()  # static sigma
+        n = self._h.shape[0]
+        if self.state.is_mosaic_spread_angular:
+            if (not self.state.is_orientation_fixed) or (
+                not self.state.is_unit_cell_fixed
+            ):
+                self._recalc_Q()
+            MA = self.state._M_parameterisation.sigma_A()
+            AMA = self._angular_scale()[:, :, np.newaxis] * MA
+            self._sigma = np.einsum("nji,njk,nkl->nil", self._Q, AMA, self._Q) + MS
+        else:
+            self._sigma = np.broadcast_to(MS, (n, 3, 3))
+
+    def update(self):
+        "Updates r, sigma, derivatives based on latest model state"
+
+        # Set the reciprocal lattice vectors
+        state = self.state
+        if (not state.is_orientation_fixed) or (not state.is_unit_cell_fixed):
+            A = np.matmul(state.U_matrix, state.B_matrix)
+            self._r = np.einsum("ij,nj->ni", A, self._h)
+        if not state.is_mosaic_spread_fixed:
+            self._recalc_sigma()
+
+        # Compute derivatives w.r.t U parameters
+        n_tot = 0
+        if not state.is_orientation_fixed:
+            dU_dp = state.dU_dp
+            n_U_params = dU_dp.shape[0]
+            dUBh = np.einsum("lij,jk,nk->nil", dU_dp, state.B_matrix, self._h)
+            self._dr_dp[:, :, n_tot : n_tot + n_U_params] = dUBh
+            n_tot += n_U_params
+
+        # Compute derivatives w.r.t B parameters
+        if not state.is_unit_cell_fixed:
+            dB_dp = state.dB_dp
+            n_B_params = dB_dp.shape[0]
+            UdBh = np.einsum("ij,ljk,nk->nil", state.U_matrix, dB_dp, self._h)
+            self._dr_dp[:, :, n_tot : n_tot + n_B_params] = UdBh
+            n_tot += n_B_params
+
+        # Compute derivatives w.r.t M parameters
+        if not state.is_mosaic_spread_fixed:
+            dM_dp = state.dM_dp
+            n_M_params = dM_dp.shape[0]
+            self._ds_dp[:, :, :, n_tot : n_tot + n_M_params] = np.transpose(
+                dM_dp, axes=(1, 2, 0)
+            )
+            n_tot += n_M_params
+            if state.is_mosaic_spread_angular:
+                # now add the derivative of the angular component
+                dM_dp_A = state.dM_dp_A
+                n_M_A_params = dM_dp_A.shape[0]
+                AdM = self._angular_scale()[:, np.newaxis, :, np.newaxis] * dM_dp_A
+                QTMQA = np.einsum("nji,nmjk,nkl->nilm", self._Q, AdM, self._Q)
+                self._ds_dp[:, :, :, n_tot : n_tot + n_M_A_params] = QTMQA
+                n_tot += n_M_A_params
+
+    @property
+    def mosaicity_covariance_matrix(self) -> np.array:
+        """
+        Return the covariance matrices (an array of size nx3x3)
+
+        """
+        return self._sigma
+
+    def get_r(self) -> np.array:
+        """
+        Return the reciprocal lattice vectors (an array of size nx3)
+
+        """
+        return self._r
+
+    def get_dS_dp(self) -> np.array:
+        """
+        Return the derivatives of the covariance matrices (an array of size nx3x3xp)
+
+        """
+        return self._ds_dp
+
+    def get_dr_dp(self) -> np.array:
+        """
+        Return the derivatives of the reciprocal lattice vectors (an array of
+        size nx3xp)
+
+        """
+        return self._dr_dp
+
+
 ## classes retained for backwards compatibility to enable loading of .expt files.
 
 
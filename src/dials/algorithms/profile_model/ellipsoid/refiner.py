@@ -15,8 +15,10 @@
 from dials.algorithms.profile_model.ellipsoid import mosaicity_from_eigen_decomposition
 from dials.algorithms.profile_model.ellipsoid.model import (
     compute_change_of_basis_operation,
+    compute_change_of_basis_operations,
 )
 from dials.algorithms.profile_model.ellipsoid.parameterisation import (
+    BatchReflectionModelState,
     ReflectionModelState,
 )
 from dials.array_family import flex
@@ -392,6 +394,17 @@ def fisher_information(self):
 
 
 class MaximumLikelihoodTarget(object):
+    """
+    The joint likelihood of all the reflections, its derivatives and the fisher
+    information, evaluated with batched array operations.
+
+    The per-reflection quantities are stacked along the first axis, e.g. the
+    rotated covariance matrices as an (n, 3, 3) array and their derivatives as
+    an (n, 3, 3, p) array, and the results are equivalent to summing over a
+    ReflectionLikelihood for each reflection.
+
+    """
+
     def __init__(
         self, model, s0, sp_list, h_list, ctot_list, mobs_list, sobs_list, panel_ids
     ):
@@ -405,39 +418,112 @@ def __init__(
         # Save the model
         self.model = model
 
+        # Save the data, with the reflections along the first axis
+        self.s0 = np.array(s0, dtype=np.float64).flatten()
+        self.norm_s0 = norm(self.s0)
+        self.ctot = np.array(ctot_list, dtype=np.float64)
+        self.mobs = np.array(mobs_list, dtype=np.float64).T  # nx2
+        self.sobs = np.transpose(sobs_list, axes=(2, 0, 1))  # nx2x2
+        self.panel_ids = panel_ids
+
         # Compute the change of basis for each reflection
-        self.data = []
-        for i in range(len(h_list)):
-            self.data.append(
-                ReflectionLikelihood(
-                    model,
-                    s0,
-                    sp_list[:, i],
-                    matrix.col(h_list[i]),
-                    ctot_list[i],
-                    mobs_list[:, i],
-                    sobs_list[:, :, i],
-                    panel_ids[i],
-                )
-            )
+        self.R = compute_change_of_basis_operations(self.s0, sp_list)  # nx3x3
+        self.R_cctbx = [matrix.sqr(flex.double(R.flatten().tolist())) for R in self.R]
+
+        self.modelstate = BatchReflectionModelState(
+            model, self.s0, np.array(list(h_list), dtype=np.float64)
+        )
+        self.S = None
+        self.dS = None
+        self.dmu = None
+        self._update(initial=True)
 
     def update(self):
-        for d in self.data:
-            d.modelstate.update()  # update the ReflectionModelState
-            d.update()  # update the ReflectionLikelihood
+        self.modelstate.update()
+        self._update()
+
+    def _update(self, initial=False):
+        state = self.modelstate.state
+
+        # Rotate the mean vectors
+        s2 = self.s0 + self.modelstate.get_r()
+        self.mu = np.einsum("nij,nj->ni", self.R, s2)
+
+        # Rotate the covariance matrices and their first derivatives
+        if initial or not state.is_mosaic_spread_fixed:
+            self.S = np.einsum(
+                "nij,njk,nlk->nil",
+                self.R,
+                self.modelstate.mosaicity_covariance_matrix,
+                self.R,
+            )
+            self.dS = np.einsum(
+                "nij,njkp,nlk->nilp", self.R, self.modelstate.get_dS_dp(), self.R
+            )
+
+        # Rotate the first derivatives of s2
+        if (
+            initial
+            or (not state.is_unit_cell_fixed)
+            or (not state.is_orientation_fixed)
+        ):
+            self.dmu = np.einsum("nij,njp->nip", self.R, self.modelstate.get_dr_dp())
+
+        self._compute_conditional()
+
+    def _compute_conditional(self):
+        """
+        Compute the conditional distributions and their first derivatives, as in
+        ConditionalDistribution, compute_dSbar and compute_dmbar
+
+        """
+        S, dS, mu, dmu = self.S, self.dS, self.mu, self.dmu
+
+        # Partition the covariance matrices
+        S11 = S[:, 0:2, 0:2]
+        S12 = S[:, 0:2, 2]
+        S21 = S[:, 2, 0:2]
+        self.S22 = S[:, 2, 2]
+        S22_inv = 1 / self.S22
+
+        dS11 = dS[:, 0:2, 0:2, :]
+        dS12 = dS[:, 0:2, 2, :]
+        dS21 = dS[:, 2, 0:2, :]
+        self.dS22 = dS[:, 2, 2, :]
+
+        # The epsilon and the conditional means and covariance matrices
+        self.epsilon = self.norm_s0 - mu[:, 2]
+        self.mubar = mu[:, 0:2] + S12 * (S22_inv * self.epsilon)[:, np.newaxis]
+        self.Sbar = S11 - np.einsum("ni,nj,n->nij", S12, S21, S22_inv)
+
+        # The first derivatives of the conditional covariance matrices
+        S22_inv_p = S22_inv[:, np.newaxis]
+        self.dSbar = (
+            dS11
+            + np.einsum("ni,nj,np->nijp", S12, S21, self.dS22 * S22_inv_p**2)
+            - np.einsum("ni,njp,n->nijp", S12, dS21, S22_inv)
+            - np.einsum("nip,nj,n->nijp", dS12, S21, S22_inv)
+        )
+
+        # The first derivatives of the conditional means
+        epsilon_p = self.epsilon[:, np.newaxis]
+        dep = -dmu[:, 2, :]
+        self.dmbar = (
+            dmu[:, 0:2, :]
+            + dS12 * (S22_inv_p * epsilon_p)[:, np.newaxis, :]
+            - S12[:, :, np.newaxis]
+            * (S22_inv_p * self.dS22 * S22_inv_p * epsilon_p)[:, np.newaxis, :]
+            + S12[:, :, np.newaxis] * (S22_inv_p * dep)[:, np.newaxis, :]
+        )
+
+        self.Sbar_inv = inv(self.Sbar)
 
     def mse(self):
         """
         The MSE in local reflection coordinates
 
         """
-        mse = 0
-        for i in range(len(self.data)):
-            mbar = self.data[i].conditional.mean()
-            xobs = self.data[i].mobs
-            mse += np.dot((xobs - mbar).T, xobs - mbar)
-        mse /= len(self.data)
-        return mse
+        return np.sum(np.square(self.mobs - self.mubar)) / self.mobs.shape[0]
 
     def rmsd(self):
         """
@@ -446,16 +532,13 @@ def rmsd(self):
         """
         mse_x = 0.0
         mse_y = 0.0
-        for i in range(len(self.data)):
-            R = self.data[i].R_cctbx
-            mbar = tuple(self.data[i].conditional.mean().flatten())
-            xobs = tuple(self.data[i].mobs.flatten())
-            norm_s0 = self.data[i].norm_s0
-            rse_i = rse(R, mbar, xobs, norm_s0, self.model.experiment.detector)
+        detector = self.model.experiment.detector
+        for R, mbar, xobs in zip(self.R_cctbx, self.mubar, self.mobs):
+            rse_i = rse(R, tuple(mbar), tuple(xobs), self.norm_s0, detector)
             mse_x += rse_i[0]
             mse_y += rse_i[1]
-        mse_x /= len(self.data)
-        mse_y /= len(self.data)
+        mse_x /= len(self.R_cctbx)
+        mse_y /= len(self.R_cctbx)
         return np.sqrt(np.array([mse_x, mse_y]))
 
     def log_likelihood(self):
@@ -463,31 +546,99 @@ def log_likelihood(self):
         The joint log likelihood
 
         """
-        return sum(d.log_likelihood() for d in self.data)
+        # Weights for marginal and conditional components
+        m_w = self.ctot
+        c_w = self.ctot
+
+        # Compute the marginal likelihood
+        m_lnL = m_w * (np.log(self.S22) + np.square(self.epsilon) / self.S22)
+
+        # Compute the conditional likelihood
+        c_d = self.mobs - self.mubar
+        V = self.sobs + np.einsum("ni,nj->nij", c_d, c_d)
+        c_lnL = c_w * (
+            np.log(det(self.Sbar)) + np.einsum("nij,nji->n", self.Sbar_inv, V)
+        )
+
+        # Return the joint likelihood
+        return -0.5 * np.sum(m_lnL + c_lnL)
+
+    def _reflection_first_derivatives(self):
+        """
+        The first derivatives of the log likelihood of each reflection (an
+        array of size nxp)
+
+        """
+        # Weights for marginal and conditional components
+        m_w = self.ctot[:, np.newaxis]
+        c_w = self.ctot[:, np.newaxis]
+
+        S22_inv = 1 / self.S22[:, np.newaxis]
+        epsilon = self.epsilon[:, np.newaxis]
+        c_d = self.mobs - self.mubar
+
+        V1 = self.sobs + np.einsum("ni,nj->nij", c_d, c_d)
+        V2 = np.identity(2) - np.matmul(self.Sbar_inv, V1)
+
+        V_vec = c_w * np.einsum(
+            "nij,njkp,nki->np", self.Sbar_inv, self.dSbar, V2, optimize=True
+        )
+        dep = -self.dmu[:, 2, :]
+        U_vec = m_w * (
+            S22_inv * self.dS22 * (1.0 - S22_inv * np.square(epsilon))
+            + 2 * S22_inv * epsilon * dep
+        )
+        W_vec = -2.0 * c_w * np.einsum("nij,nj,nip->np", self.Sbar_inv, c_d, self.dmbar)
+
+        return -0.5 * (U_vec + V_vec + W_vec)
 
     def jacobian(self):
         """
         Return the Jacobian
 
         """
-        return flex.double([list(d.first_derivatives()) for d in self.data])
+        return flumpy.from_numpy(self._reflection_first_derivatives().copy())
 
     def first_derivatives(self):
         """
         The joint first derivatives
 
         """
-        dL = 0
-        for d in self.data:
-            dL += d.first_derivatives()
-        return dL
+        return np.sum(self._reflection_first_derivatives(), axis=0)
 
     def fisher_information(self):
         """
         The joint fisher information
 
         """
-        return sum(d.fisher_information() for d in self.data)
+        # Weights for marginal and conditional components
+        m_w = self.ctot
+        c_w = self.ctot
+        n_params = self.dS22.shape[1]
+
+        S22_inv = 1 / self.S22
+        dmu2 = self.dmu[:, 2, :]
+
+        # The marginal terms, U and X
+        U = np.matmul((self.dS22 * (m_w * S22_inv**2)[:, np.newaxis]).T, self.dS22)
+        X = 2 * np.matmul((dmu2 * (m_w * S22_inv)[:, np.newaxis]).T, dmu2)
+
+        # The conditional terms, V = tr(Sbar_inv dSbar_j Sbar_inv dSbar_i) and
+        # W = 2 tr(Sbar_inv dmbar_i dmbar_j^T)
+        Y = np.einsum("nij,njkp->nikp", self.Sbar_inv, self.dSbar)
+        Yw = Y * c_w[:, np.newaxis, np.newaxis, np.newaxis]
+        V = np.matmul(
+            Yw.reshape(-1, n_params).T,
+            np.transpose(Y, axes=(0, 2, 1, 3)).reshape(-1, n_params),
+        )
+        Z = np.einsum("nik,nkq->niq", self.Sbar_inv, self.dmbar)
+        W = 2 * np.matmul(
+            (self.dmbar * c_w[:, np.newaxis, np.newaxis]).reshape(-1, n_params).T,
+            Z.reshape(-1, n_params),
+        )
+
+        I = 0.5 * (V + W) + 0.5 * (U + X)
+        return flumpy.from_numpy(np.ascontiguousarray(I))
 
 
 def line_search(func, x, p, tau=0.5, delta=1.0, tolerance=1e-7):
@@ -4,9 +4,11 @@
 
 from __future__ import annotations
 
+import concurrent.futures
 import copy
 import json
 import logging
+import multiprocessing
 from io import StringIO
 from typing import List, Union
 
@@ -656,6 +658,53 @@ def compute_functional_gradients_diag(self):
         return self._f, self._g, diags
 
 
+class _NormalEquations(normal_eqns.non_linear_ls, normal_eqns.non_linear_ls_mixin):
+    """Accumulator for the normal equations of one process's blocks"""
+
+
+# The refinery copied into each process of a persistent build_up pool
+_worker_refinery = None
+
+
+def _init_build_up_worker(refinery):
+    global _worker_refinery
+    _worker_refinery = refinery
+    _worker_refinery._pool = None
+
+
+def _build_up_worker(x, block):
+    """Accumulate the normal equations for one block of matches, already
+    predicted by the parent process, after setting the parameters of the
+    process's refinery copy to x"""
+
+    refinery = _worker_refinery
+    if refinery._constr_manager is not None:
+        x = refinery._constr_manager.expand_parameters(x)
+    refinery._parameters.set_param_vals(x)
+
+    # Scan-varying gradients are built from model state derivatives cached by
+    # compose, so compose for this block only, indexing the cache by position
+    # in the block
+    block["imatch"] = flex.size_t_range(len(block))
+    if hasattr(refinery._parameters, "compose"):
+        refinery._parameters.compose(block)
+
+    residuals, jacobian, weights = refinery._target.compute_residuals_and_gradients(
+        block
+    )
+    if refinery._constr_manager is not None:
+        jacobian = refinery._constr_manager.constrain_jacobian(jacobian)
+    equations = _NormalEquations(n_parameters=len(x))
+    equations.add_equations(residuals, jacobian, weights)
+    step_equations = equations.step_equations()
+    return (
+        step_equations.normal_matrix_packed_u(),
+        step_equations.right_hand_side(),
+        residuals,
+        weights,
+    )
+
+
 class AdaptLstbx(Refinery, normal_eqns.non_linear_ls, normal_eqns.non_linear_ls_mixin):
     """Adapt Refinery for lstbx"""
 
@@ -685,6 +734,9 @@ def __init__(
         # keep attribute for the Cholesky factor required for ESD calculation
         self.cf = None
 
+        # persistent process pool for multiprocess build_up, created on demand
+        self._pool = None
+
         normal_eqns.non_linear_ls.__init__(self, n_parameters=len(self.x))
 
     def restart(self):
@@ -716,43 +768,36 @@ def build_up(self, objective_only=False):
         else:
             blocks = self._target.split_matches_into_blocks(nproc=self._nproc)
 
-            if self._nproc > 1:
+            if self._nproc > 1 and "fork" in multiprocessing.get_all_start_methods():
 
                 # ensure the jacobian is not tracked
                 self._jacobian = None
 
-                # processing functions
-                def task_wrapper(block):
-                    (
-                        residuals,
-                        jacobian,
-                        weights,
-                    ) = self._target.compute_residuals_and_gradients(block)
-                    return {
-                        "residuals": residuals,
-                        "jacobian": jacobian,
-                        "weights": weights,
-                    }
-
-                def callback_wrapper(result):
-                    j = result["jacobian"]
-                    if self._constr_manager is not None:
-                        j = self._constr_manager.constrain_jacobian(j)
-                    self.add_equations(result["residuals"], j, result["weights"])
-                    # no longer need the result
-                    result["residuals"] = None
-                    result["jacobian"] = None
-                    result["weights"] = None
-                    return
-
-                easy_mp.parallel_map(
-                    func=task_wrapper,
-                    iterable=blocks,
-                    processes=self._nproc,
-                    callback=callback_wrapper,
-                    method="multiprocessing",
-                    preserve_exception_message=True,
-                )
+                # Worker processes hold a copy of this refinery, forked when the
+                # pool is created. Each step they are sent the parameter vector
+                # and one block of the matches predicted above, and return the
+                # normal equations for that block.
+                if self._pool is None:
+                    self._pool = concurrent.futures.ProcessPoolExecutor(
+                        max_workers=self._nproc,
+                        mp_context=multiprocessing.get_context("fork"),
+                        initializer=_init_build_up_worker,
+                        initargs=(self,),
+                    )
+                futures = [
+                    self._pool.submit(_build_up_worker, self.x, block)
+                    for block in blocks
+                ]
+                normal_matrix = self.step_equations().normal_matrix_packed_u()
+                rhs = self.step_equations().right_hand_side()
+                for future in futures:
+                    block_normal_matrix, block_rhs, residuals, weights = future.result()
+                    normal_matrix.set_selected(
+                        flex.size_t_range(len(normal_matrix)),
+                        normal_matrix + block_normal_matrix,
+                    )
+                    rhs.set_selected(flex.size_t_range(len(rhs)), rhs + block_rhs)
+                    self.add_residuals(residuals, weights)
 
             else:
                 for block in blocks:
@@ -780,6 +825,12 @@ def callback_wrapper(result):
                     j = self._constr_manager.constrain_jacobian(j)
                 self.add_equations(restraints[0], j, restraints[2])
 
+    def shutdown_pool(self):
+        """Stop the worker processes used by build_up, if any"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
     def step_forward(self):
         self.old_x = self.x.deep_copy()
         self.x += self.step()
@@ -872,6 +923,12 @@ def __init__(
         libtbx.adopt_optional_init_args(self, kwds)
 
     def run(self):
+        try:
+            self._run_core()
+        finally:
+            self.shutdown_pool()
+
+    def _run_core(self):
         self.n_iterations = 0
 
         # prepare for first step
@@ -1093,5 +1150,8 @@ def _run_core(self):
         self.calculate_esds()
 
     def run(self):
-        self._run_core()
-        self.calculate_esds()
+        try:
+            self._run_core()
+            self.calculate_esds()
+        finally:
+            self.shutdown_pool()
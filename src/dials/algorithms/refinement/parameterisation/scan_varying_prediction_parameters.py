@@ -3,6 +3,9 @@
 import math
 from collections import namedtuple
 
+import numpy as np
+
+import dxtbx.flumpy as flumpy
 from scitbx import matrix
 
 from dials.algorithms.refinement.parameterisation.prediction_parameters import (
@@ -425,7 +428,11 @@ def _prepare_for_compose(self, reflections, skip_derivatives=False):
     def compose(self, reflections, skip_derivatives=False):
         """Compose scan-varying crystal parameterisations at the specified image
         number, for the specified experiment, for each image. Put the varying
-        matrices in the reflection table, and cache the derivatives."""
+        matrices in the reflection table, and cache the derivatives.
+
+        The reflections of each experiment are grouped by block with a single
+        sort, the model states are composed once per block and then scattered
+        into the reflection table with one set_selected call per column."""
 
         self._prepare_for_compose(reflections, skip_derivatives)
 
@@ -439,7 +446,33 @@ def compose(self, reflections, skip_derivatives=False):
             if len(isel) == 0:
                 continue
 
-            blocks = reflections["block"].select(isel)
+            # group the reflections by block, keeping the original order within
+            # each block
+            blocks = flumpy.to_numpy(reflections["block"].select(isel))
+            order = np.argsort(blocks, kind="stable")
+            isel = flumpy.from_numpy(flumpy.to_numpy(isel)[order].astype(np.uint64))
+            _, starts, counts = np.unique(
+                blocks[order], return_index=True, return_counts=True
+            )
+            ends = starts + counts
+
+            # get the integer frame number nearest the centre of each block
+            frames = flumpy.to_numpy(reflections["block_centre"].select(isel))
+
+            # can only be false if original block assignment has gone wrong
+            assert np.all(
+                frames == np.repeat(frames[starts], counts)
+            ), "Failing: a block contains reflections that shouldn't be there"
+            block_frames = [int(math.floor(f)) for f in frames[starts]]
+
+            # map each reflection to the index of its block, for scattering the
+            # per-block states
+            block_index = flumpy.from_numpy(
+                np.repeat(np.arange(len(starts), dtype=np.uint64), counts)
+            )
+
+            # get the panels hit by these reflections
+            panels = reflections["panel"].select(isel)
 
             # identify which parameterisations to use for this experiment
             xl_op = self._get_xl_orientation_parameterisation(iexp)
@@ -451,58 +484,68 @@ def compose(self, reflections, skip_derivatives=False):
             # reset current frame cache for scan-varying parameterisations
             self._current_frame = {}
 
-            # get state and derivatives for each block
-            for block in range(flex.min(blocks), flex.max(blocks) + 1):
-
-                # determine the subset of reflections this affects
-                subsel = isel.select(blocks == block)
-                if len(subsel) == 0:
-                    continue
+            # states of unparameterised models are the same for every block
+            fixed_U = fixed_B = fixed_s0 = fixed_S = None
+            if xl_op is None:
+                fixed_U = matrix.sqr(exp.crystal.get_U())
+            if xl_ucp is None:
+                fixed_B = matrix.sqr(exp.crystal.get_B())
+            if bp is None:
+                fixed_s0 = matrix.col(exp.beam.get_s0())
+            if gp is None:
+                fixed_S = matrix.sqr(exp.goniometer.get_setting_rotation())
+
+            # set states for an unparameterised detector, which are the same for
+            # every block
+            if dp is None:
+                for panel_id, panel in enumerate(exp.detector):
+                    subsel = isel.select(panels == panel_id)
+                    if len(subsel) == 0:
+                        continue
+                    reflections["d_matrix"].set_selected(subsel, panel.get_d_matrix())
+                    reflections["D_matrix"].set_selected(subsel, panel.get_D_matrix())
+            elif not dp.is_multi_state():
+                reflections["D_matrix"].set_selected(
+                    isel, exp.detector[0].get_D_matrix()
+                )
 
-                # get the panels hit by these reflections
-                panels = reflections["panel"].select(subsel)
-
-                # get the integer frame number nearest the centre of that block
-                frames = reflections["block_centre"].select(subsel)
-
-                # can only be false if original block assignment has gone wrong
-                assert frames.all_eq(
-                    frames[0]
-                ), "Failing: a block contains reflections that shouldn't be there"
-                frame = int(math.floor(frames[0]))
+            # get state and derivatives for each block
+            U_states = flex.mat3_double(len(starts))
+            B_states = flex.mat3_double(len(starts))
+            s0_states = flex.vec3_double(len(starts))
+            S_states = flex.mat3_double(len(starts))
+            d_states = flex.mat3_double(len(starts))
+            for iblock, (start, end, frame) in enumerate(
+                zip(starts.tolist(), ends.tolist(), block_frames)
+            ):
+
+                # the subset of reflections this block affects
+                subsel = isel[start:end]
 
                 # model states at current frame
                 U = self._get_state_from_parameterisation(xl_op, frame)
-                if U is None:
-                    U = matrix.sqr(exp.crystal.get_U())
+                U_states[iblock] = (fixed_U if U is None else U).elems
 
                 B = self._get_state_from_parameterisation(xl_ucp, frame)
-                if B is None:
-                    B = matrix.sqr(exp.crystal.get_B())
+                B_states[iblock] = (fixed_B if B is None else B).elems
 
                 s0 = self._get_state_from_parameterisation(bp, frame)
-                if s0 is None:
-                    s0 = matrix.col(exp.beam.get_s0())
+                s0_states[iblock] = (fixed_s0 if s0 is None else s0).elems
 
                 S = self._get_state_from_parameterisation(gp, frame)
-                if S is None:
-                    S = matrix.sqr(exp.goniometer.get_setting_rotation())
-
-                # set states for crystal, beam and goniometer
-                reflections["u_matrix"].set_selected(subsel, U.elems)
-                reflections["b_matrix"].set_selected(subsel, B.elems)
-                reflections["s0_vector"].set_selected(subsel, s0.elems)
-                reflections["S_matrix"].set_selected(subsel, S.elems)
+                S_states[iblock] = (fixed_S if S is None else S).elems
 
                 # set states and derivatives for this detector
                 if dp is not None:  # detector is parameterised
                     if dp.is_multi_state():  # parameterised detector is multi panel
 
+                        block_panels = panels[start:end]
+
                         # loop through the panels in this detector
                         for panel_id, _ in enumerate(exp.detector):
 
                             # get the right subset of array indices to set for this panel
-                            subsel2 = subsel.select(panels == panel_id)
+                            subsel2 = subsel.select(block_panels == panel_id)
                             if len(subsel2) == 0:
                                 # if no reflections intersect this panel, skip calculation
                                 continue
@@ -530,9 +573,7 @@ def compose(self, reflections, skip_derivatives=False):
                         dmat = self._get_state_from_parameterisation(dp, frame)
                         if dmat is None:
                             dmat = exp.detector[0].get_d_matrix()
-                        Dmat = exp.detector[0].get_D_matrix()
-                        reflections["d_matrix"].set_selected(subsel, dmat)
-                        reflections["D_matrix"].set_selected(subsel, Dmat)
+                        d_states[iblock] = dmat
 
                         if self._varying_detectors and not skip_derivatives:
                             for j, dd in enumerate(dp.get_ds_dp(use_none_as_null=True)):
@@ -540,21 +581,6 @@ def compose(self, reflections, skip_derivatives=False):
                                     continue
                                 self._derivative_cache.append(dp, j, dd, subsel)
 
-                else:  # set states for unparameterised detector (dp is None)
-                    # loop through the panels in this detector
-                    for panel_id, _ in enumerate(exp.detector):
-
-                        # get the right subset of array indices to set for this panel
-                        subsel2 = subsel.select(panels == panel_id)
-                        if len(subsel2) == 0:
-                            # if no reflections intersect this panel, skip to the next
-                            continue
-
-                        dmat = exp.detector[panel_id].get_d_matrix()
-                        Dmat = exp.detector[panel_id].get_D_matrix()
-                        reflections["d_matrix"].set_selected(subsel2, dmat)
-                        reflections["D_matrix"].set_selected(subsel2, Dmat)
-
                 # set derivatives of the states for crystal, beam and goniometer
                 if not skip_derivatives:
                     if xl_op is not None and self._varying_xl_orientations:
@@ -578,6 +604,15 @@ def compose(self, reflections, skip_derivatives=False):
                                 continue
                             self._derivative_cache.append(gp, j, dS, subsel)
 
+            # scatter the per-block states for crystal, beam and goniometer (and a
+            # single panel parameterised detector) into the reflection table
+            reflections["u_matrix"].set_selected(isel, U_states.select(block_index))
+            reflections["b_matrix"].set_selected(isel, B_states.select(block_index))
+            reflections["s0_vector"].set_selected(isel, s0_states.select(block_index))
+            reflections["S_matrix"].set_selected(isel, S_states.select(block_index))
+            if dp is not None and not dp.is_multi_state():
+                reflections["d_matrix"].set_selected(isel, d_states.select(block_index))
+
         # set the UB matrices for prediction
         reflections["ub_matrix"] = reflections["u_matrix"] * reflections["b_matrix"]
 
@@ -11,6 +11,9 @@
 
 from libtbx import Auto
 
+from dials.algorithms.scaling.merging_statistics import (
+    merging_stats_from_scaled_array_fast,
+)
 from dials.algorithms.scaling.observers import (
     ScalingHTMLContextManager,
     ScalingSummaryContextManager,
@@ -458,6 +461,9 @@ def run(self):
                     )
                     if self.params.scaling_options.full_matrix:
                         results = self._run_final_scale_cycle(results)
+                    elif self._use_fast_merging_stats():
+                        # The full statistics are needed for the output report
+                        self.calculate_merging_stats()
                     results.finish(termination_reason="no_more_removed")
                     break
 
@@ -506,6 +512,13 @@ def run(self):
             logger.info("\nTotal time taken: %.4fs ", time.time() - start_time)
             logger.info("%s%s%s", "\n", "=" * 80, "\n")
 
+    def _use_fast_merging_stats(self):
+        # The fast calculation does not support the internal variance
+        return (
+            self.params.filtering.deltacchalf.fast_merging_stats
+            and not self.params.output.use_internal_variance
+        )
+
     def run_scaling_cycle(self):
         """Do a round of scaling for scaling and filtering."""
         # Turn off the full matrix round, all else is the same.
@@ -526,7 +539,13 @@ def run_scaling_cycle(self):
             best_unit_cell=self.params.reflection_selection.best_unit_cell,
         )
         try:
-            self.calculate_merging_stats()
+            if self._use_fast_merging_stats():
+                self.merging_statistics_result = merging_stats_from_scaled_array_fast(
+                    self.scaled_miller_array, self.params.output.merging.nbins
+                )
+                self.anom_merging_statistics_result = None
+            else:
+                self.calculate_merging_stats()
         except DialsMergingStatisticsError as e:
             logger.info(e)
         logger.info("Performed cycle of scaling.")
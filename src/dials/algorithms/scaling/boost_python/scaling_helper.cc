@@ -61,6 +61,13 @@ namespace dials_scaling { namespace boost_python {
     def("row_multiply", &row_multiply, (arg("m"), arg("v")));
   }
 
+  void export_sparse_matrix_csr() {
+    def("sparse_matrix_as_csr", &sparse_matrix_as_csr, (arg("m")));
+    def("sparse_matrix_from_csr",
+        &sparse_matrix_from_csr,
+        (arg("n_rows"), arg("n_cols"), arg("data"), arg("indices"), arg("indptr")));
+  }
+
   void export_limit_outlier_weights() {
     def("limit_outlier_weights",
         &limit_outlier_weights,
@@ -34,13 +34,21 @@
 cross_validation_mode=multi parameter=physical.absorption_correction
 cross_validation_mode=multi parameter=physical.decay_interval parameter_values="5.0 10.0 15.0"
 cross_validation_mode=multi parameter=model parameter_values="array physical"
+
+The scaling jobs for the different folds and parameter values are independent,
+so they can be run in parallel with nproc=. Each job runs in a separate process
+with its own copy of the data, and the results are collected into the same
+summary table as for a serial run.
 """
 
 
 from __future__ import annotations
 
+import concurrent.futures
+import copy
 import itertools
 import logging
+import multiprocessing
 import time
 
 from libtbx import phil
@@ -79,10 +87,56 @@
               "allowed is 1/free_set_percentage; if set greater than this then"
               "the repetition will finish after 1/free_set_percentage folds."
       .expert_level = 2
+    nproc = 1
+      .type = int(value_min=1)
+      .help = "Number of cross-validation jobs (folds and parameter values) to"
+              "run in parallel, each in a separate process."
+      .expert_level = 2
   }
 """
 )
 
+# The cross validator copied into each process of the job pool
+_worker_cross_validator = None
+
+
+def _init_cross_validation_worker(cross_validator):
+    global _worker_cross_validator
+    _worker_cross_validator = cross_validator
+    # Interleaved scaling logs from concurrent jobs would be unreadable
+    logging.getLogger("dials").setLevel(logging.WARNING)
+
+
+def _run_cross_validation_job(params):
+    return _worker_cross_validator.get_job_results(params)
+
+
+def _run_jobs(jobs, cross_validator, nproc):
+    """Run the (config_no, params) jobs, adding the results of each to the
+    results dict in job order"""
+    nproc = min(nproc, len(jobs))
+    if nproc > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        logger.warning(
+            "Parallel cross-validation is not available on this platform, "
+            "running the jobs serially"
+        )
+        nproc = 1
+    if nproc <= 1:
+        for config_no, params in jobs:
+            cross_validator.run_script(params, config_no=config_no)
+        return
+
+    logger.info("Running %d cross-validation jobs on %d processes", len(jobs), nproc)
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=nproc,
+        mp_context=multiprocessing.get_context("fork"),
+        initializer=_init_cross_validation_worker,
+        initargs=(cross_validator,),
+    ) as pool:
+        futures = [pool.submit(_run_cross_validation_job, params) for _, params in jobs]
+        for (config_no, _), future in zip(jobs, futures):
+            cross_validator.add_results_to_results_dict(config_no, future.result())
+
 
 def cross_validate(params, cross_validator):
     """Run cross validation script."""
@@ -90,6 +144,7 @@ def cross_validate(params, cross_validator):
     start_time = time.time()
     free_set_percentage = cross_validator.get_free_set_percentage(params)
     options_dict = {}
+    jobs = []
 
     if params.cross_validation.cross_validation_mode == "single":
         # just run the setup nfolds times
@@ -97,7 +152,7 @@ def cross_validate(params, cross_validator):
         for n in range(params.cross_validation.nfolds):
             if n < 100.0 / free_set_percentage:
                 params = cross_validator.set_free_set_offset(params, n)
-                cross_validator.run_script(params, config_no=0)
+                jobs.append((0, copy.deepcopy(params)))
 
     elif params.cross_validation.cross_validation_mode == "multi":
         # run each option nfolds times
@@ -158,11 +213,13 @@ def cross_validate(params, cross_validator):
             for n in range(params.cross_validation.nfolds):
                 if n < 100.0 / free_set_percentage:
                     params = cross_validator.set_free_set_offset(params, n)
-                    cross_validator.run_script(params, config_no=i)
+                    jobs.append((i, copy.deepcopy(params)))
 
     else:
         raise ValueError("Error in interpreting mode and options.")
 
+    _run_jobs(jobs, cross_validator, params.cross_validation.nproc)
+
     st = cross_validator.interpret_results()
     logger.info("Summary of the cross validation analysis: \n %s", st.format())
 
@@ -43,6 +43,11 @@ def get_results_from_script(self, script):
         """Return the work/free results list from the command line script object"""
         raise NotImplementedError()
 
+    def get_job_results(self, params):
+        """Run the appropriate command line script with the params and return
+        the free/work set results, without adding them to the results dict."""
+        raise NotImplementedError()
+
     def get_parameter_type(self, name):
         """Find the parameter type for a discrete phil option - bool or choice."""
         raise NotImplementedError()
@@ -211,9 +216,9 @@ def get_free_set_percentage(self, params):
         """Inspect the free set percentage in the correct place in the scope"""
         return params.scaling_options.free_set_percentage
 
-    def run_script(self, params, config_no):
-        """Run the scaling script with the params, get the free/work set results
-        and add to the results dict"""
+    def get_job_results(self, params):
+        """Run the scaling script with the params and return the free/work set
+        results"""
         from dials.algorithms.scaling.algorithm import ScalingAlgorithm
 
         params.scaling_options.__setattr__("use_free_set", True)
@@ -223,5 +228,10 @@ def run_script(self, params, config_no):
             reflections=deepcopy(self.reflections),
         )
         algorithm.run()
-        results = self.get_results_from_script(algorithm)
+        return self.get_results_from_script(algorithm)
+
+    def run_script(self, params, config_no):
+        """Run the scaling script with the params, get the free/work set results
+        and add to the results dict"""
+        results = self.get_job_results(params)
         self.add_results_to_results_dict(config_no, results)
@@ -29,6 +29,16 @@
 from dials_scaling_ext import calculate_harmonic_tables_from_selections
 
 
+def _single_parameter_derivatives(values):
+    """Create an n x 1 sparse derivative matrix from a flex.double of values."""
+    derivatives = sparse.matrix(values.size(), 1)
+    if values.size():
+        column = values.deep_copy()
+        column.reshape(flex.grid(values.size(), 1))
+        derivatives.assign_block(column, 0, 0)
+    return derivatives
+
+
 class ScaleComponentBase:
     """
     Base scale component class.
@@ -229,9 +239,9 @@ def update_reflection_data(self, selection=None, block_selections=None):
     def calculate_scales_and_derivatives(self, block_id=0):
         """Calculate and return inverse scales and derivatives for a given block."""
         scales = flex.double(self.n_refl[block_id], self._parameters[0])
-        derivatives = sparse.matrix(self.n_refl[block_id], 1)
-        for i in range(self.n_refl[block_id]):
-            derivatives[i, 0] = 1.0
+        derivatives = _single_parameter_derivatives(
+            flex.double(self.n_refl[block_id], 1.0)
+        )
         return scales, derivatives
 
     def calculate_scales(self, block_id=0):
@@ -295,9 +305,7 @@ def calculate_scales_and_derivatives(self, block_id=0):
         scales = flex.exp(
             flex.double(self._n_refl[block_id], self._parameters[0]) / (2.0 * d_squared)
         )
-        derivatives = sparse.matrix(self._n_refl[block_id], 1)
-        for i in range(self._n_refl[block_id]):
-            derivatives[i, 0] = scales[i] / (2.0 * d_squared[i])
+        derivatives = _single_parameter_derivatives(scales / (2.0 * d_squared))
         return scales, derivatives
 
     def calculate_scales(self, block_id=0):
@@ -372,11 +380,9 @@ def calculate_scales_and_derivatives(self, block_id=0):
         scales = flex.exp(
             self._parameters[0] * self._x[block_id] / self._d_values[block_id]
         )
-        derivatives = sparse.matrix(self._n_refl[block_id], 1)
-        for i in range(self._n_refl[block_id]):
-            derivatives[i, 0] = scales[i] * (
-                self._x[block_id][i] / self._d_values[block_id][i]
-            )
+        derivatives = _single_parameter_derivatives(
+            scales * (self._x[block_id] / self._d_values[block_id])
+        )
         return scales, derivatives
 
     def calculate_scales(self, block_id=0):
@@ -402,11 +408,9 @@ def calculate_scales_and_derivatives(self, block_id=0):
         scales = flex.exp(
             self._parameters[0] * self._x[block_id] / (self._d_values[block_id] ** 2)
         )
-        derivatives = sparse.matrix(self._n_refl[block_id], 1)
-        for i in range(self._n_refl[block_id]):
-            derivatives[i, 0] = scales[i] * (
-                self._x[block_id][i] / (self._d_values[block_id][i] ** 2)
-            )
+        derivatives = _single_parameter_derivatives(
+            scales * (self._x[block_id] / (self._d_values[block_id] ** 2))
+        )
         return scales, derivatives
 
     def calculate_scales(self, block_id=0):
@@ -33,6 +33,15 @@
         stdcutoff = 4.0
             .type = float
             .help = "Datasets with a ΔCC½ below (mean - stdcutoff*std) are removed"
+        fast_merging_stats = False
+            .type = bool
+            .help = "Calculate the merging statistics recorded for each filtering"
+                    "cycle with a fast calculation on the grouped scaled data,"
+                    "without anomalous statistics. CC½ is calculated with a"
+                    "different random half-dataset split, so can differ slightly"
+                    "from the standard calculation. Not used if"
+                    "output.use_internal_variance=True."
+            .expert_level = 2
     }
     output {
         scale_and_filter_results = "scale_and_filter_results.json"
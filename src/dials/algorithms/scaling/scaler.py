@@ -13,8 +13,10 @@
 
 from __future__ import annotations
 
+import concurrent.futures
 import copy
 import logging
+import multiprocessing
 import time
 from io import StringIO
 from math import ceil
@@ -58,7 +60,7 @@
 from dials.util import tabulate
 from dials.util.observer import Subject
 from dials_scaling_ext import calc_sigmasq as cpp_calc_sigmasq
-from dials_scaling_ext import row_multiply
+from dials_scaling_ext import row_multiply, sparse_matrix_as_csr, sparse_matrix_from_csr
 
 logger = logging.getLogger("dials")
 
@@ -886,6 +888,37 @@ def clean_reflection_table(self):
         self._reflection_table.set_flags(~bad, self.reflection_table.flags.scaled)
 
 
+# The parameter manager copied into each process of a MultiScalerBase pool
+_worker_apm = None
+
+
+def _init_scales_worker(apm):
+    global _worker_apm
+    _worker_apm = apm
+
+
+def _scales_and_derivatives_worker(dataset_ids, x, block_id):
+    """Calculate the scales and derivatives of some of the datasets for one
+    block, after setting the parameters of the process's parameter manager
+    copy to x. The derivatives are returned as compressed sparse row arrays."""
+    _worker_apm.set_param_vals(x)
+    results = []
+    for i in dataset_ids:
+        scales, derivs = RefinerCalculator.calculate_scales_and_derivatives(
+            _worker_apm.apm_list[i], block_id
+        )
+        data, indices, indptr = sparse_matrix_as_csr(derivs)
+        results.append(
+            (
+                flumpy.to_numpy(scales),
+                flumpy.to_numpy(data),
+                flumpy.to_numpy(indices),
+                flumpy.to_numpy(indptr),
+            )
+        )
+    return results
+
+
 class MultiScalerBase(ScalerBase):
     """Base class for scalers handling multiple datasets."""
 
@@ -893,6 +926,10 @@ def __init__(self, single_scalers):
         """Initialise from a list of single scalers."""
         super().__init__(single_scalers[0].params)
         self.single_scalers = single_scalers
+        # persistent process pool for the scales and derivatives calculation,
+        # and the parameter manager the pool was forked with
+        self._pool = None
+        self._pool_apm = None
 
     def remove_datasets(self, scalers, n_list):
         """
@@ -972,34 +1009,123 @@ def update_for_minimisation(self, apm, block_id):
         self._update_for_minimisation(apm, block_id, calc_Ih=True)
 
     def _update_for_minimisation(self, apm, block_id, calc_Ih=True):
-        scales = flex.double([])
+        """Calculate the scales and derivatives for all datasets for one block.
+
+        With scaling_options.nproc > 1, the datasets are divided between the
+        processes of a pool forked from this scaler, so that each iteration
+        only the parameter vector is sent to the workers. The derivatives come
+        back as compressed sparse row arrays, as sparse matrices cannot be
+        pickled.
+        """
+        nproc = min(self.params.scaling_options.nproc, len(apm.apm_list))
+        if nproc > 1 and "fork" in multiprocessing.get_all_start_methods():
+            scales, deriv_matrix = self._calculate_scales_and_derivatives_in_pool(
+                apm, block_id, nproc
+            )
+        else:
+            scales, deriv_matrix = self._calculate_scales_and_derivatives(apm, block_id)
+        self.Ih_table.set_inverse_scale_factors(scales, block_id)
+        self.Ih_table.set_derivatives(deriv_matrix, block_id)
+        if calc_Ih:
+            self.Ih_table.calc_Ih(block_id)
+
+    @staticmethod
+    def _calculate_scales_and_derivatives(apm, block_id):
+        scales = []
         derivs = []
         for apm_i in apm.apm_list:
             scales_i, derivs_i = RefinerCalculator.calculate_scales_and_derivatives(
                 apm_i, block_id
             )
-            scales.extend(scales_i)
+            scales.append(flumpy.to_numpy(scales_i))
             derivs.append(derivs_i)
-        deriv_matrix = sparse.matrix(scales.size(), apm.n_active_params)
+        scales = np.concatenate(scales) if scales else np.array([], dtype=np.float64)
+        deriv_matrix = sparse.matrix(scales.size, apm.n_active_params)
         start_row_no = 0
         for j, deriv in enumerate(derivs):
             deriv_matrix.assign_block(deriv, start_row_no, apm.apm_data[j]["start_idx"])
             start_row_no += deriv.n_rows
-        self.Ih_table.set_inverse_scale_factors(flumpy.to_numpy(scales), block_id)
-        self.Ih_table.set_derivatives(deriv_matrix, block_id)
-        if calc_Ih:
-            self.Ih_table.calc_Ih(block_id)
-        # The parallelisation below would work if sparse matrices were
-        # pickleable (I think!) - with more benefit for larger number of datasets.'''
-        """def task_wrapper(block):
-            s, d = RefinerCalculator.calculate_scales_and_derivatives(block)
-            return s, d
-        blocks = apm.apm_list
-        task_results = easy_mp.parallel_map(func=task_wrapper, iterable=blocks,
-            processes=n_datasets, method="multiprocessing",
-            preserve_exception_message=True
+        return scales, deriv_matrix
+
+    def _calculate_scales_and_derivatives_in_pool(self, apm, block_id, nproc):
+        # The workers hold a copy of the parameter manager and its components,
+        # forked when the pool is created, so a new pool is needed for each new
+        # parameter manager.
+        if apm is not self._pool_apm:
+            self._shutdown_pool()
+            self._pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=nproc,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_init_scales_worker,
+                initargs=(apm,),
+            )
+            self._pool_apm = apm
+
+        # divide the datasets into groups with similar numbers of reflections
+        n_obs = np.array([apm_i.n_obs[block_id] for apm_i in apm.apm_list])
+        boundaries = np.searchsorted(
+            np.cumsum(n_obs), np.arange(1, nproc) * n_obs.sum() / nproc
         )
-        scales_list, derivs_list = zip(*task_results)"""
+        groups = [
+            g.tolist()
+            for g in np.split(np.arange(len(apm.apm_list)), boundaries)
+            if g.size
+        ]
+        futures = [
+            self._pool.submit(
+                _scales_and_derivatives_worker, group, apm.get_param_vals(), block_id
+            )
+            for group in groups
+        ]
+
+        # join the blocks of the derivative matrix, offsetting the columns of
+        # each dataset by the position of its parameters
+        scales = []
+        data = []
+        indices = []
+        indptr = [np.zeros(1, dtype=np.uint64)]
+        n_rows = 0
+        n_elements = 0
+        for group, future in zip(groups, futures):
+            for j, (scales_j, data_j, indices_j, indptr_j) in zip(
+                group, future.result()
+            ):
+                scales.append(scales_j)
+                data.append(data_j)
+                indices.append(
+                    indices_j.astype(np.uint64)
+                    + np.uint64(apm.apm_data[j]["start_idx"])
+                )
+                indptr.append(indptr_j[1:].astype(np.uint64) + np.uint64(n_elements))
+                n_rows += indptr_j.size - 1
+                n_elements += data_j.size
+        scales = np.concatenate(scales)
+        indptr = np.concatenate(indptr)
+        # as with assign_block, any rows without derivatives are left empty
+        indptr = np.append(
+            indptr, np.full(scales.size - n_rows, n_elements, dtype=np.uint64)
+        )
+        deriv_matrix = sparse_matrix_from_csr(
+            scales.size,
+            apm.n_active_params,
+            flumpy.from_numpy(np.concatenate(data)),
+            flumpy.from_numpy(np.concatenate(indices)),
+            flumpy.from_numpy(indptr),
+        )
+        return scales, deriv_matrix
+
+    def _shutdown_pool(self):
+        """Stop the worker processes used during minimisation, if any"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._pool_apm = None
+
+    def _perform_scaling(self, *args, **kwargs):
+        try:
+            super()._perform_scaling(*args, **kwargs)
+        finally:
+            self._shutdown_pool()
 
     def _update_model_data(self):
         for i, scaler in enumerate(self.active_scalers):
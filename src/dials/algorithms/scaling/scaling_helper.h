@@ -277,6 +277,68 @@ scitbx::sparse::matrix<double> row_multiply(scitbx::sparse::matrix<double> m,
   return result;
 }
 
+/**
+ * Return the compressed sparse row arrays (data, indices, indptr) of a matrix,
+ * so that it can be pickled and reconstructed with sparse_matrix_from_csr.
+ */
+boost::python::tuple sparse_matrix_as_csr(scitbx::sparse::matrix<double> m) {
+  // call compact to ensure that each elt of the matrix is only defined once
+  m.compact();
+
+  // count the elements in each row
+  std::size_t n_rows = m.n_rows();
+  scitbx::af::shared<std::size_t> indptr(n_rows + 1, 0);
+  for (std::size_t j = 0; j < m.n_cols(); j++) {
+    for (scitbx::sparse::matrix<double>::row_iterator p = m.col(j).begin();
+         p != m.col(j).end();
+         ++p) {
+      indptr[p.index() + 1]++;
+    }
+  }
+  for (std::size_t i = 0; i < n_rows; i++) {
+    indptr[i + 1] += indptr[i];
+  }
+
+  // fill the rows, iterating over the columns in order so that the column
+  // indices of each row are sorted
+  scitbx::af::shared<double> data(indptr[n_rows]);
+  scitbx::af::shared<std::size_t> indices(indptr[n_rows]);
+  std::vector<std::size_t> next(indptr.begin(), indptr.end() - 1);
+  for (std::size_t j = 0; j < m.n_cols(); j++) {
+    for (scitbx::sparse::matrix<double>::row_iterator p = m.col(j).begin();
+         p != m.col(j).end();
+         ++p) {
+      std::size_t k = next[p.index()]++;
+      data[k] = *p;
+      indices[k] = j;
+    }
+  }
+  return boost::python::make_tuple(data, indices, indptr);
+}
+
+/**
+ * Create a sparse matrix from compressed sparse row arrays.
+ */
+scitbx::sparse::matrix<double> sparse_matrix_from_csr(
+  std::size_t n_rows,
+  std::size_t n_cols,
+  scitbx::af::const_ref<double> data,
+  scitbx::af::const_ref<std::size_t> indices,
+  scitbx::af::const_ref<std::size_t> indptr) {
+  DIALS_ASSERT(indptr.size() == n_rows + 1);
+  DIALS_ASSERT(data.size() == indices.size());
+  DIALS_ASSERT(indptr[n_rows] == data.size());
+
+  scitbx::sparse::matrix<double> result(n_rows, n_cols);
+  for (std::size_t i = 0; i < n_rows; i++) {
+    for (std::size_t k = indptr[i]; k < indptr[i + 1]; k++) {
+      DIALS_ASSERT(indices[k] < n_cols);
+      result(i, indices[k]) = data[k];
+    }
+  }
+  return result;
+}
+
 scitbx::af::shared<scitbx::vec2<double> > calc_theta_phi(
   scitbx::af::shared<scitbx::vec3<double> > xyz) {
   // physics conventions, phi from 0 to 2pi (xy plane, 0 along x axis), theta from 0 to
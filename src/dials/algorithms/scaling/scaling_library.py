@@ -27,6 +27,7 @@
 from libtbx import Auto, phil
 
 from dials.algorithms.scaling.Ih_table import IhTable
+from dials.algorithms.scaling.merging_statistics import cc_one_half_random_splits
 from dials.algorithms.scaling.model.model import KBScalingModel, PhysicalScalingModel
 from dials.algorithms.scaling.scaling_utilities import (
     DialsMergingStatisticsError,
@@ -387,18 +388,31 @@ class ExtendedDatasetStatistics(iotbx.merging_statistics.dataset_statistics):
 
     """A class to extend iotbx merging statistics."""
 
-    def __init__(self, *args, additional_stats=False, seed=0, **kwargs):
+    def __init__(
+        self, *args, additional_stats=False, seed=0, cc_one_half_n_splits=1, **kwargs
+    ):
         super().__init__(*args, **kwargs)
         self.r_split = None
         self.r_split_binned = None
         self.binner = None
         self.merged_half_datasets = None
-        if not additional_stats:
-            return
+        self.cc_one_half_mean = None
+        self.cc_one_half_std = None
+        self.cc_one_half_mean_binned = None
+        self.cc_one_half_std_binned = None
         i_obs = kwargs.get("i_obs")
-        n_bins = kwargs.get("n_bins", 20)
         if not i_obs:
             return
+        if cc_one_half_n_splits > 1:
+            # Group Friedel mates in the same way as the iotbx statistics
+            if kwargs.get("anomalous", False):
+                split_i_obs = i_obs.as_anomalous_array()
+            else:
+                split_i_obs = i_obs.as_non_anomalous_array()
+            self.calc_cc_one_half_random_splits(split_i_obs, cc_one_half_n_splits, seed)
+        if not additional_stats:
+            return
+        n_bins = kwargs.get("n_bins", 20)
         i_obs_copy = i_obs.customized_copy()
         i_obs_copy.setup_binner(n_bins=n_bins)
         i_obs = i_obs.map_to_asu()
@@ -442,8 +456,25 @@ def __init__(self, *args, additional_stats=False, seed=0, **kwargs):
             m1, m2, assume_index_matching=True, use_binning=True
         )
 
+    def calc_cc_one_half_random_splits(self, i_obs, n_splits, seed=0):
+        """Calculate the mean and standard deviation of CC½, overall and in the
+        resolution bins, over n_splits random half-dataset splits."""
+        bins = [(self.overall.d_max, self.overall.d_min)]
+        overall = cc_one_half_random_splits(i_obs, bins, n_splits=n_splits, seed=seed)
+        self.cc_one_half_mean = float(overall.mean())
+        self.cc_one_half_std = float(overall.std())
+        bins = [(b.d_max, b.d_min) for b in self.bins]
+        binned = cc_one_half_random_splits(i_obs, bins, n_splits=n_splits, seed=seed)
+        self.cc_one_half_mean_binned = binned.mean(axis=0).tolist()
+        self.cc_one_half_std_binned = binned.std(axis=0).tolist()
+
     def as_dict(self):
         d = super().as_dict()
+        if self.cc_one_half_mean is not None:
+            d["overall"]["cc_one_half_mean"] = self.cc_one_half_mean
+            d["overall"]["cc_one_half_std"] = self.cc_one_half_std
+            d["cc_one_half_mean"] = self.cc_one_half_mean_binned
+            d["cc_one_half_std"] = self.cc_one_half_std_binned
         if not self.r_split:
             return d
         d["overall"]["r_split"] = self.r_split
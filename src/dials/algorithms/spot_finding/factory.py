@@ -7,6 +7,7 @@
 
 import numpy as np
 
+import libtbx
 from dxtbx.imageset import ImageSequence
 from iotbx.phil import parse
 
@@ -15,6 +16,7 @@
 from dials.algorithms.background.simple import Linear2dModeller
 from dials.algorithms.spot_finding.finder import SpotFinder
 from dials.array_family import flex
+from dials.util.mp import available_cores
 
 logger = logging.getLogger(__name__)
 
@@ -130,6 +132,12 @@ def generate_phil_scope():
       min_chunksize = 20
         .type = int(value_min=1)
         .help = "When chunksize is auto, this is the minimum chunksize"
+
+      prefetch = 0
+        .type = int(value_min=0)
+        .help = "The number of images each process reads and decodes in a"
+                "background thread while the current image is thresholded"
+        .expert_level = 2
     }
   }
   """,
@@ -248,9 +256,10 @@ def __call__(self, flags, **kwargs):
 
 
 class BackgroundGradientFilter:
-    def __init__(self, background_size=2, gradient_cutoff=4):
+    def __init__(self, background_size=2, gradient_cutoff=4, nthreads=1):
         self.background_size = background_size
         self.gradient_cutoff = gradient_cutoff
+        self.nthreads = nthreads
 
     def run(self, flags, sequence=None, shoeboxes=None, **kwargs):  # noqa: U100
         modeller = Linear2dModeller()
@@ -292,7 +301,7 @@ def run(self, flags, sequence=None, shoeboxes=None, **kwargs):  # noqa: U100
         rlist["panel"] = shoeboxes.panels()
         rlist["bbox"] = shoeboxes.bounding_boxes()
 
-        rlist.extract_shoeboxes(sequence)
+        rlist.extract_shoeboxes(sequence, nthreads=self.nthreads)
 
         shoeboxes = rlist["shoebox"]
         shoeboxes.flatten()
@@ -473,6 +482,7 @@ def from_parameters(params=None, experiments=None, is_stills=False):
             no_shoeboxes_2d=no_shoeboxes_2d,
             min_chunksize=params.spotfinder.mp.min_chunksize,
             is_stills=is_stills,
+            mp_prefetch=params.spotfinder.mp.prefetch,
         )
 
     @staticmethod
@@ -508,10 +518,14 @@ def configure_filter(params):
 
         if params.spotfinder.filter.background_gradient.filter:
             bg_filter_params = params.spotfinder.filter.background_gradient
+            nthreads = params.spotfinder.mp.nproc
+            if nthreads is libtbx.Auto:
+                nthreads = available_cores()
             filters.append(
                 BackgroundGradientFilter(
                     background_size=bg_filter_params.background_size,
                     gradient_cutoff=bg_filter_params.gradient_cutoff,
+                    nthreads=nthreads,
                 )
             )
 
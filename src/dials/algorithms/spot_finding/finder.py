@@ -4,6 +4,7 @@
 
 from __future__ import annotations
 
+import concurrent.futures
 import logging
 import math
 import pickle
@@ -36,6 +37,7 @@ def __init__(
         region_of_interest,
         max_strong_pixel_fraction,
         compute_mean_background,
+        prefetch=0,
     ):
         """
         Initialise the class
@@ -45,6 +47,7 @@ def __init__(
         :param mask: The image mask
         :param region_of_interest: A region of interest to process
         :param max_strong_pixel_fraction: The maximum fraction of pixels allowed
+        :param prefetch: The number of following images to read in the background
         """
         self.threshold_function = threshold_function
         self.imageset = imageset
@@ -52,16 +55,82 @@ def __init__(
         self.region_of_interest = region_of_interest
         self.max_strong_pixel_fraction = max_strong_pixel_fraction
         self.compute_mean_background = compute_mean_background
+        self.prefetch = prefetch
+        self._reader = None
+        self._prefetched = {}
         if self.mask is not None:
             detector = self.imageset.get_detector()
             assert len(self.mask) == len(detector)
 
-    def __call__(self, index):
+    def __getstate__(self):
+        # The reader thread and pending reads belong to a single process
+        state = self.__dict__.copy()
+        state["_reader"] = None
+        state["_prefetched"] = {}
+        return state
+
+    def _read_image_and_mask(self, index):
+        """Read the corrected image data and the combined mask for an image"""
+        image = self.imageset.get_corrected_data(index)
+        mask = self.imageset.get_mask(index)
+        if self.mask is not None:
+            assert len(self.mask) == len(mask)
+            mask = tuple(m1 & m2 for m1, m2 in zip(mask, self.mask))
+        return image, mask
+
+    def _get_image_and_mask(self, index, end):
+        """
+        Get the image and mask, reading the following images in the background.
+
+        Worker processes are given consecutive images, so while an image is
+        thresholded the next few before end are read and decoded on a reader
+        thread.
+        """
+        if not self.prefetch:
+            return self._read_image_and_mask(index)
+        if self._reader is None:
+            self._reader = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        pending = self._prefetched.pop(index, None)
+
+        # Drop any reads which will not be asked for
+        for stale in [i for i in self._prefetched if i < index]:
+            self._prefetched.pop(stale).cancel()
+
+        # Queue up reads of the following images in this chunk
+        for i in range(index + 1, min(index + 1 + self.prefetch, end)):
+            if i not in self._prefetched:
+                self._prefetched[i] = self._reader.submit(self._read_image_and_mask, i)
+        if pending is None:
+            return self._read_image_and_mask(index)
+        return pending.result()
+
+    def shutdown_reader(self):
+        """Stop the reader thread, cancelling any reads not yet started"""
+        if self._reader is not None:
+            self._reader.shutdown(cancel_futures=True)
+            self._reader = None
+        self._prefetched = {}
+
+    def __call__(self, index, end=None):
         """
         Extract strong pixels from an image
 
         :param index: The index of the image
+        :param end: The end of the chunk of images being processed, which
+                    bounds the images read ahead. Defaults to the end of the
+                    imageset. The reader thread is stopped after the last
+                    image of the chunk.
         """
+        if end is None:
+            end = len(self.imageset)
+        try:
+            return self._extract_pixels(index, end)
+        finally:
+            if index + 1 >= end:
+                self.shutdown_reader()
+
+    def _extract_pixels(self, index, end):
+        """Extract strong pixels from an image"""
         # Get the frame number
         if isinstance(self.imageset, ImageSequence):
             frame = self.imageset.get_array_range()[0] + index
@@ -75,19 +144,14 @@ def __call__(self, index):
         pixel_list = []
 
         # Get the image and mask
-        image = self.imageset.get_corrected_data(index)
-        mask = self.imageset.get_mask(index)
-
-        # Set the mask
-        if self.mask is not None:
-            assert len(self.mask) == len(mask)
-            mask = tuple(m1 & m2 for m1, m2 in zip(mask, self.mask))
+        image, mask = self._get_image_and_mask(index, end)
 
-        logger.debug(
-            "Number of masked pixels for image %i: %i",
-            index,
-            sum(m.count(False) for m in mask),
-        )
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Number of masked pixels for image %i: %i",
+                index,
+                sum(m.count(False) for m in mask),
+            )
 
         # Add the images to the pixel lists
         num_strong = 0
@@ -180,6 +244,7 @@ def __init__(
         min_spot_size,
         max_spot_size,
         filter_spots,
+        prefetch=0,
     ):
         """
         Initialise the class
@@ -189,6 +254,7 @@ def __init__(
         :param mask: The image mask
         :param region_of_interest: A region of interest to process
         :param max_strong_pixel_fraction: The maximum fraction of pixels allowed
+        :param prefetch: The number of following images to read in the background
         """
         super().__init__(
             imageset,
@@ -197,6 +263,7 @@ def __init__(
             region_of_interest,
             max_strong_pixel_fraction,
             compute_mean_background,
+            prefetch=prefetch,
         )
 
         # Save some stuff
@@ -204,18 +271,19 @@ def __init__(
         self.max_spot_size = max_spot_size
         self.filter_spots = filter_spots
 
-    def __call__(self, index):
+    def __call__(self, index, end=None):
         """
         Extract strong pixels from an image
 
         :param index: The index of the image
+        :param end: The end of the chunk of images being processed
         """
         # Initialise the pixel labeller
         num_panels = len(self.imageset.get_detector())
         pixel_labeller = [PixelListLabeller() for p in range(num_panels)]
 
         # Call the super function
-        result = super().__call__(index)
+        result = super().__call__(index, end)
 
         # Add pixel lists to the labeller
         assert len(pixel_labeller) == len(result), "Inconsistent size"
@@ -255,9 +323,11 @@ def __init__(self, function):
     def __call__(self, task):
         """
         Call the function with th task and save the IO
+
+        The task is an image index and the end of its chunk of images
         """
         log.config_simple_cached()
-        result = self.function(task)
+        result = self.function(*task)
         handlers = logging.getLogger("dials").handlers
         assert len(handlers) == 1, "Invalid number of logging handlers"
         return result, handlers[0].records
@@ -379,6 +449,7 @@ def __init__(
         no_shoeboxes_2d=False,
         min_chunksize=50,
         write_hot_pixel_mask=False,
+        mp_prefetch=0,
     ):
         """
         Initialise the class with the strategy
@@ -388,6 +459,7 @@ def __init__(
         :param mp_method: The multi processing method
         :param nproc: The number of processors
         :param max_strong_pixel_fraction: The maximum number of strong pixels
+        :param mp_prefetch: The number of images each process reads ahead
         """
         # Set the required strategies
         self.threshold_function = threshold_function
@@ -405,6 +477,7 @@ def __init__(
         self.no_shoeboxes_2d = no_shoeboxes_2d
         self.min_chunksize = min_chunksize
         self.write_hot_pixel_mask = write_hot_pixel_mask
+        self.mp_prefetch = mp_prefetch
 
     def __call__(self, imageset):
         """
@@ -433,6 +506,18 @@ def _compute_chunksize(self, nimg, nproc, min_chunksize):
             test_chunksize -= 1
         return chunksize
 
+    @staticmethod
+    def _chunk_tasks(indices, chunksize):
+        """
+        Pair each image index with the end of the chunk of images it is
+        processed in, as the indices are grouped by batch_multi_node_parallel_map
+        """
+        tasks = []
+        for start in range(0, len(indices), chunksize):
+            chunk = indices[start : start + chunksize]
+            tasks.extend((i, chunk[-1] + 1) for i in chunk)
+        return tasks
+
     def _find_spots(self, imageset):
         """
         Find the spots in the imageset
@@ -477,6 +562,7 @@ def _find_spots(self, imageset):
             max_strong_pixel_fraction=self.max_strong_pixel_fraction,
             compute_mean_background=self.compute_mean_background,
             region_of_interest=self.region_of_interest,
+            prefetch=self.mp_prefetch,
         )
 
         # The indices to iterate over
@@ -507,7 +593,7 @@ def process_output(result):
 
             batch_multi_node_parallel_map(
                 func=ExtractSpotsParallelTask(function),
-                iterable=indices,
+                iterable=self._chunk_tasks(indices, mp_chunksize),
                 nproc=mp_nproc,
                 njobs=mp_njobs,
                 cluster_method=mp_method,
@@ -574,6 +660,7 @@ def _find_spots_2d_no_shoeboxes(self, imageset):
             min_spot_size=self.min_spot_size,
             max_spot_size=self.max_spot_size,
             filter_spots=self.filter_spots,
+            prefetch=self.mp_prefetch,
         )
 
         # The indices to iterate over
@@ -603,7 +690,7 @@ def process_output(result):
 
             batch_multi_node_parallel_map(
                 func=ExtractSpotsParallelTask(function),
-                iterable=indices,
+                iterable=self._chunk_tasks(indices, mp_chunksize),
                 nproc=mp_nproc,
                 njobs=mp_njobs,
                 cluster_method=mp_method,
@@ -644,6 +731,7 @@ def __init__(
         no_shoeboxes_2d=False,
         min_chunksize=50,
         is_stills=False,
+        mp_prefetch=0,
     ):
         """
         Initialise the class.
@@ -653,6 +741,7 @@ def __init__(
         :param scan_range: The scan range to find spots over
         :param is_stills:   [ADVANCED] Force still-handling of experiment
                             ID remapping for dials.stills_process.
+        :param mp_prefetch: The number of images each process reads ahead
         """
 
         # Set the filter and some other stuff
@@ -675,6 +764,7 @@ def __init__(
         self.no_shoeboxes_2d = no_shoeboxes_2d
         self.min_chunksize = min_chunksize
         self.is_stills = is_stills
+        self.mp_prefetch = mp_prefetch
 
     def find_spots(self, experiments: ExperimentList) -> flex.reflection_table:
         """
@@ -781,6 +871,7 @@ def _find_spots_in_imageset(self, imageset):
             no_shoeboxes_2d=self.no_shoeboxes_2d,
             min_chunksize=self.min_chunksize,
             write_hot_pixel_mask=self.write_hot_mask,
+            mp_prefetch=self.mp_prefetch,
         )
 
         # Get the max scan range
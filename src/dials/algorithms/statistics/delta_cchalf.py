@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 import logging
-from collections import defaultdict
 from math import floor, sqrt
 
+import numpy as np
+
 from cctbx import crystal, miller
+from dxtbx import flumpy
 
 from dials.array_family import flex
 
@@ -69,6 +71,17 @@ def index(self, h):
             bin_index = 0
         return bin_index
 
+    def indices(self, d):
+        """
+        Get the bin indices for an array of d-spacings
+
+        :param d: A numpy array of d-spacings
+        :returns: A numpy array of bin indices
+        """
+        d2 = 1 / d**2
+        bin_index = np.floor((d2 - self._xmin) / self._bin_size).astype(np.int64)
+        return np.clip(bin_index, 0, self._nbins - 1)
+
 
 class ReflectionSum:
     """
@@ -154,6 +167,52 @@ def compute_cchalf_from_reflection_sums(reflection_sums, binner):
     return compute_mean_cchalf_in_bins(bin_data)
 
 
+def compute_mean_and_variance_arrays(sum_x, sum_x2, n):
+    """
+    Compute the mean intensity and the variance on the mean for arrays of
+    reflection sums. Only reflections with more than one observation are
+    valid, the mean and variance of other reflections are set to zero.
+
+    :param sum_x: A numpy array of the sum of intensities
+    :param sum_x2: A numpy array of the sum of squared intensities
+    :param n: A numpy array of the number of observations
+    :returns: A tuple of (valid, mean, var) numpy arrays
+    """
+    valid = n > 1
+    n_safe = np.where(valid, n, 2)
+    mean = np.where(valid, sum_x / n_safe, 0.0)
+    var = (sum_x2 - sum_x**2 / n_safe) / (n_safe - 1)
+    var = np.where(valid, var / n_safe, 0.0)
+    return valid, mean, var
+
+
+def compute_mean_cchalf_from_bin_sums(n, sum_m, sum_m2, sum_var):
+    """
+    Compute the mean CC 1/2 across resolution bins from per-bin sums.
+
+    The sums of means and squared means are expected to be taken relative to a
+    fixed per-bin shift (e.g. the mean of means of the full dataset), which
+    avoids loss of precision when computing the variance of the means. The
+    last axis of the input arrays is the resolution bin axis, any leading axes
+    are treated as independent datasets.
+
+    :param n: The number of unique reflections in each bin
+    :param sum_m: The sum of the (shifted) mean intensities in each bin
+    :param sum_m2: The sum of the squared (shifted) mean intensities in each bin
+    :param sum_var: The sum of the variances on the mean intensities in each bin
+    :returns: The weighted mean CC 1/2 (a numpy array over the leading axes)
+    """
+    valid = n > 1
+    n_safe = np.where(valid, n, 2)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sigma_e = sum_var / n_safe
+        sigma_y = (sum_m2 - sum_m**2 / n_safe) / (n_safe - 1)
+        cchalf = (sigma_y - sigma_e) / (sigma_y + sigma_e)
+    weighted = np.where(valid, n * cchalf, 0.0).sum(axis=-1)
+    count = np.where(valid, n, 0).sum(axis=-1)
+    return np.where(count > 0, weighted / np.where(count > 0, count, 1), 0.0)
+
+
 class PerGroupCChalfStatistics:
     def __init__(
         self,
@@ -193,30 +252,34 @@ def __init__(
             self.d_max = flex.max(self.reflection_table["d"])
         self.binner = ResolutionBinner(mean_unit_cell, self.d_min, self.d_max, n_bins)
 
-        self.reflection_sums = defaultdict(ReflectionSum)
         self.compute_overall_stats()
 
     def compute_overall_stats(self):
-        # Create lookups for elements by miller index
-        index_lookup = defaultdict(list)
-        for i, h in enumerate(self.reflection_table["miller_index"]):
-            index_lookup[h].append(i)
+        # Assign each reflection to its unique miller index
+        hkl = flumpy.to_numpy(self.reflection_table["miller_index"])
+        unique_hkl, first, hkl_index = np.unique(
+            hkl, axis=0, return_index=True, return_inverse=True
+        )
+        self._hkl_index = hkl_index.ravel()
+        self._intensity = flumpy.to_numpy(self.reflection_table["intensity"])
+        d = flumpy.to_numpy(self.reflection_table["d"])
+        self._hkl_bin_index = self.binner.indices(d[first])
 
         # Compute the Overall Sum(X) and Sum(X^2) for each unique reflection
-
-        for h in index_lookup:
-            sel = flex.size_t(index_lookup[h])
-            intensities = self.reflection_table["intensity"].select(sel)
-            n = intensities.size()
-            sum_x = flex.sum(intensities)
-            sum_x2 = flex.sum(flex.pow2(intensities))
-            self.reflection_sums[h] = ReflectionSum(sum_x, sum_x2, n)
+        n_unique = len(unique_hkl)
+        self._sum_x = np.bincount(
+            self._hkl_index, weights=self._intensity, minlength=n_unique
+        )
+        self._sum_x2 = np.bincount(
+            self._hkl_index, weights=self._intensity**2, minlength=n_unique
+        )
+        self._n = np.bincount(self._hkl_index, minlength=n_unique)
 
         # Compute some numbers
         self._num_datasets = len(set(self.reflection_table["dataset"]))
         self._num_groups = len(set(self.reflection_table["group"]))
         self._num_reflections = self.reflection_table.size()
-        self._num_unique = len(self.reflection_sums)
+        self._num_unique = n_unique
 
         logger.info(
             """
@@ -252,58 +315,117 @@ def d_filter(self):
             sel = self.reflection_table["d"] < self.d_max
         self.reflection_table.select(sel)
 
+    def _bin_sums(self, valid, mean, var):
+        """Sum the per-reflection terms into resolution bins"""
+        nbins = self.binner.nbins()
+        bins = self._hkl_bin_index[valid]
+        n = np.bincount(bins, minlength=nbins)
+        sum_m = np.bincount(bins, weights=mean[valid], minlength=nbins)
+        sum_var = np.bincount(bins, weights=var[valid], minlength=nbins)
+        return n, sum_m, sum_var
+
     def run(self):
         """Compute the ΔCC½ for all the data"""
-        self._cchalf_mean = compute_cchalf_from_reflection_sums(
-            self.reflection_sums, self.binner
+        valid, mean, var = compute_mean_and_variance_arrays(
+            self._sum_x, self._sum_x2, self._n
+        )
+        n, sum_m, sum_var = self._bin_sums(valid, mean, var)
+        # Shift the means by the per-bin mean of means to keep the variance
+        # calculation numerically stable.
+        self._shift = np.where(n > 0, sum_m / np.where(n > 0, n, 1), 0.0)
+        shifted = mean - self._shift[self._hkl_bin_index]
+        sum_m2 = np.bincount(
+            self._hkl_bin_index[valid],
+            weights=shifted[valid] ** 2,
+            minlength=self.binner.nbins(),
+        )
+        sum_m = sum_m - n * self._shift
+        self._bin_totals = (n, sum_m, sum_m2, sum_var)
+        self._cchalf_mean = float(
+            compute_mean_cchalf_from_bin_sums(n, sum_m, sum_m2, sum_var)
         )
         logger.info("CC 1/2 mean: %.3f", (100 * self._cchalf_mean))
         self._cchalf = self._compute_cchalf_excluding_each_group()
 
     def _compute_cchalf_excluding_each_group(self):
-        #   self, reflection_sums, binner, miller_index, dataset, intensity
-        # ):
         """
         Compute the CC 1/2 with an image excluded.
 
         For each image, update the sums by removing the contribution from the image
-        and then compute the CC 1/2 of the remaining data
+        and then compute the CC 1/2 of the remaining data.
+
+        Rather than recomputing the sums over all unique reflections for each
+        group, the sums are accumulated once per (group, unique reflection) pair.
+        Only the reflections observed in a group change when that group is
+        excluded, so the binned totals for the full dataset are corrected by the
+        difference in each affected reflection's contribution, for all groups at
+        once.
         """
+        groups = flumpy.to_numpy(self.reflection_table["group"])
+        group_ids, first, group_index = np.unique(
+            groups, return_index=True, return_inverse=True
+        )
+        group_index = group_index.ravel()
+        n_groups = len(group_ids)
+        n_unique = self._num_unique
+        nbins = self.binner.nbins()
+
+        # Sum(X), Sum(X^2) and counts for each (group, unique reflection) pair
+        pair_key = group_index.astype(np.int64) * n_unique + self._hkl_index
+        pairs, pair_index = np.unique(pair_key, return_inverse=True)
+        pair_index = pair_index.ravel()
+        pair_group = pairs // n_unique
+        pair_hkl = pairs % n_unique
+        n_pairs = len(pairs)
+        group_sum_x = np.bincount(
+            pair_index, weights=self._intensity, minlength=n_pairs
+        )
+        group_sum_x2 = np.bincount(
+            pair_index, weights=self._intensity**2, minlength=n_pairs
+        )
+        group_n = np.bincount(pair_index, minlength=n_pairs)
+
+        # The contribution of each affected reflection with and without the group
+        shift = self._shift[self._hkl_bin_index[pair_hkl]]
+        old_valid, old_mean, old_var = compute_mean_and_variance_arrays(
+            self._sum_x[pair_hkl], self._sum_x2[pair_hkl], self._n[pair_hkl]
+        )
+        new_valid, new_mean, new_var = compute_mean_and_variance_arrays(
+            self._sum_x[pair_hkl] - group_sum_x,
+            self._sum_x2[pair_hkl] - group_sum_x2,
+            self._n[pair_hkl] - group_n,
+        )
+        old_mean = np.where(old_valid, old_mean - shift, 0.0)
+        new_mean = np.where(new_valid, new_mean - shift, 0.0)
+
+        # Accumulate the differences into (group, resolution bin) totals
+        key = pair_group * nbins + self._hkl_bin_index[pair_hkl]
+        size = n_groups * nbins
+
+        def accumulate(new, old):
+            return np.bincount(key, weights=new - old, minlength=size).reshape(
+                n_groups, nbins
+            )
+
+        n, sum_m, sum_m2, sum_var = self._bin_totals
+        n = n + np.rint(
+            accumulate(new_valid.astype(float), old_valid.astype(float))
+        ).astype(np.int64)
+        sum_m = sum_m + accumulate(new_mean, old_mean)
+        sum_m2 = sum_m2 + accumulate(new_mean**2, old_mean**2)
+        sum_var = sum_var + accumulate(new_var, old_var)
 
-        # Create a lookup table for each reflection by dataset i.e. group of images
-        dataset_lookup = defaultdict(list)
-        for i, b in enumerate(self.reflection_table["group"]):
-            dataset_lookup[b].append(i)
+        # Compute CC 1/2 without the reflections from each group
+        cchalf = compute_mean_cchalf_from_bin_sums(n, sum_m, sum_m2, sum_var)
 
-        # Compute CC1/2 minus each dataset
+        # Report the groups in the order in which they appear in the data
         cchalf_i = {}
-        for dataset in dataset_lookup:
-
-            # Find all observations from this dataset and create a lookup based on
-            # miller index
-            index_lookup = defaultdict(list)
-            for i in dataset_lookup[dataset]:
-                index_lookup[self.reflection_table["miller_index"][i]].append(i)
-
-            # Loop through all the reflections and remove the contribution of
-            # reflections from the current dataset
-            dataset_reflection_sums = defaultdict(ReflectionSum)
-            for h in self.reflection_sums:
-                sum_x = self.reflection_sums[h].sum_x
-                sum_x2 = self.reflection_sums[h].sum_x2
-                n = self.reflection_sums[h].n
-                for i in index_lookup[h]:
-                    sum_x -= self.reflection_table["intensity"][i]
-                    sum_x2 -= self.reflection_table["intensity"][i] ** 2
-                    n -= 1
-                dataset_reflection_sums[h] = ReflectionSum(sum_x, sum_x2, n)
-
-            # Compute the CC 1/2 without the reflections from the current dataset
-            cchalf = compute_cchalf_from_reflection_sums(
-                dataset_reflection_sums, self.binner
+        for i in np.argsort(first, kind="stable"):
+            dataset = group_ids[i].item()
+            cchalf_i[dataset] = float(cchalf[i])
+            logger.info(
+                "CC 1/2 excluding group %d: %.3f", dataset, 100 * cchalf_i[dataset]
             )
-            cchalf_i[dataset] = cchalf
-            logger.info("CC 1/2 excluding group %d: %.3f", dataset, 100 * cchalf)
 
         return cchalf_i
 
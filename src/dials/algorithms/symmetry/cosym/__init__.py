@@ -8,12 +8,15 @@
 
 from __future__ import annotations
 
+import concurrent.futures
 import json
 import logging
 import math
+import multiprocessing
 from typing import List, Optional
 
 import numpy as np
+import scipy.optimize
 from sklearn.neighbors import NearestNeighbors
 
 import iotbx.phil
@@ -33,6 +36,9 @@
 
 logger = logging.getLogger(__name__)
 
+# The target shared with the processes of the minimisation pool
+_worker_target = None
+
 phil_scope = iotbx.phil.parse(
     """\
 
@@ -97,16 +103,59 @@
   max_calls = None
     .type = int(value_min=0)
     .short_caption = "Maximum number of calls"
+  n_random_starts = 1
+    .type = int(value_min=1)
+    .help = "Number of random starting coordinates for each minimisation, for"
+            "each number of dimensions tested and for the final analysis. The"
+            "solution with the lowest functional is used."
+    .short_caption = "Number of random starts"
 }
 
-nproc = None
+nproc = 1
   .type = int(value_min=1)
-  .help = "Deprecated"
-  .deprecated = True
+  .help = "Number of processes to use in calculating the matrix of pairwise"
+          "correlation coefficients, and for running the minimisations of the"
+          "dimension scan and random starts concurrently."
 """
 )
 
 
+def _init_minimisation_worker(target):
+    global _worker_target
+    _worker_target = target
+
+
+def _minimise(
+    target, dimensions, coords, engine, use_curvatures, max_iterations, max_calls
+):
+    """Minimise the target in the given number of dimensions from the starting
+    coordinates, returning the functional and the coordinates"""
+    target.set_dimensions(dimensions)
+    if engine == "scitbx":
+        result = cosym_engine.minimize_scitbx_lbfgs(
+            target,
+            coords,
+            use_curvatures=use_curvatures,
+            max_iterations=max_iterations,
+            max_calls=max_calls,
+        )
+    else:
+        result = cosym_engine.minimize_scipy(
+            target,
+            coords,
+            method="L-BFGS-B",
+            max_iterations=max_iterations,
+            max_calls=max_calls,
+        )
+    return scipy.optimize.OptimizeResult(
+        fun=result.fun, jac=result.jac, x=result.x, nfev=result.nfev
+    )
+
+
+def _run_minimisation(job):
+    return _minimise(_worker_target, *job)
+
+
 class CosymAnalysis(symmetry_base, Subject):
     """Perform cosym analysis.
 
@@ -229,6 +278,7 @@ def _intialise_target(self):
             lattice_group=self.lattice_group,
             dimensions=dimensions,
             weights=self.params.weights,
+            nproc=self.params.nproc,
         )
 
     def _determine_dimensions(self):
@@ -239,19 +289,15 @@ def _determine_dimensions(self):
             logger.info(
                 "\nAutomatic determination of number of dimensions for analysis"
             )
-            dimensions = []
-            functional = []
-            for dim in range(1, self.target.dim + 1):
-                logger.debug("Testing dimension: %i", dim)
-                self.target.set_dimensions(dim)
-                max_calls = self.params.minimization.max_calls
-                self._optimise(
-                    self.params.minimization.engine,
-                    max_iterations=self.params.minimization.max_iterations,
-                    max_calls=min(20, max_calls) if max_calls else max_calls,
-                )
-                dimensions.append(dim)
-                functional.append(self.minimizer.fun)
+            dimensions = list(range(1, self.target.dim + 1))
+            max_calls = self.params.minimization.max_calls
+            # Run the minimisations for all dimensions and random starts together
+            results = self._minimise(
+                dimensions,
+                max_iterations=self.params.minimization.max_iterations,
+                max_calls=min(20, max_calls) if max_calls else max_calls,
+            )
+            functional = [min(r.fun for r in dim_results) for dim_results in results]
 
             # Find the elbow point of the curve, in the same manner as that used by
             # distl spotfinder for resolution method 1 (Zhang et al 2006).
@@ -304,28 +350,67 @@ def _optimise(self, engine, max_iterations=None, max_calls=None):
         NN = len(set(self.dataset_ids))
         n_sym_ops = len(self.target.sym_ops)
 
-        coords = np.random.rand(NN * n_sym_ops * self.target.dim)
-        if engine == "scitbx":
-            self.minimizer = cosym_engine.minimize_scitbx_lbfgs(
-                self.target,
-                coords,
-                use_curvatures=self.params.use_curvatures,
-                max_iterations=max_iterations,
-                max_calls=max_calls,
-            )
-        else:
-            self.minimizer = cosym_engine.minimize_scipy(
-                self.target,
-                coords,
-                method="L-BFGS-B",
-                max_iterations=max_iterations,
-                max_calls=max_calls,
-            )
+        dimensions = self.target.dim
+        results = self._minimise(
+            [dimensions],
+            max_iterations=max_iterations,
+            max_calls=max_calls,
+            engine=engine,
+        )[0]
+        self.minimizer = min(results, key=lambda r: r.fun)
+        self.target.set_dimensions(dimensions)
 
         self.coords = self.minimizer.x.reshape(
             self.target.dim, NN * n_sym_ops
         ).transpose()
 
+    def _minimise(self, dimensions, max_iterations=None, max_calls=None, engine=None):
+        """Minimise the target from minimization.n_random_starts random starting
+        coordinates for each of the numbers of dimensions.
+
+        The starting coordinates are drawn in order from the numpy random state,
+        so the results are reproducible for a given seed, independent of nproc.
+        The minimisations are run in a pool of nproc processes, each with a copy
+        of the target.
+
+        Returns:
+          A list for each number of dimensions of the results of the random starts.
+        """
+        if engine is None:
+            engine = self.params.minimization.engine
+        NN = len(set(self.dataset_ids))
+        n_sym_ops = len(self.target.sym_ops)
+        n_starts = self.params.minimization.n_random_starts
+        jobs = [
+            (
+                dim,
+                np.random.rand(NN * n_sym_ops * dim),
+                engine,
+                self.params.use_curvatures,
+                max_iterations,
+                max_calls,
+            )
+            for dim in dimensions
+            for _ in range(n_starts)
+        ]
+
+        nproc = min(self.params.nproc, len(jobs))
+        if nproc > 1 and "fork" not in multiprocessing.get_all_start_methods():
+            nproc = 1
+        if nproc > 1:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=nproc,
+                mp_context=multiprocessing.get_context("fork"),
+                initializer=_init_minimisation_worker,
+                initargs=(self.target,),
+            ) as pool:
+                results = list(pool.map(_run_minimisation, jobs))
+        else:
+            results = [_minimise(self.target, *job) for job in jobs]
+        return [
+            results[i * n_starts : (i + 1) * n_starts] for i in range(len(dimensions))
+        ]
+
     def _principal_component_analysis(self):
         # Perform PCA
         from sklearn.decomposition import PCA
@@ -2,13 +2,14 @@
 
 from __future__ import annotations
 
+import concurrent.futures
 import copy
-import itertools
 import logging
+import multiprocessing
 
 import numpy as np
-import pandas as pd
 from orderedset import OrderedSet
+from scipy import sparse
 
 import cctbx.sgtbx.cosets
 from cctbx import miller, sgtbx
@@ -16,6 +17,127 @@
 
 logger = logging.getLogger(__name__)
 
+# The maximum number of elements in each of the dense blocks of pairwise sums
+_CORRELATION_BLOCK_ELEMENTS = 2**21
+
+# The sparse matrices shared with the processes of the correlation pool
+_worker_matrices = None
+
+
+def _init_correlation_worker(matrices):
+    global _worker_matrices
+    _worker_matrices = matrices
+
+
+def _correlation_block(start, end, matrices=None):
+    """
+    Calculate the correlation coefficients between rows start:end and rows
+    start: of the sparse intensity matrix.
+
+    Each correlation coefficient is calculated over the columns present in both
+    rows, from the sums over the shared columns given by sparse matrix products
+    of the values, squared values and the indicator of the present columns.
+
+    Returns:
+        The correlation coefficients and the number of shared columns, as two
+        arrays of shape (end - start, n_rows - start).
+    """
+    if matrices is None:
+        matrices = _worker_matrices
+    x, x_sq, present = matrices
+    x_block, x_sq_block, present_block = (m[start:end] for m in matrices)
+    x_upper, x_sq_upper, present_upper = (m[start:].T for m in matrices)
+
+    n = (present_block @ present_upper).toarray()
+    sum_x = (x_block @ present_upper).toarray()
+    sum_y = (present_block @ x_upper).toarray()
+    sum_xx = (x_sq_block @ present_upper).toarray()
+    sum_yy = (present_block @ x_sq_upper).toarray()
+    sum_xy = (x_block @ x_upper).toarray()
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = sum_xy - sum_x * sum_y / n
+        var_x = sum_xx - np.square(sum_x) / n
+        var_y = sum_yy - np.square(sum_y) / n
+        cc = cov / np.sqrt(var_x * var_y)
+    cc[~np.isfinite(cc) | (var_x <= 0) | (var_y <= 0)] = 0
+    np.clip(cc, -1, 1, out=cc)
+    return cc, n.astype(np.int64)
+
+
+def _pairwise_correlations(rows, columns, values, n_rows, nproc=1):
+    """
+    Calculate the correlation coefficients between all pairs of rows of a
+    sparse matrix, using only the columns present in both rows of each pair.
+
+    This is equivalent to the pairwise complete correlation of a dense matrix
+    with NaN for the absent values, but only stores the present values. If an
+    entry is given more than once, the last value is used.
+
+    Args:
+        rows (np.ndarray): The row of each value.
+        columns (np.ndarray): The column of each value.
+        values (np.ndarray): The values.
+        n_rows (int): The number of rows in the matrix.
+        nproc (int): The number of processes over which to split the blocks of rows.
+
+    Returns:
+        The (n_rows, n_rows) matrices of correlation coefficients and of the
+        number of columns shared by each pair of rows.
+    """
+    # Keep the last value of duplicated entries, compressing the columns
+    unique_columns, columns = np.unique(columns, return_inverse=True)
+    n_columns = unique_columns.size
+    keys = rows.astype(np.int64) * n_columns + columns.reshape(-1)
+    _, last = np.unique(keys[::-1], return_index=True)
+    last = keys.size - 1 - last
+    rows, columns, values = rows[last], columns.reshape(-1)[last], values[last]
+
+    # Centre the values of each row, which does not change the correlation
+    # coefficients but reduces the rounding error of the sums of squares
+    row_counts = np.bincount(rows, minlength=n_rows)
+    row_means = np.bincount(rows, weights=values, minlength=n_rows) / np.maximum(
+        row_counts, 1
+    )
+    values = values - row_means[rows]
+
+    shape = (n_rows, n_columns)
+    matrices = tuple(
+        sparse.csr_matrix((data, (rows, columns)), shape=shape)
+        for data in (values, np.square(values), np.ones(values.size))
+    )
+
+    block_size = max(1, _CORRELATION_BLOCK_ELEMENTS // max(n_rows, 1))
+    blocks = [
+        (start, min(start + block_size, n_rows))
+        for start in range(0, n_rows, block_size)
+    ]
+    nproc = min(nproc, len(blocks))
+    if nproc > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        nproc = 1
+    if nproc > 1:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=nproc,
+            mp_context=multiprocessing.get_context("fork"),
+            initializer=_init_correlation_worker,
+            initargs=(matrices,),
+        ) as pool:
+            futures = [pool.submit(_correlation_block, *block) for block in blocks]
+            results = [future.result() for future in futures]
+    else:
+        results = [_correlation_block(*block, matrices=matrices) for block in blocks]
+
+    # Fill the upper triangle from the blocks, then symmetrise
+    cc = np.zeros((n_rows, n_rows))
+    n_pairs = np.zeros((n_rows, n_rows), dtype=np.int64)
+    for (start, end), (cc_block, n_block) in zip(blocks, results):
+        cc[start:end, start:] = cc_block
+        n_pairs[start:end, start:] = n_block
+    lower = np.tril_indices(n_rows, k=-1)
+    cc[lower] = cc.T[lower]
+    n_pairs[lower] = n_pairs.T[lower]
+    return cc, n_pairs
+
 
 class Target:
     """Target function for cosym analysis.
@@ -32,6 +154,7 @@ def __init__(
         min_pairs=3,
         lattice_group=None,
         dimensions=None,
+        nproc=1,
     ):
         r"""Initialise a Target object.
 
@@ -55,11 +178,14 @@ def __init__(
             in the analysis. If not set, then the number of dimensions used is
             equal to the greater of 2 or the number of symmetry operations in the
             lattice group.
+          nproc (int): The number of processes to use in calculating the rij
+            matrix.
         """
         if weights is not None:
             assert weights in ("count", "standard_error")
         self._weights = weights
         self._min_pairs = min_pairs
+        self._nproc = nproc
 
         data = intensities.customized_copy(anomalous_flag=False)
         cb_op_to_primitive = data.change_of_basis_op_to_primitive_setting()
@@ -191,67 +317,47 @@ def _compute_rij_wij(self, use_cache=True):
         for cb_op, hkl in indices.items():
             indices[cb_op] = np.ravel_multi_index((hkl + offset).T, dims)
 
-        # Create an empty 2D array of shape (m * n, L), where m is the number of sym
-        # ops, n is the number of lattices, and L is the number of unique miller indices
-        all_intensities = np.empty((n_sym_ops * n_lattices, np.prod(dims)))
-
-        # Populate all_intensities with intensity values, filling absent intensities
-        # with np.nan
-        all_intensities.fill(np.nan)
+        # Collect the (row, column, value) entries of the sparse (m * n, L) matrix
+        # of intensities, where m is the number of sym ops, n is the number of
+        # lattices, and L is the number of unique miller indices
         slices = np.append(self._lattices, intensities.size)
-        slices = list(map(slice, slices[:-1], slices[1:]))
+        lattice_index = np.repeat(np.arange(n_lattices), np.diff(slices))
+        rows = []
+        columns = []
+        values = []
         for i, (mil_ind, eps) in enumerate(zip(indices.values(), epsilons.values())):
-            for j, selection in enumerate(slices):
-                # map (i, j) to a column in all_intensities
-                column = np.ravel_multi_index((i, j), (n_sym_ops, n_lattices))
-                epsilon_equals_one = eps[selection] == 1
-                valid_mil_ind = mil_ind[selection][epsilon_equals_one]
-                valid_intensities = intensities[selection][epsilon_equals_one]
-                all_intensities[column, valid_mil_ind] = valid_intensities
-
-        # Ideally we would use `np.ma.corrcoef` here, but it is broken, so use
-        # pd.DataFrame.corr() instead (see numpy/numpy#15601)
-        rij = (
-            pd.DataFrame(all_intensities)
-            .T.dropna(how="all")
-            .corr(min_periods=self._min_pairs)
-            .values
+            epsilon_equals_one = eps == 1
+            rows.append(i * n_lattices + lattice_index[epsilon_equals_one])
+            columns.append(mil_ind[epsilon_equals_one])
+            values.append(intensities[epsilon_equals_one])
+
+        rij, n_pairs = _pairwise_correlations(
+            np.concatenate(rows),
+            np.concatenate(columns),
+            np.concatenate(values),
+            n_sym_ops * n_lattices,
+            nproc=self._nproc,
         )
-        # Set any NaN correlation coefficients to zero
-        np.nan_to_num(rij, copy=False)
+        # Only use correlation coefficients calculated from at least min_pairs
+        # pairs of reflections
+        rij[n_pairs < self._min_pairs] = 0
         # Cosym does not make use of the on-diagonal correlation coefficients
         np.fill_diagonal(rij, 0)
 
         if self._weights:
-            wij = np.zeros_like(rij)
-            right_up = np.triu_indices_from(wij, k=1)
-
             # For each correlation coefficient, set the weight equal to the size of
             # the sample used to calculate that coefficient
-            pairwise_combos = itertools.combinations(np.isfinite(all_intensities), 2)
-
-            def sample_size(x, y):
-                pairs = np.count_nonzero(x & y)
-                if pairs < self._min_pairs:
-                    return 0
-                else:
-                    return pairs
-
-            wij[right_up] = list(itertools.starmap(sample_size, pairwise_combos))
+            wij = np.where(n_pairs < self._min_pairs, 0, n_pairs).astype(np.float64)
+            np.fill_diagonal(wij, 0)
 
             if self._weights == "standard_error":
                 # Set each weights as the reciprocal of the standard error on the
                 # corresponding correlation coefficient
                 # http://www.sjsu.edu/faculty/gerstman/StatPrimer/correlation.pdf
                 with np.errstate(divide="ignore", invalid="ignore"):
-                    reciprocal_se = np.sqrt(
-                        (wij[right_up] - 2) / (1 - np.square(rij[right_up]))
-                    )
-
-                wij[right_up] = np.where(wij[right_up] > 2, reciprocal_se, 0)
+                    reciprocal_se = np.sqrt((wij - 2) / (1 - np.square(rij)))
 
-            # Symmetrise the wij matrix
-            wij += wij.T
+                wij = np.where(wij > 2, reciprocal_se, 0)
         else:
             wij = None
 
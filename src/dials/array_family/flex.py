@@ -138,6 +138,7 @@
 
 from dials.array_family.flex_ext import (  # noqa: F401; lgtm
     real,
+    reflection_match_index,
     reflection_table_selector,
 )
 from dials_array_family_flex_ext import (  # noqa: F401; lgtm
@@ -6,10 +6,13 @@
 from __future__ import annotations
 
 import collections
+import concurrent.futures
+import contextlib
 import copy
 import functools
 import itertools
 import logging
+import mmap
 import operator
 import os
 import pickle
@@ -23,8 +26,10 @@
 import cctbx.array_family.flex
 import cctbx.miller
 import libtbx.smart_open
+from dxtbx import flumpy
 from scitbx import matrix
 
+import dials.array_family.msgpack_columns
 import dials.extensions.glm_background_ext
 import dials.extensions.simple_centroid_ext
 import dials.util.ext
@@ -32,7 +37,7 @@
 from dials.algorithms.centroid import centroid_px_to_mm_panel
 from dials.util.exclude_images import expand_exclude_multiples, set_invalid_images
 
-__all__ = ["real", "reflection_table_selector"]
+__all__ = ["real", "reflection_match_index", "reflection_table_selector"]
 
 logger = logging.getLogger(__name__)
 
@@ -213,16 +218,45 @@ def as_msgpack_file(self, filename):
             self.as_msgpack_to_file(dials.util.ext.streambuf(python_file_obj=outfile))
 
     @staticmethod
-    def from_msgpack_file(filename):
+    def from_msgpack_file(filename, columns=None, exclude_columns=None):
         """
         Read the reflection table from file in msgpack format
+
+        If columns or exclude_columns are given, the file is memory-mapped and
+        only the payloads of the selected columns are read and decoded.
+
+        :param filename: The msgpack filename
+        :param columns: Only load these columns (None for all)
+        :param exclude_columns: Do not load these columns
+        :return: The reflection table
         """
         if filename and hasattr(filename, "__fspath__"):
             filename = filename.__fspath__()
-        with libtbx.smart_open.for_reading(filename, "rb") as infile:
-            return dials_array_family_flex_ext.reflection_table.from_msgpack(
-                infile.read()
+        if columns is None and not exclude_columns:
+            with libtbx.smart_open.for_reading(filename, "rb") as infile:
+                return dials_array_family_flex_ext.reflection_table.from_msgpack(
+                    infile.read()
+                )
+        with open(filename, "rb") as infile:
+            try:
+                buffer = mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                buffer = None
+            if buffer is not None and buffer[:1] != b"\x93":
+                # Not a bare msgpack table e.g. a compressed file
+                buffer.close()
+                buffer = None
+        if buffer is None:
+            with libtbx.smart_open.for_reading(filename, "rb") as infile:
+                buffer = infile.read()
+        try:
+            data = dials.array_family.msgpack_columns.select_columns(
+                buffer, columns=columns, exclude_columns=exclude_columns
             )
+        finally:
+            if isinstance(buffer, mmap.mmap):
+                buffer.close()
+        return dials_array_family_flex_ext.reflection_table.from_msgpack(data)
 
     def as_file(self, filename):
         """
@@ -234,16 +268,28 @@ def as_file(self, filename):
             self.as_msgpack_file(filename)
 
     @staticmethod
-    def from_file(filename):
+    def from_file(filename, columns=None, exclude_columns=None):
         """
         Read the reflection table from either pickle or msgpack
+
+        :param filename: The reflection filename
+        :param columns: Only load these columns (None for all)
+        :param exclude_columns: Do not load these columns
+        :return: The reflection table
         """
         try:
             return dials_array_family_flex_ext.reflection_table.from_msgpack_file(
-                filename
+                filename, columns=columns, exclude_columns=exclude_columns
             )
         except RuntimeError:
-            return dials_array_family_flex_ext.reflection_table.from_pickle(filename)
+            table = dials_array_family_flex_ext.reflection_table.from_pickle(filename)
+        # Pickled tables can only be filtered after loading
+        for key in list(table.keys()):
+            if (columns is not None and key not in columns) or (
+                exclude_columns and key in exclude_columns
+            ):
+                del table[key]
+        return table
 
     @staticmethod
     def empty_standard(nrows):
@@ -536,85 +582,29 @@ def concat(
             first.extend(table)
         return first
 
-    def match_with_reference(self, other):
+    def match_with_reference(self, other, index=None):
         """
         Match reflections with another set of reflections.
 
+        Reflections are matched on experiment id, miller index, entering flag
+        and panel. Where several reflections share these, each reflection is
+        paired with its nearest reference reflection (by xyzcal.px), and each
+        reference reflection is kept only for the closest of those.
+
         :param other: The reflection table to match against
+        :param index: Optionally, a reflection_match_index already built from
+                      other, to avoid rebuilding it for repeated matches
         :return: The matches
         """
         logger.info("Matching reference spots with predicted reflections")
         logger.info(" %d observed reflections input", len(other))
         logger.info(" %d reflections predicted", len(self))
 
-        # Get the miller index, entering flag and turn number for
-        # Both sets of reflections
-        i1 = self["id"]
-        h1 = self["miller_index"]
-        e1 = self["entering"].as_int()
-        x1, y1, z1 = self["xyzcal.px"].parts()
-        p1 = self["panel"]
-
-        i2 = other["id"]
-        h2 = other["miller_index"]
-        e2 = other["entering"].as_int()
-        x2, y2, z2 = other["xyzcal.px"].parts()
-        p2 = other["panel"]
-
-        class Match:
-            def __init__(self):
-                self.a = []
-                self.b = []
-
-        # Create the match lookup
-        lookup = collections.defaultdict(Match)
-        for i in range(len(self)):
-            item = h1[i] + (e1[i], i1[i], p1[i])
-            lookup[item].a.append(i)
-
-        # Add matches from input reflections
-        for i in range(len(other)):
-            item = h2[i] + (e2[i], i2[i], p2[i])
-            if item in lookup:
-                lookup[item].b.append(i)
-
-        # Create the list of matches
-        match1 = []
-        match2 = []
-        for item, value in lookup.items():
-            if len(value.b) == 0:
-                continue
-            elif len(value.a) == 1 and len(value.b) == 1:
-                match1.append(value.a[0])
-                match2.append(value.b[0])
-            else:
-                matched = {}
-                for i in value.a:
-                    d = []
-                    for j in value.b:
-                        dx = x1[i] - x2[j]
-                        dy = y1[i] - y2[j]
-                        dz = z1[i] - z2[j]
-                        d.append((i, j, dx**2 + dy**2 + dz**2))
-                    i, j, d = min(d, key=lambda x: x[2])
-                    if j not in matched:
-                        matched[j] = (i, d)
-                    elif d < matched[j][1]:
-                        matched[j] = (i, d)
-                for key1, value1 in matched.items():
-                    match1.append(value1[0])
-                    match2.append(key1)
-
-        # Select everything which matches
-        sind = cctbx.array_family.flex.size_t(match1)
-        oind = cctbx.array_family.flex.size_t(match2)
-
-        # Sort by self index
-        sort_index = cctbx.array_family.flex.size_t(
-            sorted(range(len(sind)), key=lambda x: sind[x])
-        )
-        sind = sind.select(sort_index)
-        oind = oind.select(sort_index)
+        if index is None:
+            index = reflection_match_index(other)
+        else:
+            assert index.size == len(other)
+        sind, oind = index.match(self)
 
         s2 = self.select(sind)
         o2 = other.select(oind)
@@ -960,9 +950,13 @@ def extract_shoeboxes(self, imageset, mask=None, nthreads=1):
         """
         Helper function to read a load of shoebox data.
 
+        With more than one thread, images are read and decoded by a pool of
+        reader threads, up to 2 * nthreads images ahead of the extraction, so
+        that image reading overlaps with the extraction into the shoeboxes.
+
         :param imageset: The imageset
         :param mask: The mask to apply
-        :param nthreads: The number of threads to use
+        :param nthreads: The number of threads to use for reading images
         :return: A tuple containing read time and extract time
         """
         from time import time
@@ -978,10 +972,8 @@ def extract_shoeboxes(self, imageset, mask=None, nthreads=1):
         extractor = dials_array_family_flex_ext.ShoeboxExtractor(
             self, len(detector), frame0, frame1
         )
-        logger.info(" Beginning to read images")
-        read_time = 0
-        extract_time = 0
-        for i in range(len(imageset)):
+
+        def read_image(i):
             logger.debug("  reading image %d", i)
             st = time()
             image = imageset.get_corrected_data(i)
@@ -989,11 +981,37 @@ def extract_shoeboxes(self, imageset, mask=None, nthreads=1):
             if mask is not None:
                 assert len(mask) == len(mask2)
                 mask2 = tuple(m1 & m2 for m1, m2 in zip(mask, mask2))
-            read_time += time() - st
-            st = time()
-            extractor.next(make_image(image, mask2))
-            extract_time += time() - st
-            del image
+            return image, mask2, time() - st
+
+        def read_images_ahead(pool):
+            # Keep a bounded number of reads in flight, yielding in image order
+            pending = collections.deque()
+            indices = iter(range(len(imageset)))
+            for i in itertools.islice(indices, 2 * nthreads):
+                pending.append(pool.submit(read_image, i))
+            while pending:
+                result = pending.popleft().result()
+                for i in itertools.islice(indices, 1):
+                    pending.append(pool.submit(read_image, i))
+                yield result
+
+        logger.info(" Beginning to read images")
+        read_time = 0
+        extract_time = 0
+        with contextlib.ExitStack() as stack:
+            if nthreads > 1:
+                pool = stack.enter_context(
+                    concurrent.futures.ThreadPoolExecutor(max_workers=nthreads)
+                )
+                images = read_images_ahead(pool)
+            else:
+                images = map(read_image, range(len(imageset)))
+            for image, mask2, image_read_time in images:
+                read_time += image_read_time
+                st = time()
+                extractor.next(make_image(image, mask2))
+                extract_time += time() - st
+                del image
         assert extractor.finished()
         logger.info("  successfully read %d images", frame1 - frame0)
         logger.info("  read time: %.1f seconds", read_time)
@@ -1399,6 +1417,107 @@ def get(self, key, default=None):
         return default
 
 
+class reflection_match_index:
+    """
+    An index of reference reflections for reflection_table.match_with_reference.
+
+    The reference reflections are sorted on a packed integer key of (id,
+    miller_index, entering, panel) so that the index can be built once and
+    used to match any number of other reflection tables against it.
+    """
+
+    _key_columns = 6
+
+    def __init__(self, reference):
+        """
+        Build the index.
+
+        :param reference: The reference reflection table
+        """
+        keys = self._key_array(reference)
+        self.size = len(keys)
+        self._min = keys.min(axis=0) if self.size else np.zeros(6, dtype=np.int64)
+        span = (keys.max(axis=0) - self._min + 1) if self.size else np.ones(6)
+        self._span = span.astype(np.int64)
+        # Pack the keys into a single integer where they fit, or else compare
+        # the raw bytes of each row
+        self._packed = bool(np.prod(self._span.astype(float)) < 2**62)
+        if self._packed:
+            self._strides = np.cumprod(np.concatenate(([1], self._span[:0:-1])))[
+                ::-1
+            ].astype(np.int64)
+        packed = self._pack(keys)
+        self._order = np.argsort(packed, kind="stable")
+        self._keys = packed[self._order]
+        self._xyz = flumpy.to_numpy(reference["xyzcal.px"])[self._order]
+
+    @staticmethod
+    def _key_array(table):
+        keys = np.empty((len(table), 6), dtype=np.int64)
+        keys[:, 0] = flumpy.to_numpy(table["id"])
+        keys[:, 1:4] = flumpy.to_numpy(table["miller_index"])
+        keys[:, 4] = flumpy.to_numpy(table["entering"])
+        keys[:, 5] = flumpy.to_numpy(table["panel"])
+        return keys
+
+    def _pack(self, keys):
+        if not self._packed:
+            keys = np.ascontiguousarray(keys)
+            return keys.view(np.dtype((np.void, keys.itemsize * 6))).ravel()
+        return (keys - self._min) @ self._strides
+
+    def match(self, reflections):
+        """
+        Match reflections against the reference reflections.
+
+        :param reflections: The reflection table to match
+        :return: A tuple of flex.size_t indices into reflections and into the
+                 reference, sorted by the reflections index
+        """
+        keys = self._key_array(reflections)
+        if self._packed:
+            # Keys outside the reference range cannot match, and must not be
+            # packed as they could alias other keys
+            valid = ((keys >= self._min) & (keys < self._min + self._span)).all(axis=1)
+            keys = np.where(valid[:, None], keys, self._min)
+        else:
+            valid = np.ones(len(keys), dtype=bool)
+        packed = self._pack(keys)
+        lo = np.searchsorted(self._keys, packed, side="left")
+        hi = np.searchsorted(self._keys, packed, side="right")
+        counts = np.where(valid, hi - lo, 0)
+
+        # Expand to every candidate (reflection, reference) pair
+        a = np.repeat(np.arange(len(keys)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        b_sorted = np.repeat(lo, counts) + offsets
+        b = self._order[b_sorted]
+        delta = flumpy.to_numpy(reflections["xyzcal.px"])[a] - self._xyz[b_sorted]
+        d = delta[:, 0] ** 2 + delta[:, 1] ** 2 + delta[:, 2] ** 2
+
+        # Pair each reflection with its nearest reference reflection, taking
+        # the lowest reference index on a tie
+        order = np.lexsort((b, d, a))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = a[order][1:] != a[order][:-1]
+        a, b, d = a[order][first], b[order][first], d[order][first]
+
+        # Keep only the closest reflection for each reference reflection,
+        # taking the lowest reflection index on a tie
+        order = np.lexsort((a, d, b))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = b[order][1:] != b[order][:-1]
+        a, b = a[order][first], b[order][first]
+
+        order = np.argsort(a)
+        return (
+            flumpy.from_numpy(a[order].astype(np.uint64)),
+            flumpy.from_numpy(b[order].astype(np.uint64)),
+        )
+
+
 class reflection_table_selector:
     """
     A class to select columns from reflection table.
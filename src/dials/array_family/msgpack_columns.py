@@ -0,0 +1,242 @@
+"""
+Column-level access to msgpack encoded reflection tables.
+
+A reflection table is written by the C++ msgpack adapter as
+
+    [
+      "dials::af::reflection_table",
+      VERSION,
+      {
+        "identifiers" : { ... },
+        "nrows" : N_ROWS,
+        "data" : {
+          COLUMN_NAME : [TYPE_NAME, [SIZE, PAYLOAD]],
+          ...
+        }
+      }
+    ]
+
+The functions here walk this framing without decoding any column payloads, so
+that a subset of the columns can be sliced directly out of a (memory-mapped)
+file buffer and handed to reflection_table.from_msgpack. Only the bytes of the
+requested columns are ever touched.
+"""
+
+from __future__ import annotations
+
+import struct
+
+__all__ = ["column_names", "index_columns", "select_columns"]
+
+# Total encoded size of the msgpack types that have no variable-length body
+_FIXED_SIZE = {
+    0xC0: 1,  # nil
+    0xC2: 1,  # false
+    0xC3: 1,  # true
+    0xCA: 5,  # float 32
+    0xCB: 9,  # float 64
+    0xCC: 2,  # uint 8
+    0xCD: 3,  # uint 16
+    0xCE: 5,  # uint 32
+    0xCF: 9,  # uint 64
+    0xD0: 2,  # int 8
+    0xD1: 3,  # int 16
+    0xD2: 5,  # int 32
+    0xD3: 9,  # int 64
+    0xD4: 3,  # fixext 1
+    0xD5: 4,  # fixext 2
+    0xD6: 6,  # fixext 4
+    0xD7: 10,  # fixext 8
+    0xD8: 18,  # fixext 16
+}
+
+# Types with a length prefix: (prefix format, extra header bytes after the length)
+_SIZED = {
+    0xC4: (">B", 0),  # bin 8
+    0xC5: (">H", 0),  # bin 16
+    0xC6: (">I", 0),  # bin 32
+    0xC7: (">B", 1),  # ext 8
+    0xC8: (">H", 1),  # ext 16
+    0xC9: (">I", 1),  # ext 32
+    0xD9: (">B", 0),  # str 8
+    0xDA: (">H", 0),  # str 16
+    0xDB: (">I", 0),  # str 32
+}
+
+_TABLE_TYPE_NAME = "dials::af::reflection_table"
+
+
+def _read_length(buffer, pos, fmt):
+    return struct.unpack_from(fmt, buffer, pos)[0], pos + struct.calcsize(fmt)
+
+
+def _read_container_header(buffer, pos, kind):
+    """Read an array or map header, returning the number of items and body offset"""
+    byte = buffer[pos]
+    if kind == "array":
+        if 0x90 <= byte <= 0x9F:
+            return byte & 0x0F, pos + 1
+        if byte == 0xDC:
+            return _read_length(buffer, pos + 1, ">H")
+        if byte == 0xDD:
+            return _read_length(buffer, pos + 1, ">I")
+    else:
+        if 0x80 <= byte <= 0x8F:
+            return byte & 0x0F, pos + 1
+        if byte == 0xDE:
+            return _read_length(buffer, pos + 1, ">H")
+        if byte == 0xDF:
+            return _read_length(buffer, pos + 1, ">I")
+    raise RuntimeError(f"Expected msgpack {kind} at offset {pos}")
+
+
+def _read_str(buffer, pos):
+    """Read a str (or bin) object, returning the decoded string and next offset"""
+    byte = buffer[pos]
+    if 0xA0 <= byte <= 0xBF:
+        length, pos = byte & 0x1F, pos + 1
+    elif byte in (0xC4, 0xC5, 0xC6, 0xD9, 0xDA, 0xDB):
+        length, pos = _read_length(buffer, pos + 1, _SIZED[byte][0])
+    else:
+        raise RuntimeError(f"Expected msgpack string at offset {pos}")
+    return bytes(buffer[pos : pos + length]).decode("utf-8"), pos + length
+
+
+def _skip(buffer, pos):
+    """Return the offset just past the msgpack object starting at pos"""
+    pending = 1
+    while pending:
+        pending -= 1
+        byte = buffer[pos]
+        if byte <= 0x7F or byte >= 0xE0:
+            pos += 1
+        elif byte <= 0x8F:
+            pending += 2 * (byte & 0x0F)
+            pos += 1
+        elif byte <= 0x9F:
+            pending += byte & 0x0F
+            pos += 1
+        elif byte <= 0xBF:
+            pos += 1 + (byte & 0x1F)
+        elif byte in _FIXED_SIZE:
+            pos += _FIXED_SIZE[byte]
+        elif byte in _SIZED:
+            fmt, extra = _SIZED[byte]
+            length, pos = _read_length(buffer, pos + 1, fmt)
+            pos += extra + length
+        elif byte in (0xDC, 0xDD):
+            count, pos = _read_container_header(buffer, pos, "array")
+            pending += count
+        elif byte in (0xDE, 0xDF):
+            count, pos = _read_container_header(buffer, pos, "map")
+            pending += 2 * count
+        else:
+            raise RuntimeError(f"Invalid msgpack type byte {byte:#x} at offset {pos}")
+    return pos
+
+
+def _pack_str(value):
+    data = value.encode("utf-8")
+    if len(data) < 32:
+        return bytes([0xA0 | len(data)]) + data
+    if len(data) < 0x100:
+        return struct.pack(">BB", 0xD9, len(data)) + data
+    if len(data) < 0x10000:
+        return struct.pack(">BH", 0xDA, len(data)) + data
+    return struct.pack(">BI", 0xDB, len(data)) + data
+
+
+def _pack_map_header(count):
+    if count < 16:
+        return bytes([0x80 | count])
+    if count < 0x10000:
+        return struct.pack(">BH", 0xDE, count)
+    return struct.pack(">BI", 0xDF, count)
+
+
+def index_columns(buffer):
+    """
+    Locate the header entries and columns of a msgpack encoded reflection table.
+
+    :param buffer: A bytes-like object (e.g. an mmap) holding the encoded table
+    :returns: A tuple (prefix, header, columns). prefix is the byte range of the
+              type name and version, header a list of byte ranges of the
+              (key, value) pairs in the header map other than "data", and
+              columns a dict mapping each column name to the byte range of its
+              (key, value) pair in the data map.
+    """
+    try:
+        count, pos = _read_container_header(buffer, 0, "array")
+        if count != 3:
+            raise RuntimeError("Reflection table msgpack must be an array of 3")
+        prefix_start = pos
+        type_name, pos = _read_str(buffer, pos)
+        if type_name != _TABLE_TYPE_NAME:
+            raise RuntimeError(f"Unexpected msgpack object type {type_name}")
+        pos = _skip(buffer, pos)
+        prefix = (prefix_start, pos)
+
+        header = []
+        columns = {}
+        data_found = False
+        count, pos = _read_container_header(buffer, pos, "map")
+        for _ in range(count):
+            entry_start = pos
+            key, pos = _read_str(buffer, pos)
+            if key != "data":
+                pos = _skip(buffer, pos)
+                header.append((entry_start, pos))
+                continue
+            data_found = True
+            num_columns, pos = _read_container_header(buffer, pos, "map")
+            for _ in range(num_columns):
+                column_start = pos
+                name, pos = _read_str(buffer, pos)
+                pos = _skip(buffer, pos)
+                columns[name] = (column_start, pos)
+    except (IndexError, struct.error):
+        raise RuntimeError("Truncated reflection table msgpack data")
+    if not data_found:
+        raise RuntimeError("Reflection table msgpack has no data")
+    return prefix, header, columns
+
+
+def column_names(buffer):
+    """
+    List the columns of a msgpack encoded reflection table without decoding them.
+
+    :param buffer: A bytes-like object holding the encoded table
+    :returns: The column names, in file order
+    """
+    return list(index_columns(buffer)[2])
+
+
+def select_columns(buffer, columns=None, exclude_columns=None):
+    """
+    Build a msgpack reflection table containing a subset of the input columns.
+
+    The payloads of the selected columns are copied verbatim from the buffer;
+    all other columns are skipped over without being read.
+
+    :param buffer: A bytes-like object holding the encoded table
+    :param columns: The columns to keep (None for all). Requested columns which
+                    are not present in the table are ignored.
+    :param exclude_columns: Columns to drop
+    :returns: The encoded table, as bytes
+    """
+    prefix, header, index = index_columns(buffer)
+    names = list(index)
+    if columns is not None:
+        wanted = set(columns)
+        names = [name for name in names if name in wanted]
+    if exclude_columns:
+        excluded = set(exclude_columns)
+        names = [name for name in names if name not in excluded]
+
+    parts = [bytes([0x93]), buffer[prefix[0] : prefix[1]]]
+    parts.append(_pack_map_header(len(header) + 1))
+    parts.extend(buffer[start:end] for start, end in header)
+    parts.append(_pack_str("data"))
+    parts.append(_pack_map_header(len(names)))
+    parts.extend(buffer[index[name][0] : index[name][1]] for name in names)
+    return b"".join(parts)
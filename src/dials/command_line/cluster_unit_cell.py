@@ -28,6 +28,19 @@
 threshold = 5000
   .type = float(value_min=0)
   .help = 'Threshold value for the clustering'
+nproc = 1
+  .type = int(value_min=1)
+  .help = "Number of processes to use for calculating the pairwise distances"
+approximate = False
+  .type = bool
+  .help = "Only calculate distances between each unit cell and its nearest"
+          "neighbours in G6 space, rather than between all pairs of unit cells."
+          "This makes clustering of very large numbers of unit cells feasible,"
+          "at the risk of missing links between clusters."
+n_neighbours = 20
+  .type = int(value_min=1)
+  .help = "The number of nearest neighbours to consider for each unit cell"
+          "when approximate=True"
 plot {
   show = False
     .type = bool
@@ -184,6 +197,9 @@ def do_cluster_analysis(crystal_symmetries, params):
         threshold=params.threshold,
         ax=ax,
         no_plot=no_plot,
+        nproc=params.nproc,
+        approximate=params.approximate,
+        n_neighbours=params.n_neighbours,
     )
     print(clustering)
 
@@ -587,6 +587,7 @@ def run(args=None):
         check_format=False,
         phil=phil_scope,
         epilog=help_message,
+        exclude_reflection_columns=["shoebox"],
     )
 
     # Get the parameters
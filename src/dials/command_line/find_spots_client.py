@@ -29,6 +29,13 @@ def work(host, port, filename, params):
     return conn.getresponse().read()
 
 
+def work_batch(host, port, filenames, params):
+    conn = http.client.HTTPConnection(host, port)
+    body = json.dumps({"images": list(filenames), "params": list(params)})
+    conn.request("POST", "/", body=body, headers={"Content-type": "application/json"})
+    return conn.getresponse().read()
+
+
 def _nproc():
     return available_cores()
 
@@ -88,19 +95,36 @@ def work_all(
     json_file=None,
     grid=None,
     nproc=None,
+    batch_size=1,
 ):
     if nproc is None:
         nproc = _nproc()
     with ThreadPool(processes=nproc) as pool:
-        threads = {}
-        for filename in filenames:
-            threads[filename] = pool.apply_async(work, (host, port, filename, params))
         results = []
-        for filename in filenames:
-            response = threads[filename].get()
-            d = json.loads(response)
-            results.append(d)
-            print(response_to_xml(d))
+        if batch_size > 1:
+            batches = [
+                filenames[i : i + batch_size]
+                for i in range(0, len(filenames), batch_size)
+            ]
+            threads = [
+                pool.apply_async(work_batch, (host, port, batch, params))
+                for batch in batches
+            ]
+            for thread in threads:
+                for d in json.loads(thread.get()):
+                    results.append(d)
+                    print(response_to_xml(d))
+        else:
+            threads = {}
+            for filename in filenames:
+                threads[filename] = pool.apply_async(
+                    work, (host, port, filename, params)
+                )
+            for filename in filenames:
+                response = threads[filename].get()
+                d = json.loads(response)
+                results.append(d)
+                print(response_to_xml(d))
 
     if json_file is not None:
         with open(json_file, "wb") as f:
@@ -196,6 +220,9 @@ def stop(host, port, nproc):
   .type = path
 grid = None
   .type = ints(size=2, value_min=1)
+batch_size = 1
+  .type = int(value_min=1)
+  .help = "Send this many images to the server in each request"
 """
 )
 
@@ -260,6 +287,7 @@ def run(args=None):
                 json_file=params.json,
                 grid=params.grid,
                 nproc=nproc,
+                batch_size=params.batch_size,
             )
 
 
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import collections
 import http.server as server_base
 import json
 import logging
 import multiprocessing
+import os
 import sys
 import time
 import urllib.parse
@@ -68,6 +70,11 @@
 
   dials.find_spots_client /path/to/image.cbf min_spot_size=2 d_min=2
 
+Several images may be processed in one request by POSTing a JSON document
+``{"images": [...], "params": [...]}``, which returns a list of results. Each
+result includes a ``timings`` dictionary of the time spent in each stage.
+Per-process request counts and latencies are returned from ``/metrics``.
+
 To stop the server::
 
   dials.find_spots_client stop [host=hostname] [port=1234]
@@ -75,6 +82,92 @@
 
 stop = False
 
+work_phil_scope = libtbx.phil.parse(
+    """\
+ice_rings {
+  filter = True
+    .type = bool
+  width = 0.004
+    .type = float(value_min=0.0)
+}
+index = False
+  .type = bool
+integrate = False
+  .type = bool
+indexing_min_spots = 10
+  .type = int(value_min=1)
+"""
+)
+
+# Each server process keeps the parsed parameters for recently seen command
+# lines, and the experiments imported from recently seen multi-image files
+_parameter_cache = {}
+_max_cached_parameters = 64
+_experiments_cache = collections.OrderedDict()
+_max_cached_experiments = 8
+
+# Request latency metrics for this server process
+_metrics = {"n_requests": 0, "n_images": 0, "total_time": 0.0, "max_time": 0.0}
+
+
+def _fetch_parameters(name, phil_scope, args):
+    """
+    Process command line arguments against a phil scope, caching the result.
+
+    :returns: The fetched phil scope and the list of unhandled arguments
+    """
+    key = (name, tuple(args))
+    if key not in _parameter_cache:
+        if len(_parameter_cache) >= _max_cached_parameters:
+            _parameter_cache.clear()
+        interp = phil_scope.command_line_argument_interpreter()
+        _parameter_cache[key] = interp.process_and_fetch(
+            list(args), custom_processor="collect_remaining"
+        )
+    fetched, unhandled = _parameter_cache[key]
+    return fetched, list(unhandled)
+
+
+def _load_experiments(filename, use_cache):
+    """
+    Import the experiments for an image file.
+
+    Files holding many images (e.g. an HDF5 master file queried image by image
+    with scan_range) are imported once per server process and reused for as
+    long as the file is unchanged. The cached experiments are only used when
+    the models will not be modified by the request.
+    """
+    if not use_cache:
+        return ExperimentListFactory.from_filenames([filename])
+    try:
+        stat = os.stat(filename)
+        key = (filename, stat.st_mtime, stat.st_size)
+    except OSError:
+        return ExperimentListFactory.from_filenames([filename])
+    if key in _experiments_cache:
+        _experiments_cache.move_to_end(key)
+        return _experiments_cache[key]
+    experiments = ExperimentListFactory.from_filenames([filename])
+    if experiments.imagesets() and len(experiments.imagesets()[0]) > 1:
+        _experiments_cache[key] = experiments
+        while len(_experiments_cache) > _max_cached_experiments:
+            _experiments_cache.popitem(last=False)
+    return experiments
+
+
+def _unquote_filename(filename):
+    # If we're passing a url through, then unquote and ignore leading /
+    if "%3A//" in filename:
+        filename = urllib.parse.unquote(filename[1:])
+    return filename
+
+
+def _record_metrics(elapsed, n_images=1):
+    _metrics["n_requests"] += 1
+    _metrics["n_images"] += n_images
+    _metrics["total_time"] += elapsed
+    _metrics["max_time"] = max(_metrics["max_time"], elapsed)
+
 
 def _filter_by_resolution(experiments, reflections, d_min=None, d_max=None):
     reflections.centroid_px_to_mm(experiments)
@@ -99,42 +192,30 @@ def work(filename, cl=None):
     if cl is None:
         cl = []
 
-    phil_scope = libtbx.phil.parse(
-        """\
-ice_rings {
-  filter = True
-    .type = bool
-  width = 0.004
-    .type = float(value_min=0.0)
-}
-index = False
-  .type = bool
-integrate = False
-  .type = bool
-indexing_min_spots = 10
-  .type = int(value_min=1)
-"""
-    )
-    interp = phil_scope.command_line_argument_interpreter()
-    params, unhandled = interp.process_and_fetch(
-        cl, custom_processor="collect_remaining"
-    )
-    filter_ice = params.extract().ice_rings.filter
-    ice_rings_width = params.extract().ice_rings.width
-    index = params.extract().index
-    integrate = params.extract().integrate
-    indexing_min_spots = params.extract().indexing_min_spots
-
-    interp = find_spots_phil_scope.command_line_argument_interpreter()
-    phil_scope, unhandled = interp.process_and_fetch(
-        unhandled, custom_processor="collect_remaining"
+    t_start = time.perf_counter()
+    timings = {}
+    phil_scope, unhandled = _fetch_parameters("work", work_phil_scope, cl)
+    params = phil_scope.extract()
+    filter_ice = params.ice_rings.filter
+    ice_rings_width = params.ice_rings.width
+    index = params.index
+    integrate = params.integrate
+    indexing_min_spots = params.indexing_min_spots
+
+    phil_scope, unhandled = _fetch_parameters(
+        "find_spots", find_spots_phil_scope, unhandled
     )
     logger.info("The following spotfinding parameters have been modified:")
     logger.info(find_spots_phil_scope.fetch_diff(source=phil_scope).as_str())
     params = phil_scope.extract()
     # no need to write the hot mask in the server/client
     params.spotfinder.write_hot_mask = False
-    experiments = ExperimentListFactory.from_filenames([filename])
+    timings["parameters"] = time.perf_counter() - t_start
+
+    t_import = time.perf_counter()
+    experiments = _load_experiments(
+        filename, use_cache=not index and not params.spotfinder.exclude_images
+    )
     if params.spotfinder.scan_range and len(experiments) > 1:
         # This means we've imported a sequence of still image: select
         # only the experiment, i.e. image, we're interested in
@@ -149,6 +230,7 @@ def work(filename, cl=None):
     params.spotfinder.filter.d_max = None
 
     t0 = time.perf_counter()
+    timings["import"] = t0 - t_import
     reflections = flex.reflection_table.from_observations(experiments, params)
 
     if d_min or d_max:
@@ -158,6 +240,7 @@ def work(filename, cl=None):
 
     t1 = time.perf_counter()
     logger.info("Spotfinding took %.2f seconds", t1 - t0)
+    timings["spotfinding"] = t1 - t0
 
     imageset = experiments.imagesets()[0]
     reflections.centroid_px_to_mm(experiments)
@@ -167,14 +250,12 @@ def work(filename, cl=None):
     )._asdict()
     t2 = time.perf_counter()
     logger.info("Resolution analysis took %.2f seconds", t2 - t1)
+    timings["resolution_analysis"] = t2 - t1
 
     if index and stats["n_spots_no_ice"] > indexing_min_spots:
         logging.basicConfig(stream=sys.stdout, level=logging.INFO)
 
-        interp = index_phil_scope.command_line_argument_interpreter()
-        phil_scope, unhandled = interp.process_and_fetch(
-            unhandled, custom_processor="collect_remaining"
-        )
+        phil_scope, unhandled = _fetch_parameters("index", index_phil_scope, unhandled)
         logger.info("The following indexing parameters have been modified:")
         index_phil_scope.fetch_diff(source=phil_scope).show()
         params = phil_scope.extract()
@@ -220,11 +301,11 @@ def work(filename, cl=None):
         finally:
             t3 = time.perf_counter()
             logger.info("Indexing took %.2f seconds", t3 - t2)
+            timings["indexing"] = t3 - t2
 
         if integrate and "lattices" in stats:
-            interp = integrate_phil_scope.command_line_argument_interpreter()
-            phil_scope, unhandled = interp.process_and_fetch(
-                unhandled, custom_processor="collect_remaining"
+            phil_scope, unhandled = _fetch_parameters(
+                "integrate", integrate_phil_scope, unhandled
             )
             logger.error("The following integration parameters have been modified:")
             integrate_phil_scope.fetch_diff(source=phil_scope).show()
@@ -289,10 +370,26 @@ def work(filename, cl=None):
             finally:
                 t4 = time.perf_counter()
                 logger.info("Integration took %.2f seconds", t4 - t3)
+                timings["integration"] = t4 - t3
 
+    timings["total"] = time.perf_counter() - t_start
+    stats["timings"] = timings
     return stats
 
 
+def work_batch(filenames, cl=None):
+    """Process several images with the same parameters, in order."""
+    results = []
+    for filename in filenames:
+        d = {"image": filename}
+        try:
+            d.update(work(filename, cl))
+        except Exception as e:
+            d["error"] = str(e)
+        results.append(d)
+    return results
+
+
 class handler(server_base.BaseHTTPRequestHandler):
     def do_GET(self):
         """Respond to a GET request."""
@@ -304,15 +401,19 @@ def do_GET(self):
             stop = True
             return
 
-        filename = self.path.split(";")[0]
-        params = self.path.split(";")[1:]
+        if self.path == "/metrics":
+            metrics = dict(_metrics, pid=os.getpid())
+            if metrics["n_requests"]:
+                metrics["mean_time"] = metrics["total_time"] / metrics["n_requests"]
+            self._send_json(200, metrics)
+            return
 
-        # If we're passing a url through, then unquote and ignore leading /
-        if "%3A//" in filename:
-            filename = urllib.parse.unquote(filename[1:])
+        filename = _unquote_filename(self.path.split(";")[0])
+        params = self.path.split(";")[1:]
 
         d = {"image": filename}
 
+        t0 = time.perf_counter()
         try:
             stats = work(filename, params)
             d.update(stats)
@@ -320,12 +421,30 @@ def do_GET(self):
         except Exception as e:
             d["error"] = str(e)
             response = 500
+        _record_metrics(time.perf_counter() - t0)
+
+        self._send_json(response, d)
+
+    def do_POST(self):
+        """Respond to a batch request for several images."""
+        t0 = time.perf_counter()
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length))
+            filenames = [_unquote_filename(f) for f in request["images"]]
+            params = request.get("params", [])
+        except Exception as e:
+            self._send_json(400, {"error": f"Invalid batch request: {e}"})
+            return
+        results = work_batch(filenames, params)
+        _record_metrics(time.perf_counter() - t0, n_images=len(filenames))
+        self._send_json(200, results)
 
+    def _send_json(self, response, d):
         self.send_response(response)
         self.send_header("Content-type", "application/json")
         self.end_headers()
-        response = json.dumps(d).encode()
-        self.wfile.write(response)
+        self.wfile.write(json.dumps(d).encode())
 
 
 def serve(httpd):
@@ -2447,6 +2447,7 @@ def __init__(self):
             read_experiments=True,
             check_format=False,
             epilog=help_message,
+            exclude_reflection_columns=["shoebox"],
         )
         dials.util.log.print_banner()
 
@@ -217,6 +217,9 @@ def run(args: List[str] = None, phil: phil.scope = phil_scope) -> None:
         phil=phil,
         check_format=False,
         epilog=__doc__,
+        exclude_reflection_columns=lambda params: (
+            ["shoebox"] if params.output.delete_integration_shoeboxes else None
+        ),
     )
     params, options = parser.parse_args(args=args, show_diff_phil=False)
 
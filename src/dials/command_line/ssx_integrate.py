@@ -34,7 +34,6 @@
 import logging
 import pathlib
 from dataclasses import dataclass
-from multiprocessing import Pool
 from typing import Any
 
 import iotbx.phil
@@ -58,7 +57,7 @@
 from dials.array_family import flex
 from dials.util import log, show_mail_handle_errors
 from dials.util.combine_experiments import CombineWithReference
-from dials.util.mp import available_cores
+from dials.util.mp import available_cores, bounded_imap_unordered, ordered_results
 from dials.util.options import ArgumentParser, flatten_experiments, flatten_reflections
 from dials.util.version import dials_version
 
@@ -252,7 +251,19 @@ class IntegrationResult:
     imageset_index: int = 0
 
 
+# The parameters are the same for every crystal, so when processing in parallel
+# they are set once per worker process rather than pickled with every input.
+_worker_params = None
+
+
+def _initialise_worker(params):
+    global _worker_params
+    _worker_params = params
+
+
 def wrap_integrate_one(input_to_integrate: InputToIntegrate):
+    if input_to_integrate.params is None:
+        input_to_integrate.params = _worker_params
     expt, refls, collector = process_one_image(
         input_to_integrate.experiment,
         input_to_integrate.table,
@@ -300,6 +311,8 @@ def process_batch(sub_tables, sub_expts, configuration, batch_offset=0):
 
     # create iterable
     input_iterable: List[InputToIntegrate] = []
+    params = configuration["params"]
+    parallel = params.nproc > 1
     from dxtbx.imageset import ImageSequence, ImageSet
 
     original_isets = list(sub_expts.imagesets())
@@ -327,27 +340,45 @@ def process_batch(sub_tables, sub_expts, configuration, batch_offset=0):
                 configuration["process"],
                 expt,
                 table,
-                configuration["params"],
+                None if parallel else params,
                 i + 1 + batch_offset,
                 imageset_index=n_iset,
             )
         )
-    input_iterable = sorted(input_iterable, key=lambda i: i.table.size(), reverse=True)
     with manage_loggers(
-        configuration["params"].individual_log_verbosity,
+        params.individual_log_verbosity,
         configuration["loggers_to_disable"],
     ):
-        if configuration["params"].nproc > 1:
-            with Pool(configuration["params"].nproc) as pool:
-                results: List[IntegrationResult] = pool.map(
-                    wrap_integrate_one, input_iterable
-                )
+        if parallel:
+            # Stream the inputs through the pool in crystal order and join the
+            # results as they become available, rather than holding all
+            # results until the end. Submitting in crystal order keeps the
+            # reordering buffer to around nproc results.
+            crystalnos = [i.crystalno for i in input_iterable]
+            results = ordered_results(
+                bounded_imap_unordered(
+                    wrap_integrate_one,
+                    input_iterable,
+                    params.nproc,
+                    initializer=_initialise_worker,
+                    initargs=(params,),
+                ),
+                keys=crystalnos,
+                key=lambda result: result.crystalno,
+            )
         else:
-            results: List[IntegrationResult] = [
-                wrap_integrate_one(i) for i in input_iterable
-            ]
+            results = (wrap_integrate_one(i) for i in input_iterable)
+
+        # then join
+        integrated_experiments, integrated_reflections = _join_integration_results(
+            results, sub_expts, original_isets, identifiers_to_scans, configuration
+        )
+    return integrated_experiments, integrated_reflections
+
 
-    # then join
+def _join_integration_results(
+    results, sub_expts, original_isets, identifiers_to_scans, configuration
+):
     integrated_reflections = flex.reflection_table()
     integrated_experiments = []
 
@@ -362,7 +393,7 @@ def process_batch(sub_tables, sub_expts, configuration, batch_offset=0):
         use_detector = sub_expts.detectors()[0]
 
     n_integrated = 0
-    for result in sorted(results, key=lambda result: result.crystalno):
+    for result in results:
         if result.table:
             if identifiers_to_scans:
                 result.experiment.scan = identifiers_to_scans[
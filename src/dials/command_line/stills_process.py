@@ -4,6 +4,7 @@
 import copy
 import glob
 import logging
+import multiprocessing
 import os
 import pickle
 import sys
@@ -121,6 +122,15 @@ def _control_phil_str():
               concatenated list of all the successful events examined by that process. \
               If False, output a separate experiment/reflection file per image (generates a \
               lot of files).
+    composite_flush_interval = None
+      .type = int(value_min=1)
+      .help = If set with composite_output, each process writes its composite files  \
+              after every composite_flush_interval events and then clears them from   \
+              memory, rather than keeping all the results until the end of the run.   \
+              The files of each chunk are tagged with the chunk number after the      \
+              process tag (for example idx-0000_000_integrated.refl), and can be read \
+              directly as separate inputs by downstream programs. Not available with  \
+              mp.composite_stride.
     logging_dir = None
       .type = str
       .help = Directory output log files will be placed
@@ -169,6 +179,12 @@ def _control_phil_str():
     nproc = 1
       .type = int(value_min=1)
       .help = "The number of processes to use."
+    chunk_size = 1
+      .type = int(value_min=1)
+      .help = For mp.method=multiprocessing, the number of images each process \
+              takes at a time from the shared list of images. Each process    \
+              takes the next chunk as soon as it finishes the last, so that   \
+              the processes stay busy however the hit rate varies.
     composite_stride = None
       .type = int
       .help = For MPI, if using composite mode, specify how many ranks to    \
@@ -531,6 +547,15 @@ def run(self, args=None):
             if mask_path is not None and not os.path.isfile(mask_path):
                 raise Sorry(f"Mask {mask_path} not found")
 
+        # Flushed chunks are written by each rank, bypassing the stride aggregation
+        if (
+            params.output.composite_flush_interval is not None
+            and params.mp.composite_stride is not None
+        ):
+            raise Sorry(
+                "output.composite_flush_interval cannot be used with mp.composite_stride"
+            )
+
         # Save the options
         self.options = options
         self.params = params
@@ -833,18 +858,56 @@ def process_this_event(nevent):
                         print("Rank %d event processed" % rank)
                 processor.finalize()
         else:
-            from dxtbx.command_line.image_average import splitit
-
             if params.mp.nproc == 1:
                 do_work(0, iterable)
             else:
+                # Rather than giving each process a fixed slice of the images, the
+                # processes take chunks of images in turn from a shared counter,
+                # as the MPI clients take images from the server
+                chunk_size = params.mp.chunk_size
+                chunks = [
+                    iterable[j : j + chunk_size]
+                    for j in range(0, len(iterable), chunk_size)
+                ]
+                next_chunk = multiprocessing.Value("i", 0)
+
+                def do_work_from_queue(i):
+                    t0 = time.time()
+                    processor = None
+                    n_images = 0
+                    while True:
+                        with next_chunk.get_lock():
+                            j = next_chunk.value
+                            next_chunk.value += 1
+                        if j >= len(chunks):
+                            break
+                        processor = (
+                            do_work(i, chunks[j], processor, finalize=False)
+                            or processor
+                        )
+                        n_images += len(chunks[j])
+                    if processor:
+                        processor.finalize()
+                    return n_images, time.time() - t0
+
                 result = list(
                     easy_mp.multi_core_run(
-                        myfunction=do_work,
-                        argstuples=list(enumerate(splitit(iterable, params.mp.nproc))),
+                        myfunction=do_work_from_queue,
+                        argstuples=[(i,) for i in range(params.mp.nproc)],
                         nproc=params.mp.nproc,
                     )
                 )
+                for args, res, error in result:
+                    if res is None:
+                        continue
+                    n_images, elapsed = res
+                    logger.info(
+                        "Process %d processed %d images in %.1f seconds (%.2f images/s)",
+                        args[0],
+                        n_images,
+                        elapsed,
+                        n_images / elapsed if elapsed > 0 else 0,
+                    )
                 error_list = [r[2] for r in result]
                 if error_list.count(None) != len(error_list):
                     print(
@@ -906,18 +969,39 @@ def __init__(self, params, composite_tag=None, rank=0):
         if params.output.composite_output:
             assert composite_tag is not None
 
-            self.all_imported_experiments = ExperimentList()
-            self.all_strong_reflections = flex.reflection_table()
-            self.all_indexed_experiments = ExperimentList()
-            self.all_indexed_reflections = flex.reflection_table()
-            self.all_integrated_experiments = ExperimentList()
-            self.all_integrated_reflections = flex.reflection_table()
-            self.all_int_pickle_filenames = []
-            self.all_int_pickles = []
-            self.all_coset_experiments = ExperimentList()
-            self.all_coset_reflections = flex.reflection_table()
-
-            self.setup_filenames(composite_tag)
+            self.composite_chunk = 0
+            self.n_composite_events = 0
+            self.reset_composite_output()
+            self.setup_filenames(self.composite_chunk_tag())
+
+    def reset_composite_output(self):
+        """Clear the experiments and reflections accumulated for composite output"""
+        self.all_imported_experiments = ExperimentList()
+        self.all_strong_reflections = flex.reflection_table()
+        self.all_indexed_experiments = ExperimentList()
+        self.all_indexed_reflections = flex.reflection_table()
+        self.all_integrated_experiments = ExperimentList()
+        self.all_integrated_reflections = flex.reflection_table()
+        self.all_int_pickle_filenames = []
+        self.all_int_pickles = []
+        self.all_coset_experiments = ExperimentList()
+        self.all_coset_reflections = flex.reflection_table()
+
+    def composite_chunk_tag(self):
+        """The tag for the composite output files, including the chunk number if
+        the composite output is flushed during processing"""
+        if self.params.output.composite_flush_interval is None:
+            return self.composite_tag
+        return "%s_%03d" % (self.composite_tag, self.composite_chunk)
+
+    def flush_composite_output(self):
+        """Write the composite files for the events since the last flush, then
+        clear them from memory and move on to the next chunk"""
+        logger.info("Writing composite output chunk %s", self.composite_chunk_tag())
+        self.write_composite_output()
+        self.reset_composite_output()
+        self.composite_chunk += 1
+        self.setup_filenames(self.composite_chunk_tag())
 
     def setup_filenames(self, tag):
         # before processing, set output paths according to the templates
@@ -1020,6 +1104,15 @@ def process_experiments(self, tag, experiments):
 
         if not self.params.output.composite_output:
             self.setup_filenames(tag)
+        elif self.params.output.composite_flush_interval:
+            if (
+                self.n_composite_events
+                and self.n_composite_events
+                % self.params.output.composite_flush_interval
+                == 0
+            ):
+                self.flush_composite_output()
+            self.n_composite_events += 1
         self.tag = tag
         self.debug_start(tag)
 
@@ -1826,99 +1919,99 @@ def extend_with_bookkeeping(
                         self.all_coset_reflections
                     ) = self.all_int_pickles = self.all_integrated_reflections = []
 
-            # Dump composite files to disk
-            if (
-                len(self.all_imported_experiments) > 0
-                and self.params.output.experiments_filename
-            ):
+            self.write_composite_output()
 
-                self.all_imported_experiments.as_json(
-                    self.params.output.experiments_filename
-                )
+    def write_composite_output(self):
+        """Dump the composite files to disk"""
+        if (
+            len(self.all_imported_experiments) > 0
+            and self.params.output.experiments_filename
+        ):
 
-            if (
-                len(self.all_strong_reflections) > 0
-                and self.params.output.strong_filename
-            ):
-                self.save_reflections(
-                    self.all_strong_reflections, self.params.output.strong_filename
-                )
+            self.all_imported_experiments.as_json(
+                self.params.output.experiments_filename
+            )
 
-            if (
-                len(self.all_indexed_experiments) > 0
-                and self.params.output.refined_experiments_filename
-            ):
+        if len(self.all_strong_reflections) > 0 and self.params.output.strong_filename:
+            self.save_reflections(
+                self.all_strong_reflections, self.params.output.strong_filename
+            )
 
-                self.all_indexed_experiments.as_json(
-                    self.params.output.refined_experiments_filename
-                )
+        if (
+            len(self.all_indexed_experiments) > 0
+            and self.params.output.refined_experiments_filename
+        ):
 
-            if (
-                len(self.all_indexed_reflections) > 0
-                and self.params.output.indexed_filename
-            ):
-                self.save_reflections(
-                    self.all_indexed_reflections, self.params.output.indexed_filename
-                )
+            self.all_indexed_experiments.as_json(
+                self.params.output.refined_experiments_filename
+            )
+
+        if (
+            len(self.all_indexed_reflections) > 0
+            and self.params.output.indexed_filename
+        ):
+            self.save_reflections(
+                self.all_indexed_reflections, self.params.output.indexed_filename
+            )
+
+        if (
+            len(self.all_integrated_experiments) > 0
+            and self.params.output.integrated_experiments_filename
+        ):
+
+            self.all_integrated_experiments.as_json(
+                self.params.output.integrated_experiments_filename
+            )
+
+        if (
+            len(self.all_integrated_reflections) > 0
+            and self.params.output.integrated_filename
+        ):
+            self.save_reflections(
+                self.all_integrated_reflections,
+                self.params.output.integrated_filename,
+            )
 
+        if self.params.dispatch.coset:
             if (
-                len(self.all_integrated_experiments) > 0
-                and self.params.output.integrated_experiments_filename
+                len(self.all_coset_experiments) > 0
+                and self.params.output.coset_experiments_filename
             ):
 
-                self.all_integrated_experiments.as_json(
-                    self.params.output.integrated_experiments_filename
+                self.all_coset_experiments.as_json(
+                    self.params.output.coset_experiments_filename
                 )
 
             if (
-                len(self.all_integrated_reflections) > 0
-                and self.params.output.integrated_filename
+                len(self.all_coset_reflections) > 0
+                and self.params.output.coset_filename
             ):
                 self.save_reflections(
-                    self.all_integrated_reflections,
-                    self.params.output.integrated_filename,
+                    self.all_coset_reflections, self.params.output.coset_filename
                 )
 
-            if self.params.dispatch.coset:
-                if (
-                    len(self.all_coset_experiments) > 0
-                    and self.params.output.coset_experiments_filename
-                ):
-
-                    self.all_coset_experiments.as_json(
-                        self.params.output.coset_experiments_filename
-                    )
-
-                if (
-                    len(self.all_coset_reflections) > 0
-                    and self.params.output.coset_filename
-                ):
-                    self.save_reflections(
-                        self.all_coset_reflections, self.params.output.coset_filename
-                    )
-
-            # Create a tar archive of the integration dictionary pickles
-            if len(self.all_int_pickles) > 0 and self.params.output.integration_pickle:
-                tar_template_integration_pickle = (
-                    self.params.output.integration_pickle.replace("%d", "%s")
-                )
-                outfile = (
-                    os.path.join(
-                        self.params.output.output_dir,
-                        tar_template_integration_pickle % ("x", self.composite_tag),
-                    )
-                    + ".tar"
+        # Create a tar archive of the integration dictionary pickles
+        if len(self.all_int_pickles) > 0 and self.params.output.integration_pickle:
+            tar_template_integration_pickle = (
+                self.params.output.integration_pickle.replace("%d", "%s")
+            )
+            outfile = (
+                os.path.join(
+                    self.params.output.output_dir,
+                    tar_template_integration_pickle % ("x", self.composite_chunk_tag()),
                 )
-                tar = tarfile.TarFile(outfile, "w")
-                for i, (fname, d) in enumerate(
-                    zip(self.all_int_pickle_filenames, self.all_int_pickles)
-                ):
-                    string = BytesIO(pickle.dumps(d, protocol=2))
-                    info = tarfile.TarInfo(name=fname)
-                    info.size = string.getbuffer().nbytes
-                    info.mtime = time.time()
-                    tar.addfile(tarinfo=info, fileobj=string)
-                tar.close()
+                + ".tar"
+            )
+            tar = tarfile.TarFile(outfile, "w")
+            for i, (fname, d) in enumerate(
+                zip(self.all_int_pickle_filenames, self.all_int_pickles)
+            ):
+                string = BytesIO(pickle.dumps(d, protocol=2))
+                info = tarfile.TarInfo(name=fname)
+                info.size = string.getbuffer().nbytes
+                info.mtime = time.time()
+                tar.addfile(tarinfo=info, fileobj=string)
+            tar.close()
 
 
 @dials.util.show_mail_handle_errors()
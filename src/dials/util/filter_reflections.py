@@ -44,10 +44,12 @@
 from __future__ import annotations
 
 import logging
-from collections import defaultdict
 from typing import Any, List, Type
 
+import numpy as np
+
 from cctbx import crystal, miller
+from dxtbx import flumpy
 
 from dials.algorithms.scaling.outlier_rejection import reject_outliers
 from dials.array_family import flex
@@ -821,65 +823,69 @@ def sum_partial_reflections(reflection_table):
 
     for intensity in intensities:
         sel = sel & (reflection_table["intensity." + intensity + ".variance"] > 0)
-    isel = sel.iselection()
-
-    # create map of partial_id to reflections
-    delete = flex.size_t()
-    partial_map = defaultdict(list)
-    for j in isel:
-        partial_map[reflection_table["partial_id"][j]].append(j)
-
-    # now work through this map - get total partiality for every reflection;
-    # here only consider reflections with > 1 component;
-    partial_ids = []
-    for p_id in partial_map:
-        if len(partial_map[p_id]) > 1:
-            partial_ids.append(p_id)
-
-    header = ["Partial id", "Partiality"]
-    for i in intensities:
-        header.extend([str(i) + " intensity", str(i) + " variance"])
-    rows = []
-
-    # Now loop through 'matched' partials, summing and then deleting before return
-    for p_id in partial_ids:
-        j = partial_map[p_id]
-        for i in j:
-            data = [str(p_id), str(reflection_table["partiality"][i])]
-            for intensity in intensities:
-                data.extend(
-                    [
-                        str(reflection_table["intensity." + intensity + ".value"][i]),
-                        str(
-                            reflection_table["intensity." + intensity + ".variance"][i]
-                        ),
-                    ]
-                )
-            rows.append(data)
+    isel = flumpy.to_numpy(sel.iselection())
+
+    # Sort the partials by partial_id, keeping the original order of the
+    # components within each partial, and only consider partial_ids with > 1
+    # component.
+    partial_ids = flumpy.to_numpy(reflection_table["partial_id"])[isel]
+    order = np.argsort(partial_ids, kind="stable")
+    isel = isel[order]
+    partial_ids = partial_ids[order]
+    _, group, counts = np.unique(partial_ids, return_inverse=True, return_counts=True)
+    group = group.ravel()
+    multiple = counts[group] > 1
+    if not multiple.any():
+        return reflection_table
+    isel = isel[multiple]
+    partial_ids = partial_ids[multiple]
+    _, group = np.unique(partial_ids, return_inverse=True)
+    group = group.ravel()
+    first = np.flatnonzero(np.diff(group, prepend=-1))
+    n_groups = first.size
+
+    # Do the weighted sums for all partials at once, then write the combined
+    # values into the first component of each partial.
+    combine_functions = {
+        "prf": _combine_prf_partials,
+        "sum": _combine_sum_partials,
+        "scale": _combine_scale_partials,
+    }
+    components = {}
+    combined = {}
+    for intensity in intensities:
+        values = flumpy.to_numpy(reflection_table["intensity." + intensity + ".value"])[
+            isel
+        ]
+        variances = flumpy.to_numpy(
+            reflection_table["intensity." + intensity + ".variance"]
+        )[isel]
+        components[intensity] = (values, variances)
+        combined[intensity] = combine_functions[intensity](
+            values, variances, group, n_groups
+        )
+    partiality = flumpy.to_numpy(reflection_table["partiality"])[isel]
+    total_partiality = np.bincount(group, weights=partiality, minlength=n_groups)
 
-        # do the summing of the partiality values separately to allow looping
-        # over multiple times
-        total_partiality = sum(reflection_table["partiality"][i] for i in j)
-        if "prf" in intensities:
-            reflection_table = _sum_prf_partials(reflection_table, j)
-        if "sum" in intensities:
-            reflection_table = _sum_sum_partials(reflection_table, j)
-        if "scale" in intensities:
-            reflection_table = _sum_scale_partials(reflection_table, j)
-        # FIXME now that the partials have been summed, should fractioncalc be set
-        # to one (except for summation case?)
-        reflection_table["partiality"][j[0]] = total_partiality
-        delete.extend(flex.size_t(j[1:]))
-        data = ["combined " + str(p_id), str(total_partiality)]
-        for intensity in intensities:
-            data.extend(
-                [
-                    str(reflection_table["intensity." + intensity + ".value"][j[0]]),
-                    str(reflection_table["intensity." + intensity + ".variance"][j[0]]),
-                ]
-            )
-        rows.append(data)
-    reflection_table.del_selected(delete)
+    first_isel = flumpy.from_numpy(isel[first].astype(np.uint64))
+    for intensity in intensities:
+        value, variance = combined[intensity]
+        reflection_table["intensity." + intensity + ".value"].set_selected(
+            first_isel, flumpy.from_numpy(value)
+        )
+        reflection_table["intensity." + intensity + ".variance"].set_selected(
+            first_isel, flumpy.from_numpy(variance)
+        )
+    # FIXME now that the partials have been summed, should fractioncalc be set
+    # to one (except for summation case?)
+    reflection_table["partiality"].set_selected(
+        first_isel, flumpy.from_numpy(total_partiality)
+    )
+    delete = np.ones(isel.size, dtype=bool)
+    delete[first] = False
+    reflection_table.del_selected(
+        flumpy.from_numpy(np.sort(isel[delete]).astype(np.uint64))
+    )
     if nrefl > reflection_table.size():
         logger.info(
             "Combined %s partial reflections with other partial reflections",
@@ -889,6 +895,23 @@ def sum_partial_reflections(reflection_table):
     # Formatting this table can be sloooow for large numbers of reflections, so skip
     # this unless debug output has been requested
     if logger.getEffectiveLevel() <= logging.DEBUG:
+        header = ["Partial id", "Partiality"]
+        for i in intensities:
+            header.extend([str(i) + " intensity", str(i) + " variance"])
+        rows = []
+        bounds = np.append(first, isel.size)
+        for g, p_id in enumerate(partial_ids[first]):
+            for i in range(bounds[g], bounds[g + 1]):
+                data = [str(p_id), str(partiality[i])]
+                for intensity in intensities:
+                    values, variances = components[intensity]
+                    data.extend([str(values[i]), str(variances[i])])
+                rows.append(data)
+            data = ["combined " + str(p_id), str(total_partiality[g])]
+            for intensity in intensities:
+                value, variance = combined[intensity]
+                data.extend([str(value[g]), str(variance[g])])
+            rows.append(data)
         logger.debug("\nSummary of combination of partial reflections")
         logger.debug(tabulate(rows, header))
     return reflection_table
@@ -898,59 +921,73 @@ def sum_partial_reflections(reflection_table):
 # weighting by (I/sig(I))^2 not just 1/variance for prf. See tests?
 
 
+def _combine_prf_partials(values, variances, group, n_groups):
+    """Weighted average of prf partials, for the partials in each group."""
+    weights = values * values / variances
+    total_weight = np.bincount(group, weights=weights, minlength=n_groups)
+    value = np.bincount(group, weights=weights * values, minlength=n_groups)
+    variance = np.bincount(group, weights=weights * variances, minlength=n_groups)
+    nonzero = total_weight != 0
+    value = np.where(nonzero, value / np.where(nonzero, total_weight, 1), 0.0)
+    variance = np.where(
+        nonzero,
+        variance / np.where(nonzero, total_weight, 1),
+        np.bincount(group, weights=variances, minlength=n_groups),
+    )
+    return value, variance
+
+
+def _combine_sum_partials(values, variances, group, n_groups):
+    """Sum of sum partials, for the partials in each group."""
+    value = np.bincount(group, weights=values, minlength=n_groups)
+    variance = np.bincount(group, weights=variances, minlength=n_groups)
+    return value, variance
+
+
+def _combine_scale_partials(values, variances, group, n_groups):
+    """Inverse-variance weighted average of scale partials, for the partials in
+    each group."""
+    # Weight scaled intensity partials by 1/variance. See
+    # https://en.wikipedia.org/wiki/Weighted_arithmetic_mean, section
+    # 'Dealing with variance'
+    total_weight = np.bincount(group, weights=1.0 / variances, minlength=n_groups)
+    value = np.bincount(group, weights=values / variances, minlength=n_groups)
+    return value / total_weight, 1.0 / total_weight
+
+
+def _sum_partials(reflection_table, partials_isel_for_pid, intensity, combine):
+    """Combine the partials for one partial_id and set the updated value in the
+    first entry."""
+    j = flex.size_t(list(partials_isel_for_pid))
+    value_col = "intensity." + intensity + ".value"
+    variance_col = "intensity." + intensity + ".variance"
+    value, variance = combine(
+        flumpy.to_numpy(reflection_table[value_col].select(j)),
+        flumpy.to_numpy(reflection_table[variance_col].select(j)),
+        np.zeros(len(j), dtype=np.int64),
+        1,
+    )
+    reflection_table[value_col][j[0]] = float(value[0])
+    reflection_table[variance_col][j[0]] = float(variance[0])
+    return reflection_table
+
+
 def _sum_prf_partials(reflection_table, partials_isel_for_pid):
     """Sum prf partials and set the updated value in the first entry."""
-    j = partials_isel_for_pid
-    value = reflection_table["intensity.prf.value"][j[0]]
-    variance = reflection_table["intensity.prf.variance"][j[0]]
-    weight = value * value / variance
-    value *= weight
-    variance *= weight
-    total_weight = weight
-    for i in j[1:]:
-        _value = reflection_table["intensity.prf.value"][i]
-        _variance = reflection_table["intensity.prf.variance"][i]
-        _weight = _value * _value / _variance
-        value += _weight * _value
-        variance += _weight * _variance
-        total_weight += _weight
-    # now write these back into original reflection
-    if total_weight:
-        reflection_table["intensity.prf.value"][j[0]] = value / total_weight
-        reflection_table["intensity.prf.variance"][j[0]] = variance / total_weight
-    else:
-        variance = sum(reflection_table["intensity.prf.variance"][_j] for _j in j)
-        reflection_table["intensity.prf.value"][j[0]] = 0
-        reflection_table["intensity.prf.variance"][j[0]] = variance
-    return reflection_table
+    return _sum_partials(
+        reflection_table, partials_isel_for_pid, "prf", _combine_prf_partials
+    )
 
 
 def _sum_sum_partials(reflection_table, partials_isel_for_pid):
     """Sum sum partials and set the updated value in the first entry."""
-    j = partials_isel_for_pid
-    value = reflection_table["intensity.sum.value"][j[0]]
-    variance = reflection_table["intensity.sum.variance"][j[0]]
-    for i in j[1:]:
-        value += reflection_table["intensity.sum.value"][i]
-        variance += reflection_table["intensity.sum.variance"][i]
-    reflection_table["intensity.sum.value"][j[0]] = value
-    reflection_table["intensity.sum.variance"][j[0]] = variance
-    return reflection_table
+    return _sum_partials(
+        reflection_table, partials_isel_for_pid, "sum", _combine_sum_partials
+    )
 
 
 def _sum_scale_partials(reflection_table, partials_isel_for_pid):
     """Sum scale partials and set the updated value in the first entry."""
-    # Weight scaled intensity partials by 1/variance. See
-    # https://en.wikipedia.org/wiki/Weighted_arithmetic_mean, section
-    # 'Dealing with variance'
-    j = partials_isel_for_pid
-    variance = reflection_table["intensity.scale.variance"][j[0]]
-    value = reflection_table["intensity.scale.value"][j[0]] / variance
-    total_weight = 1.0 / variance
-    for i in j[1:]:
-        _variance = reflection_table["intensity.scale.variance"][i]
-        value += reflection_table["intensity.scale.value"][i] / _variance
-        total_weight += 1.0 / _variance
-    reflection_table["intensity.scale.value"][j[0]] = value / total_weight
-    reflection_table["intensity.scale.variance"][j[0]] = 1.0 / total_weight
-    return reflection_table
+    return _sum_partials(
+        reflection_table, partials_isel_for_pid, "scale", _combine_scale_partials
+    )
@@ -2,8 +2,10 @@
 
 import itertools
 import logging
+import multiprocessing
 import os
 import pathlib
+import threading
 
 import psutil
 
@@ -66,6 +68,70 @@ def available_cores() -> int:
     return 1
 
 
+def bounded_imap_unordered(
+    func,
+    iterable,
+    nproc,
+    chunksize=1,
+    max_in_flight=None,
+    initializer=None,
+    initargs=(),
+):
+    """
+    Map a function over an iterable in a process pool, yielding the results in
+    the order in which they complete.
+
+    Unlike Pool.map, the iterable is consumed lazily: at most max_in_flight
+    items (by default 2 * nproc * chunksize) are submitted to the pool but not
+    yet returned at any one time. Peak memory use in the parent process is
+    therefore bounded by the number of processes and the chunk size rather than
+    by the length of the iterable. Data common to all items should be passed to
+    the workers once via the initializer, rather than with every item.
+    """
+    if max_in_flight is None:
+        max_in_flight = 2 * nproc * chunksize
+    # The pool consumes the iterable in a task handler thread; each item must
+    # acquire a slot which is only released when a result has been returned.
+    slots = threading.Semaphore(max(max_in_flight, chunksize))
+    stop = threading.Event()
+
+    def throttled(items):
+        for item in items:
+            while not slots.acquire(timeout=0.1):
+                if stop.is_set():
+                    return
+            yield item
+
+    with multiprocessing.Pool(nproc, initializer, initargs) as pool:
+        try:
+            for result in pool.imap_unordered(func, throttled(iterable), chunksize):
+                slots.release()
+                yield result
+        finally:
+            stop.set()
+
+
+def ordered_results(results, keys, key):
+    """
+    Yield results in the order given by keys, buffering any results that arrive
+    out of order (e.g. from bounded_imap_unordered) until their turn.
+
+    :param results: An iterable of results
+    :param keys: The keys of the expected results, in the order required
+    :param key: A function returning the key of a result
+    """
+    pending = {}
+    keys = iter(keys)
+    next_key = next(keys, None)
+    for result in results:
+        pending[key(result)] = result
+        while next_key in pending:
+            yield pending.pop(next_key)
+            next_key = next(keys, None)
+    if pending:
+        raise ValueError(f"Unexpected results with keys {sorted(pending)}")
+
+
 class __cluster_function_wrapper:
     """
     A function called by the multi node parallel map. On each cluster node, a
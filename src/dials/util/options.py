@@ -173,6 +173,7 @@ def __init__(
         scan_tolerance=None,
         format_kwargs=None,
         load_models=True,
+        exclude_reflection_columns=None,
     ):
         """
         Parse the arguments. Populates its instance attributes in an intelligent way
@@ -193,6 +194,7 @@ def __init__(
         :param check_format: Check the format when reading images
         :param verbose: True/False print out some stuff
         :param load_models: Whether to load all models for ExperimentLists
+        :param exclude_reflection_columns: Columns to skip when reading reflections
         """
 
         # Initialise output
@@ -223,7 +225,9 @@ def __init__(
 
         # Third try to read reflection files
         if read_reflections:
-            self.unhandled = self.try_read_reflections(self.unhandled, verbose)
+            self.unhandled = self.try_read_reflections(
+                self.unhandled, verbose, exclude_columns=exclude_reflection_columns
+            )
 
     def _handle_converter_error(self, argument, exception, type, validation=False):
         "Record information about errors that occurred processing an argument"
@@ -334,11 +338,12 @@ def try_read_experiments(self, args, check_format, verbose):
                 unhandled.append(argument)
         return unhandled
 
-    def try_read_reflections(self, args, verbose):
+    def try_read_reflections(self, args, verbose, exclude_columns=None):
         """Try to import reflections.
 
         :param args: The input arguments
         :param verbose: Print verbose output
+        :param exclude_columns: Columns which are not loaded from the files
         :returns: Unhandled arguments
         """
         unhandled = []
@@ -349,7 +354,9 @@ def try_read_reflections(self, args, verbose):
                 self.reflections.append(
                     FilenameDataWrapper(
                         filename=argument,
-                        data=flex.reflection_table.from_file(argument),
+                        data=flex.reflection_table.from_file(
+                            argument, exclude_columns=exclude_columns
+                        ),
                     )
                 )
             except pickle.UnpicklingError:
@@ -376,6 +383,7 @@ def __init__(
         read_reflections=False,
         read_experiments_from_images=False,
         check_format=True,
+        exclude_reflection_columns=None,
     ):
         """
         Initialise the parser.
@@ -385,6 +393,9 @@ def __init__(
         :param read_reflections: Try to read the reflections
         :param read_experiments_from_images: Try to read the experiments from images
         :param check_format: Check the format when reading images
+        :param exclude_reflection_columns: Reflection table columns not to load,
+                                           or a function of the extracted
+                                           parameters returning them
         """
         from dials.util.phil import parse
 
@@ -399,6 +410,7 @@ def __init__(
         self._read_reflections = read_reflections
         self._read_experiments_from_images = read_experiments_from_images
         self._check_format = check_format
+        self._exclude_reflection_columns = exclude_reflection_columns
 
         # Adopt the input scope
         input_phil_scope = self._generate_input_scope()
@@ -554,6 +566,11 @@ def _is_a_phil_file(filename):
         except AttributeError:
             load_models = True
 
+        # Columns of large reflection files that the program will not need
+        exclude_reflection_columns = self._exclude_reflection_columns
+        if callable(exclude_reflection_columns):
+            exclude_reflection_columns = exclude_reflection_columns(params)
+
         # Try to import everything
         importer = Importer(
             unhandled,
@@ -568,6 +585,7 @@ def _is_a_phil_file(filename):
             scan_tolerance=scan_tolerance,
             format_kwargs=format_kwargs,
             load_models=load_models,
+            exclude_reflection_columns=exclude_reflection_columns,
         )
 
         # Grab a copy of the errors that occurred in case the caller wants them
@@ -779,6 +797,7 @@ def __init__(
         check_format=True,
         sort_options=False,
         formatter_class=argparse.RawDescriptionHelpFormatter,
+        exclude_reflection_columns=None,
         **kwargs,
     ):
         """
@@ -790,6 +809,9 @@ def __init__(
         :param read_experiments_from_images: Try to read the experiments from images
         :param check_format: Check the format when reading images
         :param sort_options: Show argument sorting options
+        :param exclude_reflection_columns: Reflection table columns not to load,
+                                           or a function of the extracted
+                                           parameters returning them
         """
 
         # Create the phil parser
@@ -799,6 +821,7 @@ def __init__(
             read_reflections=read_reflections,
             read_experiments_from_images=read_experiments_from_images,
             check_format=check_format,
+            exclude_reflection_columns=exclude_reflection_columns,
         )
 
         # Initialise the option parser
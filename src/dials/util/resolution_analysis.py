@@ -12,7 +12,6 @@
 import numpy as np
 import scipy.optimize
 
-import iotbx.merging_statistics
 import iotbx.mtz
 import iotbx.phil
 from cctbx import miller, uctbx
@@ -20,7 +19,10 @@
 from iotbx.reflection_file_utils import label_table
 from scitbx.math import curve_fitting
 
-from dials.algorithms.scaling.scaling_library import determine_best_unit_cell
+from dials.algorithms.scaling.scaling_library import (
+    ExtendedDatasetStatistics,
+    determine_best_unit_cell,
+)
 from dials.report import plots
 from dials.util import Sorry, tabulate
 from dials.util.batch_handling import (
@@ -155,14 +157,20 @@ def resolution_fit_from_merging_stats(merging_stats, metric, model, limit):
     Returns: The estimated resolution limit in units of Å^-1
     """
 
-    y_obs = flex.double(getattr(b, metric) for b in merging_stats.bins).reversed()
+    y_obs = flex.double(getattr(b, metric) for b in merging_stats.bins)
+    return _resolution_fit_binned_values(merging_stats, y_obs, model, limit)
+
+
+def _resolution_fit_binned_values(merging_stats, y_obs, model, limit):
+    """Estimate a resolution limit from values for the merging_stats bins, given
+    from low to high resolution"""
     n_obs = flex.double(
         getattr(b, "cc_one_half_n_refl") for b in merging_stats.bins
     ).reversed()
     d_star_sq = flex.double(
         uctbx.d_as_d_star_sq(b.d_min) for b in merging_stats.bins
     ).reversed()
-    return resolution_fit(d_star_sq, y_obs, model, limit, n_obs)
+    return resolution_fit(d_star_sq, y_obs.reversed(), model, limit, n_obs)
 
 
 def resolution_fit(d_star_sq, y_obs, model, limit, n_obs):
@@ -214,8 +222,17 @@ def resolution_fit(d_star_sq, y_obs, model, limit, n_obs):
     return ResolutionResult(d_star_sq, y_obs, y_fit, d_min)
 
 
+def _get_cc_one_half_mean_binned(merging_stats, cc_half_method):
+    """Get the CC½ values averaged over several random half-dataset splits, if
+    these have been calculated by the input merging_stats object"""
+    if cc_half_method == "sigma_tau":
+        return None
+    return getattr(merging_stats, "cc_one_half_mean_binned", None)
+
+
 def _get_cc_half_significance(merging_stats, cc_half_method):
     """Get the CC½ significance values from the input merging_stats object"""
+    cc_one_half_mean = _get_cc_one_half_mean_binned(merging_stats, cc_half_method)
     if (
         cc_half_method == "sigma_tau"
         and merging_stats.overall.cc_one_half_sigma_tau_significance is not None
@@ -223,6 +240,10 @@ def _get_cc_half_significance(merging_stats, cc_half_method):
         return flex.bool(
             b.cc_one_half_sigma_tau_significance for b in merging_stats.bins
         ).reversed()
+    elif cc_one_half_mean is not None:
+        critical_values = _get_cc_half_critical_values(merging_stats, cc_half_method)
+        if critical_values is not None:
+            return flex.double(cc_one_half_mean).reversed() > critical_values
     elif merging_stats.overall.cc_one_half_significance is not None:
         return flex.bool(
             b.cc_one_half_significance for b in merging_stats.bins
@@ -269,8 +290,16 @@ def resolution_cc_half(
 
     Returns: The estimated resolution limit in units of Å^-1
     """
-    metric = "cc_one_half_sigma_tau" if cc_half_method == "sigma_tau" else "cc_one_half"
-    result = resolution_fit_from_merging_stats(merging_stats, metric, model, limit)
+    cc_one_half_mean = _get_cc_one_half_mean_binned(merging_stats, cc_half_method)
+    if cc_one_half_mean is not None:
+        result = _resolution_fit_binned_values(
+            merging_stats, flex.double(cc_one_half_mean), model, limit
+        )
+    else:
+        metric = (
+            "cc_one_half_sigma_tau" if cc_half_method == "sigma_tau" else "cc_one_half"
+        )
+        result = resolution_fit_from_merging_stats(merging_stats, metric, model, limit)
     critical_values = _get_cc_half_critical_values(merging_stats, cc_half_method)
     if critical_values:
         result = result._replace(critical_values=critical_values)
@@ -359,6 +388,13 @@ def miller_array_from_mtz(unmerged_mtz, anomalous=False, labels=None):
   cc_half_method = *half_dataset sigma_tau
     .type = choice
     .short_caption = "CC½ method"
+  cc_half_n_splits = 1
+    .type = int(value_min=1)
+    .help = "Number of random half-dataset splits over which to average CC½,"
+            "for cc_half_method=half_dataset. Averaging over several splits"
+            "reduces the noise of CC½ in sparse outer resolution shells."
+    .expert_level = 1
+    .short_caption = "Number of CC½ half-dataset splits"
   cc_half_significance_level = 0.1
     .type = float(value_min=0, value_max=1)
     .expert_level = 1
@@ -548,8 +584,13 @@ def __init__(self, i_obs, params, batches=None, reference=None):
 
         self._intensities = i_obs
 
-        self._merging_statistics = iotbx.merging_statistics.dataset_statistics(
+        if self._params.cc_half_method == "half_dataset":
+            cc_one_half_n_splits = self._params.cc_half_n_splits
+        else:
+            cc_one_half_n_splits = 1
+        self._merging_statistics = ExtendedDatasetStatistics(
             i_obs=i_obs,
+            cc_one_half_n_splits=cc_one_half_n_splits,
             n_bins=self._params.nbins,
             reflections_per_bin=self._params.reflections_per_bin,
             cc_one_half_significance_level=self._params.cc_half_significance_level,
@@ -560,6 +601,14 @@ def __init__(self, i_obs, params, batches=None, reference=None):
             eliminate_sys_absent=False,
             assert_is_not_unique_set_under_symmetry=False,
         )
+        if self._merging_statistics.cc_one_half_mean_binned is not None:
+            # The resolution limit is fitted to CC½ averaged over the random
+            # splits, which is kept separate from the single split statistics
+            logger.info(
+                f"CC½ averaged over {cc_one_half_n_splits} random half-dataset "
+                f"splits: {self._merging_statistics.cc_one_half_mean:.4f} "
+                f"(standard deviation {self._merging_statistics.cc_one_half_std:.4f})"
+            )
 
     @classmethod
     def from_unmerged_mtz(cls, scaled_unmerged, params):
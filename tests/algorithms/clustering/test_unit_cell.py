@@ -3,10 +3,18 @@
 import random
 
 import numpy as np
+import scipy.spatial.distance as ssd
+from scipy.cluster import hierarchy
 
 from cctbx import sgtbx
+from cctbx.uctbx.determine_unit_cell import NCDist
 
-from dials.algorithms.clustering.unit_cell import cluster_unit_cells
+from dials.algorithms.clustering.unit_cell import (
+    cluster_unit_cells,
+    g6_cells_from_unit_cells,
+    pairwise_ncdist,
+    single_linkage_from_edges,
+)
 
 
 def test_unit_cell():
@@ -22,3 +30,61 @@ def test_unit_cell():
     assert len(result.clusters) == 1
     assert "dcoord" in result.dendrogram.keys()
     assert isinstance(result.linkage_matrix, np.ndarray)
+
+
+def test_pairwise_ncdist_nproc():
+    sgi = sgtbx.space_group_info("P1")
+    crystal_symmetries = [
+        sgi.any_compatible_crystal_symmetry(volume=random.uniform(990, 1010))
+        for i in range(20)
+    ]
+    g6_cells = g6_cells_from_unit_cells(
+        np.array([cs.unit_cell().parameters() for cs in crystal_symmetries])
+    )
+    expected = ssd.pdist(g6_cells, metric=NCDist)
+    assert np.array_equal(pairwise_ncdist(g6_cells, nproc=1), expected)
+    assert np.array_equal(pairwise_ncdist(g6_cells, nproc=2), expected)
+
+
+def test_single_linkage_from_edges():
+    rng = np.random.default_rng(0)
+    points = rng.normal(size=(30, 6))
+    distances = ssd.pdist(points)
+    edges = np.column_stack(np.triu_indices(len(points), 1))
+    linkage_matrix = single_linkage_from_edges(len(points), edges, distances, 1e6)
+    assert hierarchy.is_valid_linkage(linkage_matrix)
+    expected = hierarchy.linkage(distances, method="single")
+    assert np.allclose(hierarchy.cophenet(linkage_matrix), hierarchy.cophenet(expected))
+
+    # Disconnected components are joined at the given distance
+    linkage_matrix = single_linkage_from_edges(
+        4, np.array([[0, 1], [2, 3]]), [1, 2], 10
+    )
+    assert list(linkage_matrix[:, 2]) == [1, 2, 10]
+    assert list(hierarchy.fcluster(linkage_matrix, 5, criterion="distance")) == [
+        1,
+        1,
+        2,
+        2,
+    ]
+
+
+def test_unit_cell_approximate():
+    crystal_symmetries = []
+    for volume in (1000, 2000):
+        sgi = sgtbx.space_group_info("P1")
+        crystal_symmetries.extend(
+            sgi.any_compatible_crystal_symmetry(
+                volume=random.uniform(0.99, 1.01) * volume
+            )
+            for i in range(10)
+        )
+    exact = cluster_unit_cells(crystal_symmetries, threshold=20)
+    approximate = cluster_unit_cells(
+        crystal_symmetries, threshold=20, approximate=True, n_neighbours=5
+    )
+    assert len(exact.clusters) == 2
+    assert len(approximate.clusters) == 2
+    assert sorted(sorted(c.lattice_ids) for c in approximate.clusters) == sorted(
+        sorted(c.lattice_ids) for c in exact.clusters
+    )
@@ -7,9 +7,13 @@
 from cctbx import crystal, sgtbx, uctbx
 from cctbx.sgtbx.lattice_symmetry import metric_subgroups
 from dxtbx.model import Crystal
+from scitbx.array_family import flex
 from scitbx.math import euler_angles_as_matrix
 
 from dials.algorithms.indexing.basis_vector_search import FFT1D, combinations
+from dials.algorithms.indexing.compare_orientation_matrices import (
+    difference_rotation_matrix_axis_angle,
+)
 from dials.algorithms.indexing.symmetry import find_matching_symmetry
 
 
@@ -144,3 +148,38 @@ def test_filter_similar_orientations():
         crystal_models, other_crystal_models, minimum_angular_separation=2
     )
     assert list(filtered) == crystal_models
+
+
+def test_filter_similar_orientations_matches_pairwise_comparison():
+    flex.set_random_seed(0)
+    space_group = sgtbx.space_group_info("P 4 3 2").group()
+    unit_cell = space_group.info().any_compatible_unit_cell(volume=1000)
+    B = scitbx.matrix.sqr(unit_cell.fractionalization_matrix()).transpose()
+
+    def random_crystal():
+        U = scitbx.matrix.sqr(flex.random_double_r3_rotation_matrix())
+        return Crystal(U * B, space_group=space_group, reciprocal=True)
+
+    other_crystal_models = [random_crystal() for i in range(20)]
+    crystal_models = [random_crystal() for i in range(1000)]
+    # add a candidate related to another model by a 4-fold plus a small rotation
+    cryst = copy.deepcopy(other_crystal_models[0])
+    cryst.set_U(
+        scitbx.matrix.sqr(cryst.get_U()) * euler_angles_as_matrix((92, 0, 0), deg=True)
+    )
+    crystal_models.append(cryst)
+
+    expected = [
+        cryst
+        for cryst in crystal_models
+        if all(
+            abs(difference_rotation_matrix_axis_angle(cryst_a, cryst)[2]) >= 5
+            for cryst_a in other_crystal_models
+        )
+    ]
+    filtered = list(
+        combinations.filter_similar_orientations(crystal_models, other_crystal_models)
+    )
+    assert filtered == expected
+    assert crystal_models[-1] not in filtered
+    assert 0 < len(filtered) < len(crystal_models)
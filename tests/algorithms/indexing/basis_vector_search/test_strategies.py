@@ -25,6 +25,26 @@ def test_fft1d(self, setup_rlp):
         basis_vectors, used = strategy.find_basis_vectors(setup_rlp["rlp"])
         self.check_results(setup_rlp["crystal_symmetry"].unit_cell(), basis_vectors)
 
+    @pytest.mark.parametrize("nthreads", [1, 2])
+    def test_real_space_grid_search_scores(self, setup_rlp, nthreads, monkeypatch):
+        # Use small blocks so that the search vectors are scored in many blocks
+        monkeypatch.setattr(
+            "dials.algorithms.indexing.basis_vector_search.real_space_grid_search"
+            "._SCORE_BLOCK_ELEMENTS",
+            10**5,
+        )
+        max_cell = 1.3 * max(setup_rlp["crystal_symmetry"].unit_cell().parameters()[:3])
+        strategy = RealSpaceGridSearch(
+            max_cell, target_unit_cell=setup_rlp["crystal_symmetry"].unit_cell()
+        )
+        strategy._params.nthreads = nthreads
+        vectors, scores = strategy.score_vectors(setup_rlp["rlp"])
+        assert len(vectors) == len(scores) == len(list(strategy.search_vectors))
+        for i in range(0, len(vectors), 97):
+            assert scores[i] == pytest.approx(
+                strategy.compute_functional(vectors[i], setup_rlp["rlp"]), abs=1e-6
+            )
+
     def test_fft3d(self, setup_rlp):
         max_cell = 1.3 * max(setup_rlp["crystal_symmetry"].unit_cell().parameters()[:3])
         strategy = FFT3D(max_cell)
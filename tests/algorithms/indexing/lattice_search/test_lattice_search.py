@@ -61,6 +61,29 @@ def test_BasisVectorSearch_i04_weak_data(
     )
 
 
+@pytest.mark.parametrize("nproc", [1, 2])
+@pytest.mark.parametrize("early_stop", [False, True])
+def test_BasisVectorSearch_candidate_evaluation(i04_weak_data, nproc, early_stop):
+    reflections = i04_weak_data["reflections"]
+    experiments = i04_weak_data["experiments"]
+    params = phil_scope.fetch().extract()
+    params.indexing.refinement_protocol.n_macro_cycles = 2
+    params.indexing.basis_vector_combinations.max_refine = 5
+    params.indexing.method = "fft3d"
+    params.indexing.nproc = nproc
+    if early_stop:
+        params.indexing.basis_vector_combinations.early_stop.fraction_indexed = 0.5
+        params.indexing.basis_vector_combinations.early_stop.rmsd_xy = 0.5
+    idxr = lattice_search.BasisVectorSearch(reflections, experiments, params)
+    idxr.index()
+
+    indexed_experiments = idxr.refined_experiments
+    assert len(indexed_experiments) == 1
+    assert indexed_experiments[0].crystal.get_unit_cell().parameters() == pytest.approx(
+        (57.752, 57.776, 150.013, 90.0101, 89.976, 90.008), rel=1e-3
+    )
+
+
 @pytest.mark.parametrize(
     "indexing_method,space_group,unit_cell",
     (
@@ -3,7 +3,11 @@
 import pickle
 from unittest import mock
 
+from dxtbx.model.experiment_list import ExperimentListFactory
+
 from dials.algorithms.integration import integrator
+from dials.array_family import flex
+from dials_algorithms_integration_integrator_ext import max_memory_needed
 
 
 def test_profile_modeller_executor_is_picklable():
@@ -33,3 +37,36 @@ def test_integrator_executor_is_picklable():
     pickled = pickle.dumps(executor)
     unpickled = pickle.loads(pickled)
     assert isinstance(unpickled, integrator.IntegratorExecutor)
+
+
+def test_frame_ordered_split(dials_data):
+    experiments = ExperimentListFactory.from_json_file(
+        dials_data("centroid_test_data", pathlib=True) / "experiments.json",
+        check_format=False,
+    )
+    frame0, frame1 = experiments[0].scan.get_array_range()
+    assert frame1 - frame0 == 9
+
+    # Most reflections span 2 images, with a crowd on images 4 to 6
+    bbox = flex.int6()
+    for i in range(frame0, frame1 - 1):
+        bbox.extend(flex.int6(10, (0, 10, 0, 10, i, i + 2)))
+    bbox.extend(flex.int6(40, (0, 10, 0, 10, frame0 + 4, frame0 + 6)))
+    reflections = flex.reflection_table()
+    reflections["id"] = flex.int(len(bbox), 0)
+    reflections["bbox"] = bbox
+    reflections["index"] = flex.size_t_range(len(bbox))
+
+    needed = max_memory_needed(reflections, frame0, frame1, False)
+    available = needed / 2
+    tables = integrator.frame_ordered_split(reflections, experiments, available)
+    assert len(tables) == 2
+    assert sorted(i for table in tables for i in table["index"]) == list(
+        range(len(reflections))
+    )
+    for table in tables:
+        assert max_memory_needed(table, frame0, frame1, False) <= available
+
+    # Only the first subset needs every image
+    assert integrator.estimate_image_reads(tables, experiments) < 2 * 9
+    assert integrator.estimate_image_reads([reflections], experiments) == 9
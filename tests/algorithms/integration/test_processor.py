@@ -100,3 +100,50 @@ def test_assess_available_memory_condor_job_ad(mocker, monkeypatch, tmp_path):
     )
     available_memory, _, _ = assess_available_memory(params)
     assert available_memory and available_memory != 123
+
+
+def test_image_cache():
+    def read(value):
+        def _read():
+            reads.append(value)
+            image = (flex.double(flex.grid(10, 10), value),)
+            mask = (flex.bool(flex.grid(10, 10), True),)
+            return image, mask
+
+        return _read
+
+    # Each entry is 8 * 100 bytes of image and 100 bytes of mask
+    reads = []
+    cache = dials.algorithms.integration.processor.ImageCache(max_bytes=2000)
+    (image, mask), hit = cache.get(("a", 0), read(0))
+    assert not hit and image[0][0] == 0
+    (image, mask), hit = cache.get(("a", 1), read(1))
+    assert not hit and image[0][0] == 1
+    (image, mask), hit = cache.get(("a", 0), read(0))
+    assert hit and image[0][0] == 0
+    assert reads == [0, 1]
+    assert len(cache) == 2 and cache.nbytes == 1800
+
+    # The least recently used image is evicted
+    cache.get(("a", 2), read(2))
+    assert len(cache) == 2
+    _, hit = cache.get(("a", 1), read(1))
+    assert not hit
+    _, hit = cache.get(("a", 2), read(2))
+    assert hit
+    assert reads == [0, 1, 2, 1]
+
+    # Shrinking the cache evicts images; items too large are not kept
+    cache.resize(900)
+    assert len(cache) == 1 and cache.nbytes == 900
+    cache.resize(100)
+    assert len(cache) == 0 and cache.nbytes == 0
+    _, hit = cache.get(("a", 3), read(3))
+    _, hit = cache.get(("a", 3), read(3))
+    assert not hit
+    assert reads == [0, 1, 2, 1, 3, 3]
+
+    cache.resize(2000)
+    cache.get(("a", 3), read(3))
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0
@@ -29,3 +29,23 @@ def test_timing_info():
 | User time    | 11.00 seconds |
 +--------------+---------------+"""
     )
+
+
+def test_timing_info_image_cache():
+    """Check the image cache hit rate is summed and reported."""
+    time1 = TimingInfo()
+    time2 = TimingInfo()
+
+    time1.read = 5
+    time1.cache_hits = 1
+    time1.cache_misses = 3
+    time2.cache_hits = 2
+    time2.cache_misses = 2
+
+    total = time1 + time2
+    assert total.cache_hits == 3
+    assert total.cache_misses == 5
+
+    s = str(total)
+    assert "| Image cache hit rate | 37.5% (3/8 images) |" in s
+    assert "Image cache" not in str(TimingInfo())
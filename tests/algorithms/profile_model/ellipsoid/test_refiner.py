@@ -26,6 +26,7 @@
     Simple6MosaicityParameterisation,
 )
 from dials.algorithms.profile_model.ellipsoid.refiner import (
+    MaximumLikelihoodTarget,
     Refiner,
     RefinerData,
     ReflectionLikelihood,
@@ -470,6 +471,78 @@ def f(x):
     )
 
 
+def test_MaximumLikelihoodTarget(testdata, refinerdata_testdata):
+    """The batched target should match the sum over the reflections"""
+    experiment = testdata.experiment
+    data = refinerdata_testdata
+
+    def check(parameterisation, **fixed):
+        state = ModelState(
+            experiment, parameterisation, fix_wavelength_spread=True, **fixed
+        )
+        target = MaximumLikelihoodTarget(
+            state,
+            data.s0,
+            data.sp_list,
+            data.h_list,
+            data.ctot_list,
+            data.mobs_list,
+            data.sobs_list,
+            data.panel_ids,
+        )
+        reflections = [
+            ReflectionLikelihood(
+                state,
+                data.s0,
+                data.sp_list[:, i],
+                matrix.col(data.h_list[i]),
+                data.ctot_list[i],
+                data.mobs_list[:, i],
+                data.sobs_list[:, :, i],
+            )
+            for i in range(len(data.h_list))
+        ]
+
+        # move away from the starting parameters and update
+        state.active_parameters = [p * 1.01 for p in state.active_parameters]
+        target.update()
+        for r in reflections:
+            r.modelstate.update()
+            r.update()
+
+        def assert_allclose(actual, expected):
+            expected = np.array(expected)
+            np.testing.assert_allclose(
+                actual, expected, rtol=1e-8, atol=1e-12 * np.abs(expected).max()
+            )
+
+        assert_allclose(
+            target.log_likelihood(), sum(r.log_likelihood() for r in reflections)
+        )
+        first_derivatives = np.array([r.first_derivatives() for r in reflections])
+        assert_allclose(target.first_derivatives(), first_derivatives.sum(axis=0))
+        assert_allclose(
+            target.jacobian().as_numpy_array().reshape(first_derivatives.shape),
+            first_derivatives,
+        )
+        fisher_information = sum(r.fisher_information() for r in reflections)
+        assert_allclose(
+            target.fisher_information().as_numpy_array(),
+            fisher_information.as_numpy_array(),
+        )
+
+    S1 = Simple1MosaicityParameterisation()
+    S6 = Simple6MosaicityParameterisation()
+    S6A3 = Simple6Angular3MosaicityParameterisation(
+        np.array([0.01, 0.005, 0.02, 0.015, 0.03, 0.025, 0.002, 0.001, 0.003])
+    )
+    check(S1)
+    check(S6, fix_mosaic_spread=True)
+    check(S6, fix_unit_cell=True)
+    check(S6A3)
+    check(S6A3, fix_unit_cell=True, fix_orientation=True)
+
+
 def test_Refiner(testdata, refinerdata_testdata):
 
     experiment = testdata.experiment
@@ -64,8 +64,9 @@ def test1(dials_data, tmp_path):
     os.name == "nt",
     reason="Multiprocessing error on Windows: 'This class cannot be instantiated from Python'",
 )
+@pytest.mark.parametrize("engine", ["LBFGScurvs", "LevMar"])
 def test_multi_process_refinement_gives_same_results_as_single_process_refinement(
-    dials_data, tmp_path
+    dials_data, tmp_path, engine
 ):
     data_dir = dials_data("refinement_test_data", pathlib=True)
     cmd = [
@@ -73,7 +74,7 @@ def test_multi_process_refinement_gives_same_results_as_single_process_refinemen
         data_dir / "multi_stills_combined.json",
         data_dir / "multi_stills_combined.pickle",
         "outlier.algorithm=null",
-        "engine=LBFGScurvs",
+        f"engine={engine}",
         "output.reflections=None",
     ]
     result = subprocess.run(
@@ -3,7 +3,7 @@
 import random
 import sys
 import time
-from math import pi
+from math import floor, pi
 
 import numpy as np
 import pytest
@@ -229,6 +229,53 @@ def test(cmdline_overrides=[]):
     pred_param.compose(reflections)
 
 
+def test_compose_states_match_frames():
+    tc = _Test()
+    tc.create_models()
+    reflections = tc.generate_reflections()
+
+    from dials.algorithms.refinement.reflection_manager import ReflectionManager
+
+    refman = ReflectionManager(reflections, tc.experiments, outlier_detector=None)
+    refman.finalise()
+    reflections = refman.get_matches()
+
+    # shuffle the reflections so that the blocks are interleaved
+    reflections = reflections.select(flex.random_permutation(len(reflections)))
+
+    pred_param = ScanVaryingPredictionParameterisation(
+        tc.experiments,
+        [tc.det_param],
+        [tc.s0_param],
+        [tc.xlo_param],
+        [tc.xluc_param],
+        [tc.gon_param],
+    )
+    p_vals = pred_param.get_param_vals()
+    pred_param.set_param_vals([v + random.uniform(-0.01, 0.01) for v in p_vals])
+
+    pred_param.compose(reflections)
+
+    # each reflection gets the states composed at the frame of its block
+    for i, centre in enumerate(reflections["block_centre"]):
+        frame = int(floor(centre))
+        for param, column in [
+            (tc.xlo_param, "u_matrix"),
+            (tc.xluc_param, "b_matrix"),
+            (tc.s0_param, "s0_vector"),
+            (tc.gon_param, "S_matrix"),
+            (tc.det_param, "d_matrix"),
+        ]:
+            param.compose(frame)
+            assert reflections[column][i] == pytest.approx(
+                tuple(param.get_state()), abs=1e-12
+            )
+
+    # the cached derivatives cover every reflection for each parameter
+    an_grads = pred_param.get_gradients(reflections)
+    assert len(an_grads) == len(p_vals)
+
+
 def test_SparseFlex_scalars():
 
     size = 100
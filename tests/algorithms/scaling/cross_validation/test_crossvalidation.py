@@ -214,3 +214,31 @@ def test_cross_validate_script():
             param.cross_validation.cross_validation_mode = "bad"
             with pytest.raises(ValueError):
                 cross_validate(param, crossvalidator)
+
+
+@pytest.mark.parametrize("nproc", [1, 2])
+def test_cross_validate_parallel(nproc):
+    """Test that the jobs give the same results dict when run in parallel"""
+
+    def get_job_results(self, params):
+        n = params.scaling_options.free_set_offset
+        lmax = params.physical.lmax
+        return [1.0, 2.0 + n, 1.0 + n, 3.0, 4.0 - lmax, 0.5]
+
+    param = generated_param()
+    param.cross_validation.cross_validation_mode = "multi"
+    param.cross_validation.parameter = "physical.lmax"
+    param.cross_validation.parameter_values = ["4", "6"]
+    param.cross_validation.nfolds = 3
+    param.cross_validation.nproc = nproc
+    crossvalidator = DialsScaleCrossValidator([], [])
+    with mock.patch.object(
+        DialsScaleCrossValidator, "get_job_results", new=get_job_results
+    ):
+        cross_validate(param, crossvalidator)
+
+    assert crossvalidator.results_dict[0]["configuration"] == ["physical.lmax=4"]
+    assert crossvalidator.results_dict[0]["free Rmeas"] == [2.0, 3.0, 4.0]
+    assert crossvalidator.results_dict[0]["free CC1/2"] == [0.0, 0.0, 0.0]
+    assert crossvalidator.results_dict[1]["free Rmeas"] == [2.0, 3.0, 4.0]
+    assert crossvalidator.results_dict[1]["free CC1/2"] == [-2.0, -2.0, -2.0]
@@ -0,0 +1,127 @@
+"""Tests for the grouped merging statistics calculation."""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+import iotbx.merging_statistics
+from cctbx import crystal, miller
+
+from dials.algorithms.scaling.merging_statistics import (
+    cc_one_half_random_splits,
+    merging_stats_from_scaled_array_fast,
+)
+from dials.algorithms.scaling.scaling_library import ExtendedDatasetStatistics
+from dials.algorithms.scaling.scaling_utilities import DialsMergingStatisticsError
+from dials.array_family import flex
+
+
+def generate_unmerged_array():
+    """Make an unmerged, scaled intensity array with random multiplicities."""
+    rng = np.random.default_rng(0)
+    symmetry = crystal.symmetry(
+        unit_cell=(40, 50, 60, 90, 100, 90), space_group_symbol="P 1 2 1"
+    )
+    complete = miller.build_set(symmetry, anomalous_flag=False, d_min=3.0)
+    # leave some reflections unmeasured, to test the completeness
+    unique = [hkl for hkl in complete.indices() if rng.random() < 0.9]
+    indices = flex.miller_index()
+    true_I = flex.double()
+    for hkl in unique:
+        intensity = rng.gamma(1.0, 100.0)
+        for _ in range(rng.integers(1, 6)):
+            # record some of the observations as Friedel mates
+            indices.append(hkl if rng.random() < 0.5 else (-hkl[0], -hkl[1], -hkl[2]))
+            true_I.append(intensity)
+    sigmas = flex.sqrt(true_I) + 1.0
+    noise = flex.double(rng.normal(0.0, 1.0, len(true_I)).tolist())
+    i_obs = miller.array(
+        miller.set(symmetry, indices, anomalous_flag=False),
+        data=true_I + noise * sigmas,
+        sigmas=sigmas,
+    )
+    i_obs.set_observation_type_xray_intensity()
+    return i_obs
+
+
+def test_merging_stats_from_scaled_array_fast():
+    """Compare the overall statistics to those from iotbx."""
+    i_obs = generate_unmerged_array()
+    expected = iotbx.merging_statistics.dataset_statistics(
+        i_obs=i_obs,
+        n_bins=10,
+        anomalous=False,
+        sigma_filtering=None,
+        eliminate_sys_absent=False,
+        use_internal_variance=False,
+    )
+    result = merging_stats_from_scaled_array_fast(i_obs, n_bins=10)
+
+    overall = result.overall
+    assert overall.n_obs == expected.overall.n_obs
+    assert overall.n_uniq == expected.overall.n_uniq
+    assert overall.completeness == pytest.approx(expected.overall.completeness)
+    assert overall.mean_redundancy == pytest.approx(expected.overall.mean_redundancy)
+    assert overall.i_mean == pytest.approx(expected.overall.i_mean)
+    assert overall.i_over_sigma_mean == pytest.approx(
+        expected.overall.i_over_sigma_mean
+    )
+    assert overall.r_merge == pytest.approx(expected.overall.r_merge)
+    assert overall.r_meas == pytest.approx(expected.overall.r_meas)
+    assert overall.r_pim == pytest.approx(expected.overall.r_pim)
+    # CC½ depends on the random half-dataset split
+    assert overall.cc_one_half == pytest.approx(expected.overall.cc_one_half, abs=0.05)
+
+    assert len(result.bins) == 10
+    assert sum(b.n_obs for b in result.bins) == overall.n_obs
+    assert sum(b.n_uniq for b in result.bins) == overall.n_uniq
+    assert result.bins[0].d_max > result.bins[-1].d_min
+    assert result.bins[-1].d_min == pytest.approx(overall.d_min)
+
+    # a dataset with no equivalent reflections has no merging statistics
+    with pytest.raises(DialsMergingStatisticsError):
+        merging_stats_from_scaled_array_fast(i_obs.merge_equivalents().array())
+
+
+def test_cc_one_half_random_splits():
+    """Test CC½ averaged over several random half-dataset splits."""
+    i_obs = generate_unmerged_array()
+    stats = ExtendedDatasetStatistics(
+        i_obs=i_obs,
+        n_bins=5,
+        anomalous=False,
+        use_internal_variance=False,
+        eliminate_sys_absent=False,
+        cc_one_half_n_splits=20,
+    )
+    assert len(stats.cc_one_half_mean_binned) == 5
+    assert len(stats.cc_one_half_std_binned) == 5
+    assert all(std > 0 for std in stats.cc_one_half_std_binned)
+    for b, mean, std in zip(
+        stats.bins, stats.cc_one_half_mean_binned, stats.cc_one_half_std_binned
+    ):
+        assert b.cc_one_half == pytest.approx(mean, abs=max(5 * std, 0.02))
+    assert stats.cc_one_half_mean == pytest.approx(stats.overall.cc_one_half, abs=0.05)
+    d = stats.as_dict()
+    assert d["cc_one_half_mean"] == stats.cc_one_half_mean_binned
+    assert d["overall"]["cc_one_half_std"] == stats.cc_one_half_std
+
+    # Friedel mates of an anomalous array are merged if anomalous=False
+    anom_stats = ExtendedDatasetStatistics(
+        i_obs=i_obs.as_anomalous_array(),
+        n_bins=5,
+        anomalous=False,
+        use_internal_variance=False,
+        eliminate_sys_absent=False,
+        cc_one_half_n_splits=20,
+    )
+    assert anom_stats.cc_one_half_mean_binned == pytest.approx(
+        stats.cc_one_half_mean_binned
+    )
+
+    # the splits are reproducible for a given seed
+    d_ranges = [(b.d_max, b.d_min) for b in stats.bins]
+    cc = cc_one_half_random_splits(i_obs, d_ranges, n_splits=3, seed=1)
+    assert cc.shape == (3, 5)
+    assert np.all(cc == cc_one_half_random_splits(i_obs, d_ranges, n_splits=3, seed=1))
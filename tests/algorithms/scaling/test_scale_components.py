@@ -11,6 +11,8 @@
 from scitbx import sparse
 
 from dials.algorithms.scaling.model.components.scale_components import (
+    LinearDoseDecay,
+    QuadraticDoseDecay,
     ScaleComponentBase,
     SHScaleComponent,
     SingleBScaleFactor,
@@ -95,6 +97,27 @@ def test_SingleBScaleFactor():
     assert BSF.n_refl[0] == 1
 
 
+def test_DoseDecay_components():
+    """Test the scales and derivatives of the dose decay components."""
+    rt = flex.reflection_table()
+    rt["d"] = flex.double([1.0, 2.0])
+    rt["x"] = flex.double([0.0, 4.0])
+    for component_type, power in ((LinearDoseDecay, 1), (QuadraticDoseDecay, 2)):
+        component = component_type(flex.double([0.5]))
+        component.data = {"d": rt["d"], "x": rt["x"]}
+        component.update_reflection_data()
+        assert component.n_refl == [2]
+        s, d = component.calculate_scales_and_derivatives()
+        x_over_d = [0.0, 4.0 / 2.0**power]
+        assert list(s) == pytest.approx([exp(0.5 * v) for v in x_over_d])
+        assert d.n_rows == 2 and d.n_cols == 1
+        for i, v in enumerate(x_over_d):
+            assert d[i, 0] == pytest.approx(exp(0.5 * v) * v)
+        component.update_reflection_data(flex.bool([False, False]))
+        s, d = component.calculate_scales_and_derivatives()
+        assert s.size() == 0 and d.n_rows == 0
+
+
 def test_SHScalefactor():
     """Test the spherical harmonic absorption component."""
     initial_param = 0.1
@@ -719,7 +719,8 @@ def test_sf_variance_calculation():
 
 
 def test_multiscaler_update_for_minimisation():
-    """Test the multiscaler update_for_minimisation method."""
+    """Test the multiscaler update_for_minimisation method, with the scales and
+    derivatives calculated in worker processes as nproc = 2."""
 
     p, e = (generated_param(), generated_exp(2))
     p.reflection_selection.method = "use_all"
@@ -782,3 +783,4 @@ def test_multiscaler_update_for_minimisation():
     )
     assert block_list[1].derivatives == expected_derivatives_for_block_2
     assert block_list[0].derivatives == expected_derivatives_for_block_1
+    multiscaler._shutdown_pool()
@@ -38,6 +38,8 @@
     calculate_harmonic_tables_from_selections,
     create_sph_harm_lookup_table,
     create_sph_harm_table,
+    sparse_matrix_as_csr,
+    sparse_matrix_from_csr,
 )
 
 
@@ -560,3 +562,21 @@ def test_calc_lookup_index():
     assert list(indices) == [0, 64799, 359, 64440]
     indices = calc_lookup_index(theta_phi, 2)
     assert list(indices) == [0, 259199, 719, 258480]
+
+
+def test_sparse_matrix_csr():
+    m = matrix(4, 3)
+    m[0, 2] = 1.0
+    m[2, 0] = 2.0
+    m[2, 1] = 3.0
+    m[3, 2] = 4.0
+    data, indices, indptr = sparse_matrix_as_csr(m)
+    assert list(data) == [1.0, 2.0, 3.0, 4.0]
+    assert list(indices) == [2, 0, 1, 2]
+    assert list(indptr) == [0, 1, 1, 3, 4]
+    assert sparse_matrix_from_csr(4, 3, data, indices, indptr) == m
+
+    # an empty matrix
+    data, indices, indptr = sparse_matrix_as_csr(matrix(0, 3))
+    assert list(indptr) == [0]
+    assert sparse_matrix_from_csr(0, 3, data, indices, indptr) == matrix(0, 3)
@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import threading
+
+from dials.algorithms.spot_finding.finder import ExtractPixelsFromImage, ExtractSpots
+
+
+class _CountingImageSet:
+    """Stand-in for an imageset that records which images are read"""
+
+    def __init__(self, n):
+        self.n = n
+        self.read = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.n
+
+    def get_corrected_data(self, index):
+        with self._lock:
+            self.read.append(index)
+        return (index,)
+
+    def get_mask(self, index):
+        return (True,)
+
+
+def test_chunk_tasks():
+    assert ExtractSpots._chunk_tasks(list(range(5)), 2) == [
+        (0, 2),
+        (1, 2),
+        (2, 4),
+        (3, 4),
+        (4, 5),
+    ]
+
+
+def test_prefetch_stops_at_chunk_end():
+    imageset = _CountingImageSet(10)
+    function = ExtractPixelsFromImage(
+        imageset=imageset,
+        threshold_function=None,
+        mask=None,
+        region_of_interest=None,
+        max_strong_pixel_fraction=1,
+        compute_mean_background=False,
+        prefetch=3,
+    )
+    for index in (2, 3):
+        image, _ = function._get_image_and_mask(index, 4)
+        assert image == (index,)
+    function.shutdown_reader()
+    assert function._reader is None
+    assert sorted(imageset.read) == [2, 3]
@@ -2,11 +2,21 @@
 
 from __future__ import annotations
 
+from collections import defaultdict
 from unittest import mock
 
+import numpy as np
+import pytest
+
+from cctbx import sgtbx, uctbx
 from dxtbx.model import Crystal, Experiment, ExperimentList, Scan
 
 from dials.algorithms.statistics.cc_half_algorithm import CCHalfFromDials
+from dials.algorithms.statistics.delta_cchalf import (
+    PerGroupCChalfStatistics,
+    ReflectionSum,
+    compute_cchalf_from_reflection_sums,
+)
 from dials.array_family import flex
 from dials.command_line.compute_delta_cchalf import phil_scope
 
@@ -118,3 +128,50 @@ def mock_algorithm(*_):
         assert script.results_summary["dataset_removal"][
             "experiments_fully_removed"
         ] == ["0"]
+
+
+def test_PerGroupCChalfStatistics_matches_reference_sums():
+    """Test the batched ΔCC½ calculation against a per-group recalculation."""
+    rng = np.random.default_rng(42)
+    n_refl = 2000
+    indices = rng.integers(-6, 7, size=(n_refl, 3))
+    indices[np.all(indices == 0, axis=1)] = (1, 0, 0)
+    groups = rng.integers(0, 8, size=n_refl)
+    intensities = rng.normal(100.0, 30.0, size=n_refl) + 10.0 * np.abs(indices).sum(
+        axis=1
+    )
+
+    refls = flex.reflection_table()
+    refls["miller_index"] = flex.miller_index([tuple(map(int, h)) for h in indices])
+    refls["intensity"] = flex.double(intensities)
+    refls["variance"] = flex.double(n_refl, 1.0)
+    refls["dataset"] = flex.int([int(g) for g in groups])
+    refls["group"] = flex.int([int(g) for g in groups])
+
+    statistics = PerGroupCChalfStatistics(
+        refls,
+        uctbx.unit_cell((10, 11, 12, 90, 90, 90)),
+        sgtbx.space_group_info("P 2 2 2").group(),
+    )
+    statistics.run()
+
+    def reflection_sums(excluded_group=None):
+        sums = defaultdict(ReflectionSum)
+        table = statistics.reflection_table
+        for h, i, g in zip(table["miller_index"], table["intensity"], table["group"]):
+            if g != excluded_group:
+                sums[h].sum_x += i
+                sums[h].sum_x2 += i**2
+                sums[h].n += 1
+        return sums
+
+    assert statistics.mean_cchalf() == pytest.approx(
+        compute_cchalf_from_reflection_sums(reflection_sums(), statistics.binner)
+    )
+    assert list(statistics.cchalf_i().keys()) == list(dict.fromkeys(groups.tolist()))
+    for group, cchalf in statistics.cchalf_i().items():
+        assert cchalf == pytest.approx(
+            compute_cchalf_from_reflection_sums(
+                reflection_sums(group), statistics.binner
+            )
+        )
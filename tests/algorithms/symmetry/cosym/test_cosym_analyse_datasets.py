@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import numpy as np
 import pytest
 
 import libtbx
@@ -139,3 +140,32 @@ def test_cosym(
             )
         else:
             reference = reindexed
+
+
+def test_cosym_random_starts():
+    """The dimension scan and random starts give the same result in parallel"""
+    datasets, expected_reindexing_ops = generate_test_data(
+        space_group=sgtbx.space_group_info(symbol="P3").group(),
+        sample_size=10,
+        seed=1,
+    )
+    params = phil_scope.extract()
+    params.dimensions = libtbx.Auto
+    params.normalisation = None
+    params.minimization.n_random_starts = 3
+
+    results = []
+    for nproc in (1, 2):
+        params.nproc = nproc
+        np.random.seed(42)
+        cosym = CosymAnalysis(datasets, params)
+        cosym.run()
+        results.append(cosym)
+    assert results[0].target.dim == results[1].target.dim
+    assert results[0].minimizer.fun == results[1].minimizer.fun
+    assert results[0].reindexing_ops == results[1].reindexing_ops
+    assert len(results[0].reindexing_ops) == len(expected_reindexing_ops)
+    assert (
+        results[0].best_subgroup["best_subsym"].space_group()
+        == sgtbx.space_group_info(symbol="P3").group().build_derived_patterson_group()
+    )
@@ -52,3 +52,30 @@ def test_cosym_target(space_group):
         assert f < f0
         assert pytest.approx(g, abs=1e-3) == [0] * len(g)
         assert pytest.approx(g_fd, abs=1e-3) == [0] * len(g)
+
+
+@pytest.mark.parametrize("nproc", [1, 2])
+def test_pairwise_correlations(nproc, monkeypatch):
+    # use several blocks of rows
+    monkeypatch.setattr(target, "_CORRELATION_BLOCK_ELEMENTS", 100)
+    rng = np.random.default_rng(0)
+    n_rows, n_columns = 20, 50
+    dense = rng.normal(100, 10, (n_rows, n_columns))
+    dense[rng.random(dense.shape) < 0.7] = np.nan
+    rows, columns = np.nonzero(np.isfinite(dense))
+    values = dense[rows, columns]
+    # a duplicated entry is overwritten by the later value
+    rows = np.insert(rows, 0, rows[0])
+    columns = np.insert(columns, 0, columns[0])
+    values = np.insert(values, 0, -1000)
+
+    cc, n_pairs = target._pairwise_correlations(
+        rows, columns * 3, values, n_rows, nproc=nproc
+    )
+    for i in range(n_rows):
+        for j in range(n_rows):
+            sel = np.isfinite(dense[i]) & np.isfinite(dense[j])
+            assert n_pairs[i, j] == np.count_nonzero(sel)
+            if n_pairs[i, j] > 2:
+                expected = np.corrcoef(dense[i, sel], dense[j, sel])[0, 1]
+                assert cc[i, j] == pytest.approx(expected)
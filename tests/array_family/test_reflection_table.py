@@ -758,7 +758,8 @@ def test_copy():
     assert table2.is_consistent()
 
 
-def test_extract_shoeboxes():
+@pytest.mark.parametrize("nthreads", [1, 3])
+def test_extract_shoeboxes(nthreads):
     random.seed(0)
 
     reflections = flex.reflection_table()
@@ -830,7 +831,7 @@ def get_mask(self, index):
 
     imageset = FakeImageSet()
 
-    reflections.extract_shoeboxes(imageset)
+    reflections.extract_shoeboxes(imageset, nthreads=nthreads)
 
     for i in range(len(reflections)):
         sbox = reflections[i]["shoebox"]
@@ -1185,6 +1186,42 @@ def compare(a, b):
     assert all(tuple(compare(a, b) for a, b in zip(new_table["col11"], c11)))
 
 
+@pytest.mark.parametrize("use_pickle", [False, True])
+def test_from_file_selected_columns(tmp_path, use_pickle):
+    table = flex.reflection_table()
+    table["id"] = flex.int([0, 0, 1, 1])
+    table["miller_index"] = flex.miller_index(
+        [(1, 0, 0), (0, 1, 0), (0, 0, 1), (1, 1, 1)]
+    )
+    table["intensity.sum.value"] = flex.double([1.0, 2.0, 3.0, 4.0])
+    shoebox = Shoebox(0, (0, 2, 0, 2, 0, 1))
+    shoebox.allocate()
+    table["shoebox"] = flex.shoebox([shoebox] * 4)
+    table.experiment_identifiers()[0] = "abcd"
+    table.experiment_identifiers()[1] = "efgh"
+    filename = str(tmp_path / "reflections.refl")
+    if use_pickle:
+        table.as_pickle(filename)
+    else:
+        table.as_file(filename)
+
+    new_table = flex.reflection_table.from_file(
+        filename, columns=["id", "intensity.sum.value", "not_a_column"]
+    )
+    assert new_table.is_consistent()
+    assert new_table.nrows() == 4
+    assert set(new_table.keys()) == {"id", "intensity.sum.value"}
+    assert list(new_table["intensity.sum.value"]) == [1.0, 2.0, 3.0, 4.0]
+    assert dict(new_table.experiment_identifiers()) == {0: "abcd", 1: "efgh"}
+
+    new_table = flex.reflection_table.from_file(filename, exclude_columns=["shoebox"])
+    assert set(new_table.keys()) == {"id", "miller_index", "intensity.sum.value"}
+    assert list(new_table["miller_index"]) == list(table["miller_index"])
+
+    new_table = flex.reflection_table.from_file(filename)
+    assert new_table.ncols() == 4
+
+
 def test_experiment_identifiers():
     table = flex.reflection_table()
     table["id"] = flex.int([0, 1, 2, 3])
@@ -1587,6 +1624,47 @@ def test_match_by_hkle():
     assert list(n1) == i
 
 
+def test_match_with_reference():
+    predicted = flex.reflection_table()
+    predicted["id"] = flex.int([0, 0, 0, 1, 0, 0])
+    predicted["miller_index"] = flex.miller_index(
+        [(1, 0, 0), (1, 0, 0), (2, 0, 0), (2, 0, 0), (3, 0, 0), (4, 0, 0)]
+    )
+    predicted["entering"] = flex.bool([True, True, True, True, True, False])
+    predicted["panel"] = flex.size_t(6, 0)
+    predicted["xyzcal.px"] = flex.vec3_double(
+        [(0, 0, 0), (10, 0, 0), (0, 0, 0), (0.5, 0, 0), (0, 0, 0), (0, 0, 0)]
+    )
+    predicted.set_flags(flex.bool(6, False), predicted.flags.strong)
+
+    reference = flex.reflection_table()
+    reference["id"] = flex.int([0, 1, 0, 0])
+    reference["miller_index"] = flex.miller_index(
+        [(1, 0, 0), (2, 0, 0), (4, 0, 0), (1, 0, 0)]
+    )
+    reference["entering"] = flex.bool([True, True, True, True])
+    reference["panel"] = flex.size_t(4, 0)
+    reference["xyzcal.px"] = flex.vec3_double(
+        [(9, 0, 0), (0, 0, 0), (0, 0, 0), (1, 0, 0)]
+    )
+    reference.set_flags(flex.bool(4, True), reference.flags.strong)
+
+    # The two predictions of (1, 0, 0) pair with their nearest references, the
+    # (2, 0, 0) reference has experiment id 1 and (4, 0, 0) differs in entering
+    index = flex.reflection_match_index(reference)
+    sind, oind = index.match(predicted)
+    assert list(sind) == [0, 1, 3]
+    assert list(oind) == [3, 0, 1]
+
+    matched, reference_matched, unmatched = predicted.match_with_reference(
+        reference, index=index
+    )
+    assert list(matched) == [True, True, False, True, False, False]
+    assert len(reference_matched) == 3
+    assert list(unmatched["miller_index"]) == [(4, 0, 0)]
+    assert predicted.get_flags(predicted.flags.strong).count(True) == 3
+
+
 def test_concat():
     table1 = flex.reflection_table()
     table2 = flex.reflection_table()
@@ -8,9 +8,14 @@
 
 import pytest
 
+import libtbx
 from dxtbx.model.experiment_list import ExperimentListFactory
 
 import dials.command_line.find_spots
+from dials.algorithms.spot_finding.factory import (
+    BackgroundGradientFilter,
+    SpotFinderFactory,
+)
 from dials.array_family import flex
 
 
@@ -50,6 +55,26 @@ def test_find_spots_from_images(dials_data, tmp_path):
     )
 
 
+@pytest.mark.parametrize("nproc", [1, 2])
+def test_find_spots_with_prefetch(dials_data, tmp_path, nproc):
+    result = subprocess.run(
+        [
+            shutil.which("dials.find_spots"),
+            f"nproc={nproc}",
+            "prefetch=3",
+            "output.reflections=spotfinder.refl",
+            "output.shoeboxes=True",
+            "algorithm=dispersion",
+        ]
+        + list(dials_data("centroid_test_data", pathlib=True).glob("centroid*.cbf")),
+        cwd=tmp_path,
+        capture_output=True,
+    )
+    assert not result.returncode and not result.stderr
+    reflections = flex.reflection_table.from_file(tmp_path / "spotfinder.refl")
+    _check_expected_results(reflections)
+
+
 def test_find_spots_from_images_override_maximum(dials_data, tmp_path):
     result = subprocess.run(
         [
@@ -415,3 +440,29 @@ def test_find_spots_radial_profile(dials_data, blur, expected_nref, run_in_tmp_p
         return_results=True,
     )
     assert len(reflections) == expected_nref
+
+
+def test_find_spots_background_gradient_filter_nproc_auto(dials_data, run_in_tmp_path):
+    params = dials.command_line.find_spots.working_phil.extract()
+    assert params.spotfinder.mp.nproc is libtbx.Auto
+    params.spotfinder.filter.background_gradient.filter = True
+    filter_runner = SpotFinderFactory.configure_filter(params)
+    (bg_filter,) = [
+        f for f in filter_runner.filters if isinstance(f, BackgroundGradientFilter)
+    ]
+    assert isinstance(bg_filter.nthreads, int) and bg_filter.nthreads >= 1
+
+    reflections = dials.command_line.find_spots.run(
+        [
+            "filter.background_gradient.filter=True",
+            "algorithm=dispersion",
+        ]
+        + [
+            os.fspath(f)
+            for f in dials_data("centroid_test_data", pathlib=True).glob(
+                "centroid*.cbf"
+            )
+        ],
+        return_results=True,
+    )
+    assert len(reflections)
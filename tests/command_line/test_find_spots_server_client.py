@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 import shutil
 import socket
 import subprocess
@@ -66,6 +67,39 @@ def test_find_spots_server_client(dials_data, tmp_path, server_port):
         assert not result.returncode and not result.stderr
 
 
+def test_find_spots_server_batch_and_metrics(dials_data, tmp_path, server_port):
+    filenames = sorted(dials_data("centroid_test_data", pathlib=True).glob("*.cbf"))
+    try:
+        request = urllib.request.Request(
+            f"http://127.0.0.1:{server_port}/",
+            data=json.dumps(
+                {
+                    "images": [str(f) for f in filenames[:3]],
+                    "params": ["min_spot_size=3", "algorithm=dispersion"],
+                }
+            ).encode(),
+            headers={"Content-type": "application/json"},
+        )
+        results = json.loads(urllib.request.urlopen(request).read())
+        assert [d["image"] for d in results] == [str(f) for f in filenames[:3]]
+        assert all(d["n_spots_total"] > 150 for d in results)
+        for d in results:
+            assert d["timings"]["total"] > 0
+            assert "spotfinding" in d["timings"]
+
+        metrics = json.loads(
+            urllib.request.urlopen(f"http://127.0.0.1:{server_port}/metrics").read()
+        )
+        assert {"pid", "n_requests", "n_images", "max_time"} <= set(metrics)
+    finally:
+        result = subprocess.run(
+            [shutil.which("dials.find_spots_client"), f"port={server_port}", "stop"],
+            cwd=tmp_path,
+            capture_output=True,
+        )
+        assert not result.returncode and not result.stderr
+
+
 def wait_for_server(port, max_wait=20):
     print(f"Waiting up to {max_wait} seconds for server to start")
     server_ok = False
@@ -214,6 +214,41 @@ def test_scan_varying_with_fixed_crystal(fix, dials_data, tmp_path):
     assert not result.returncode and not result.stderr
 
 
+def test_scan_varying_multi_process_refinement(dials_data, tmp_path):
+    location = dials_data("multi_crystal_proteinase_k", pathlib=True)
+    refls = location / "reflections_1.pickle"
+    expts = location / "experiments_1.json"
+
+    for nproc in (1, 2):
+        result = subprocess.run(
+            [
+                shutil.which("dials.refine"),
+                expts,
+                refls,
+                "engine=LevMar",
+                f"nproc={nproc}",
+                f"output.experiments=refined_nproc{nproc}.expt",
+                "output.reflections=None",
+            ],
+            cwd=tmp_path,
+            capture_output=True,
+        )
+        assert not result.returncode and not result.stderr
+
+    nproc1, nproc2 = (
+        ExperimentListFactory.from_json_file(
+            tmp_path / f"refined_nproc{nproc}.expt", check_format=False
+        )
+        for nproc in (1, 2)
+    )
+    for c1, c2 in zip(nproc1.crystals(), nproc2.crystals()):
+        assert c1.num_scan_points == c2.num_scan_points > 0
+        for i in range(c1.num_scan_points):
+            assert c1.get_A_at_scan_point(i) == pytest.approx(
+                c2.get_A_at_scan_point(i), abs=1e-6
+            )
+
+
 def test_scan_varying_missing_segments_multi_crystal(dials_data, tmp_path):
     # https://github.com/dials/dials/issues/1053
     location = dials_data("i19_1_pdteet_index", pathlib=True)
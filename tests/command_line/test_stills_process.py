@@ -257,3 +257,95 @@ def test_pseudo_scan(dials_data, tmp_path):
         tmp_path / "idx-0000_refined.expt", check_format=False
     )
     assert len(experiments) == 2
+
+
+def test_sacla_h5_multiprocessing(dials_data, tmp_path):
+    """The images are shared between the processes through the work queue"""
+    sacla_path = dials_data("image_examples", pathlib=True)
+    image_path = sacla_path / "SACLA-MPCCD-run266702-0-subset.h5"
+    geometry_path = (
+        sacla_path / "SACLA-MPCCD-run266702-0-subset-refined_experiments_level1.json"
+    )
+    with open(tmp_path / "process_sacla.phil", "w") as f:
+        f.write(sacla_phil % (geometry_path, "False", "False", "None"))
+
+    result = subprocess.run(
+        [
+            shutil.which("dials.stills_process"),
+            image_path,
+            "process_sacla.phil",
+            "mp.nproc=2",
+            "mp.chunk_size=1",
+        ],
+        cwd=tmp_path,
+        capture_output=True,
+    )
+    assert not result.returncode and not result.stderr
+
+    # each process writes its own composite output, with all four images between them
+    n_experiments = 0
+    for filename in tmp_path.glob("idx-*_integrated.expt"):
+        n_experiments += len(
+            ExperimentListFactory.from_json_file(filename, check_format=False)
+        )
+    assert n_experiments == 4
+
+
+def test_sacla_h5_composite_flush(dials_data, tmp_path):
+    """The composite output is written in chunks of composite_flush_interval events"""
+    sacla_path = dials_data("image_examples", pathlib=True)
+    image_path = sacla_path / "SACLA-MPCCD-run266702-0-subset.h5"
+    geometry_path = (
+        sacla_path / "SACLA-MPCCD-run266702-0-subset-refined_experiments_level1.json"
+    )
+    with open(tmp_path / "process_sacla.phil", "w") as f:
+        f.write(sacla_phil % (geometry_path, "False", "False", "None"))
+
+    result = subprocess.run(
+        [
+            shutil.which("dials.stills_process"),
+            image_path,
+            "process_sacla.phil",
+            "output.composite_flush_interval=3",
+        ],
+        cwd=tmp_path,
+        capture_output=True,
+    )
+    assert not result.returncode and not result.stderr
+
+    chunks = [
+        ExperimentListFactory.from_json_file(
+            tmp_path / f"idx-0000_{chunk}_integrated.expt", check_format=False
+        )
+        for chunk in ("000", "001")
+    ]
+    assert [len(experiments) for experiments in chunks] == [3, 1]
+    table = flex.reflection_table.from_file(tmp_path / "idx-0000_001_integrated.refl")
+    assert set(table["id"]) == {0}
+    assert not (tmp_path / "idx-0000_integrated.expt").exists()
+
+
+def test_composite_flush_with_composite_stride(dials_data, tmp_path):
+    """Flushed chunks would bypass the stride aggregation, so this is rejected"""
+    sacla_path = dials_data("image_examples", pathlib=True)
+    image_path = sacla_path / "SACLA-MPCCD-run266702-0-subset.h5"
+    geometry_path = (
+        sacla_path / "SACLA-MPCCD-run266702-0-subset-refined_experiments_level1.json"
+    )
+    with open(tmp_path / "process_sacla.phil", "w") as f:
+        f.write(sacla_phil % (geometry_path, "False", "False", "None"))
+
+    result = subprocess.run(
+        [
+            shutil.which("dials.stills_process"),
+            image_path,
+            "process_sacla.phil",
+            "output.composite_flush_interval=3",
+            "mp.composite_stride=2",
+        ],
+        cwd=tmp_path,
+        capture_output=True,
+    )
+    assert result.returncode
+    assert b"composite_stride" in result.stderr
+    assert not list(tmp_path.glob("idx-*_integrated.expt"))
@@ -704,6 +704,24 @@ def test_sum_partial_reflections():
     assert list(r["identifier"]) == [1, 3, 5]
     assert list(r["partiality"]) == [0.9, 0.8, 0.9]
 
+    # partials of the same reflection need not be adjacent in the table
+    r = flex.reflection_table()
+    r["intensity.sum.value"] = flex.double([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+    r["intensity.sum.variance"] = flex.double([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+    r["intensity.scale.value"] = flex.double([1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+    r["intensity.scale.variance"] = flex.double([1.0, 1.0, 1.0, 1.0, 1.0, 2.0])
+    r["partial_id"] = flex.int([4, 1, 4, 3, 1, 4])
+    r["partiality"] = flex.double([0.25, 0.5, 0.25, 0.9, 0.4, 0.25])
+    r["identifier"] = flex.int([1, 2, 3, 4, 5, 6])
+
+    r = sum_partial_reflections(r)
+    assert list(r["identifier"]) == [1, 2, 4]
+    assert list(r["partiality"]) == pytest.approx([0.75, 0.9, 0.9])
+    assert list(r["intensity.sum.value"]) == [10.0, 7.0, 4.0]
+    assert list(r["intensity.sum.variance"]) == [10.0, 7.0, 4.0]
+    assert list(r["intensity.scale.value"]) == pytest.approx([2.8, 3.5, 4.0])
+    assert list(r["intensity.scale.variance"]) == pytest.approx([0.4, 0.5, 1.0])
+
     # if all partiality of one - should just return same
     r = flex.reflection_table()
     r["intensity.scale.value"] = flex.double([1.0, 2.0, 3.0])
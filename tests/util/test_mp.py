@@ -2,6 +2,8 @@
 
 import os
 
+import pytest
+
 import dials.util.mp
 
 
@@ -43,3 +45,47 @@ def test_available_cores_condor_job_ad(monkeypatch, tmp_path):
 """
     )
     assert dials.util.mp.available_cores() == true_cores
+
+
+def _offset(i):
+    return i + _worker_offset
+
+
+_worker_offset = 0
+
+
+def _set_offset(offset):
+    global _worker_offset
+    _worker_offset = offset
+
+
+def test_bounded_imap_unordered():
+    consumed = []
+
+    def items():
+        for i in range(100):
+            consumed.append(i)
+            yield i
+
+    results = dials.util.mp.bounded_imap_unordered(
+        _offset,
+        items(),
+        nproc=2,
+        max_in_flight=4,
+        initializer=_set_offset,
+        initargs=(1000,),
+    )
+    first = next(results)
+    assert 1000 <= first < 1100
+    # The input is consumed lazily, limited by the number of items in flight
+    assert len(consumed) < 100
+    assert sorted([first, *results]) == list(range(1000, 1100))
+
+
+def test_ordered_results():
+    results = [3, 1, 0, 2, 5, 4]
+    ordered = dials.util.mp.ordered_results(results, range(6), key=lambda r: r)
+    assert list(ordered) == [0, 1, 2, 3, 4, 5]
+
+    with pytest.raises(ValueError):
+        list(dials.util.mp.ordered_results([0, 2], range(1), key=lambda r: r))
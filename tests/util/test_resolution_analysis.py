@@ -92,6 +92,30 @@ def test_resolution_cc_half(merging_stats):
     assert len(result.critical_values) == len(result.d_star_sq)
 
 
+def test_resolution_cc_half_split_average(merging_stats):
+    expected = resolution_analysis.resolution_cc_half(merging_stats, limit=0.82)
+    cc_one_half = [b.cc_one_half for b in merging_stats.bins]
+
+    # CC½ averaged over random splits is used in place of the single split values
+    merging_stats.cc_one_half_mean_binned = [cc - 0.05 for cc in cc_one_half]
+    result = resolution_analysis.resolution_cc_half(merging_stats, limit=0.82)
+    assert list(result.y_obs) == pytest.approx(list(expected.y_obs - 0.05), abs=1e-12)
+    assert result.d_min > expected.d_min
+    assert [b.cc_one_half for b in merging_stats.bins] == cc_one_half
+    significance = resolution_analysis._get_cc_half_significance(
+        merging_stats, "half_dataset"
+    )
+    assert list(significance) == list(result.y_obs > result.critical_values)
+
+    # but not for the sigma_tau method
+    result = resolution_analysis.resolution_cc_half(
+        merging_stats, limit=0.82, cc_half_method="sigma_tau"
+    )
+    assert list(result.y_obs) == list(
+        flex.double(b.cc_one_half_sigma_tau for b in merging_stats.bins).reversed()
+    )
+
+
 def test_resolution_fit_from_merging_stats(merging_stats):
     result = resolution_analysis.resolution_fit_from_merging_stats(
         merging_stats, "i_over_sigma_mean", resolution_analysis.log_fit, limit=1.5